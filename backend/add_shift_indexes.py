@@ -0,0 +1,51 @@
+"""
+Build the Shift indexes declared in models.py on an existing schedule.db and
+show the query plans of the hot shift queries.
+
+Usage: python add_shift_indexes.py [path/to/schedule.db]
+"""
+import sys
+from sqlmodel import create_engine, text
+from database import ensure_indexes
+import models  # noqa: F401 - registers the tables/indexes on SQLModel.metadata
+
+# The filters used by read_shifts, the overlap checks (update_shift, autofill,
+# recommendations, call sheet), the open-shift scan and the locked-shift scans.
+HOT_QUERIES = {
+    "read_shifts (window overlap)":
+        "SELECT id FROM shift WHERE start_time < :end AND end_time > :start",
+    "overlap check (employee)":
+        "SELECT id FROM shift WHERE employee_id = :emp AND start_time < :end AND end_time > :start",
+    "weekly hours (employee)":
+        "SELECT id FROM shift WHERE employee_id = :emp AND start_time >= :start AND end_time < :end",
+    "open shifts (autofill)":
+        "SELECT id FROM shift WHERE employee_id IS NULL",
+    "locked shifts in week (project-locked)":
+        "SELECT id FROM shift WHERE is_locked = 1 AND start_time >= :start AND start_time < :end",
+}
+
+PARAMS = {"emp": 1, "start": "2025-01-04 00:00:00", "end": "2025-01-11 00:00:00"}
+
+def explain(conn, sql):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a query."""
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), PARAMS).fetchall()
+    return [row[-1] for row in rows]
+
+def main(db_path="schedule.db"):
+    engine = create_engine(f"sqlite:///{db_path}")
+    created = ensure_indexes(engine)
+    if created:
+        print(f"Created indexes: {', '.join(created)}")
+    else:
+        print("All shift indexes already exist.")
+
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+        for name, sql in HOT_QUERIES.items():
+            print(f"\n{name}:")
+            for detail in explain(conn, sql):
+                print(f"   {detail}")
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
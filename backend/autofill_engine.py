@@ -0,0 +1,239 @@
+"""
+Batch autofill engine.
+
+Loads everything autofill needs for the open shifts' window in a constant number
+of queries, builds a NumPy eligibility matrix (open shift x employee) covering
+role, conflicts, availability and the scheduling_rules checks (weekly hours cap,
+no_plaza), then fills shifts with rounds of min-cost bipartite matching (scipy
+linear_sum_assignment). The cost is the employee's projected hours for that
+week, so work is spread across people instead of going to whoever the database
+returns first.
+
+Each round gives an employee at most one shift; between rounds the matrix is
+updated for the shifts just assigned (overlaps with other open shifts, hours).
+"""
+import time as _time
+from datetime import datetime, timedelta
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from sqlmodel import select
+from models import Employee, Shift
+from week_hours import week_start_of, shift_hours, get_weeks_hours
+import shift_series
+import availability_mask
+from scheduling_rules import RULES, RuleContext
+
+EPOCH = datetime(1970, 1, 1)
+INFEASIBLE_COST = 1e6  # Larger than any sum of real costs, so matchings maximize filled shifts first
+_GROUP_STRIDE = 10 ** 9  # Minutes; separates employees when searching sorted (employee, start) keys
+
+CAP_RULE = RULES.compile(["max_weekly_hours"])
+RESTRICTION_RULES = RULES.compile(["no_plaza"])
+
+def to_minutes(dt):
+    return int((dt - EPOCH).total_seconds() // 60)
+
+def employee_conflicts(shift_starts, shift_ends, emp_index, existing_emp, existing_starts, existing_ends, num_employees):
+    """(n, k) bool: shift i overlaps an existing shift of employee j.
+
+    Existing shifts are sorted by (employee, start); for each (shift, employee) pair
+    we find the last existing shift starting before the open shift ends and compare
+    the running maximum end time of that employee's shifts with the open shift start.
+    """
+    n = len(shift_starts)
+    if n == 0 or len(existing_emp) == 0:
+        return np.zeros((n, num_employees), dtype=bool)
+    emp = np.asarray([emp_index[e] for e in existing_emp], dtype=np.int64)
+    starts = np.asarray(existing_starts, dtype=np.int64)
+    ends = np.asarray(existing_ends, dtype=np.int64)
+    order = np.lexsort((starts, emp))
+    emp, starts, ends = emp[order], starts[order], ends[order]
+
+    keys = emp * _GROUP_STRIDE + starts
+    running_end = np.maximum.accumulate(emp * _GROUP_STRIDE + ends) - emp * _GROUP_STRIDE
+    group_first = np.searchsorted(emp, np.arange(num_employees), side="left")
+
+    cols = np.arange(num_employees, dtype=np.int64)
+    queries = cols[None, :] * _GROUP_STRIDE + np.asarray(shift_ends, dtype=np.int64)[:, None]
+    pos = np.searchsorted(keys, queries, side="left") - 1
+    valid = pos >= group_first[None, :]
+    pos = np.clip(pos, 0, None)
+    return valid & (running_end[pos] > np.asarray(shift_starts, dtype=np.int64)[:, None])
+
+class EligibilityProblem:
+    """Open shifts x candidate employees with everything needed to decide assignments."""
+
+    def __init__(self, shifts, employees, existing, compiled, week_hours_map):
+        self.shifts = shifts
+        self.employees = employees
+        n, k = len(shifts), len(employees)
+        emp_index = {e.id: j for j, e in enumerate(employees)}
+        self.emp_index = emp_index
+
+        self.start = np.array([to_minutes(s.start_time) for s in shifts], dtype=np.int64)
+        self.end = np.array([to_minutes(s.end_time) for s in shifts], dtype=np.int64)
+        self.duration = np.array([shift_hours(s.start_time, s.end_time) for s in shifts], dtype=float)
+        self.weeks = sorted({week_start_of(s.start_time) for s in shifts})
+        week_index = {w: i for i, w in enumerate(self.weeks)}
+        self.week_idx = np.array([week_index[week_start_of(s.start_time)] for s in shifts], dtype=np.int64)
+
+        # Role: default role must match (same rule autofill always used)
+        shift_roles = np.array([s.role_id for s in shifts])
+        emp_roles = np.array([e.default_role_id if e.default_role_id is not None else -1 for e in employees])
+        self.role_ok = shift_roles[:, None] == emp_roles[None, :] if n and k else np.zeros((n, k), dtype=bool)
+
+        # Conflicts with existing shifts
+        self.conflict = employee_conflicts(
+            self.start, self.end, emp_index,
+            [s.employee_id for s in existing],
+            [to_minutes(s.start_time) for s in existing],
+            [to_minutes(s.end_time) for s in existing],
+            k,
+        )
+
+        # Availability from the compiled masks: Availability rows must allow every slot
+        # of the shift, availability_grid and notes its start slot
+        self.avail_ok = availability_mask.work_matrix(shifts, compiled) & availability_mask.start_matrix(shifts, compiled)
+
+        # no_plaza (the column or "NO PLAZA" in the notes)
+        location = np.array([s.location for s in shifts], dtype=object)
+        no_plaza = np.array([bool(e.no_plaza) or c.notes.no_plaza for e, c in zip(employees, compiled)], dtype=bool)
+        self.restrict_ok = RESTRICTION_RULES(RuleContext(location=location[:, None], no_plaza=no_plaza[None, :]))["no_plaza"] if n and k else np.ones((n, k), dtype=bool)
+
+        self.existing = existing
+
+        # Weekly hours cap
+        self.hours = np.zeros((len(self.weeks), k), dtype=float)
+        for (emp_id, week), hours in week_hours_map.items():
+            if emp_id in emp_index and week in week_index:
+                self.hours[week_index[week], emp_index[emp_id]] = hours
+        self.cap = np.array([e.max_weekly_hours if e.max_weekly_hours else np.inf for e in employees], dtype=float)
+
+        # Open shifts that overlap each other cannot go to the same person
+        self.open_overlap = (self.start[:, None] < self.end[None, :]) & (self.end[:, None] > self.start[None, :])
+        np.fill_diagonal(self.open_overlap, False)
+
+    def cap_ok(self):
+        return CAP_RULE(RuleContext(weekly=self.hours[self.week_idx], duration=self.duration[:, None], cap=self.cap[None, :]))["max_weekly_hours"]
+
+    def eligibility(self):
+        return self.role_ok & ~self.conflict & self.avail_ok & self.restrict_ok & self.cap_ok()
+
+    def existing_daily_hours(self):
+        """{(employee index, date): hours} of existing shifts, by the day they start."""
+        daily = {}
+        for s in self.existing:
+            key = (self.emp_index[s.employee_id], s.start_time.date())
+            daily[key] = daily.get(key, 0.0) + shift_hours(s.start_time, s.end_time)
+        return daily
+
+def load_problem(session, open_shifts):
+    """Prefetches candidates, their shifts in the window, availability and weekly hours."""
+    if not open_shifts:
+        return EligibilityProblem([], [], [], [], {})
+    role_ids = {s.role_id for s in open_shifts}
+    employees = session.exec(select(Employee).where(
+        Employee.default_role_id.in_(role_ids),
+        Employee.is_active == True
+    ).order_by(Employee.id)).all()
+    emp_ids = [e.id for e in employees]
+
+    # One day of margin so daily totals on the window's edge days are complete
+    window_start = min(s.start_time for s in open_shifts) - timedelta(days=1)
+    window_end = max(s.end_time for s in open_shifts) + timedelta(days=1)
+    existing = session.exec(select(Shift).where(
+        Shift.employee_id.in_(emp_ids),
+        Shift.start_time < window_end,
+        Shift.end_time > window_start
+    )).all() + shift_series.expand(session, window_start, window_end, emp_ids) if emp_ids else []
+    compiled = availability_mask.get_compiled(session, employees)
+    weeks = {week_start_of(s.start_time) for s in open_shifts}
+    hours = get_weeks_hours(session, emp_ids, weeks)
+    return EligibilityProblem(open_shifts, employees, existing, compiled, hours)
+
+def solve_balanced_matching(problem):
+    """Rounds of min-cost matching. Returns {shift index: employee index}."""
+    eligible = problem.eligibility()
+    hours = problem.hours.copy()
+    assignments = {}
+    rounds = 0
+    while True:
+        rows = np.flatnonzero(eligible.any(axis=1))
+        if len(rows) == 0:
+            break
+        rounds += 1
+        sub = eligible[rows]
+        cost = hours[problem.week_idx[rows]] + problem.duration[rows, None]
+        cost = np.where(sub, cost, INFEASIBLE_COST)
+        r, c = linear_sum_assignment(cost)
+        matched = sub[r, c]
+        if not matched.any():
+            break
+        for i, j in zip(rows[r[matched]], c[matched]):
+            assignments[int(i)] = int(j)
+            w = problem.week_idx[i]
+            hours[w, j] += problem.duration[i]
+            eligible[i, :] = False
+            # Same employee can no longer take shifts overlapping this one or breaking the cap
+            eligible[:, j] &= ~problem.open_overlap[:, i]
+            eligible[:, j] &= CAP_RULE(RuleContext(weekly=hours[problem.week_idx, j], duration=problem.duration, cap=problem.cap[j]))["max_weekly_hours"]
+    problem.rounds = rounds
+    return assignments
+
+class AutofillPlan:
+    def __init__(self, problem, assignments, timings):
+        self.problem = problem
+        self.assignments = assignments  # [(shift, employee)]
+        self.timings = timings
+        self.solver = None  # Solver statistics in optimize mode
+
+    @property
+    def unfilled(self):
+        assigned = {id(s) for s, _ in self.assignments}
+        return [s for s in self.problem.shifts if id(s) not in assigned]
+
+    def stats(self):
+        return {
+            "open_shifts": len(self.problem.shifts),
+            "candidates": len(self.problem.employees),
+            "filled": len(self.assignments),
+            "unfilled": len(self.problem.shifts) - len(self.assignments),
+            "rounds": getattr(self.problem, "rounds", 0),
+            "timings_ms": {k: round(v * 1000, 2) for k, v in self.timings.items()},
+            "solver": self.solver,
+        }
+
+def load_open_shifts(session, start_date=None, end_date=None):
+    """Open shifts, optionally only those overlapping [start_date, end_date)."""
+    query = select(Shift).where(Shift.employee_id == None)
+    if start_date:
+        query = query.where(Shift.end_time > start_date)
+    if end_date:
+        query = query.where(Shift.start_time < end_date)
+    return session.exec(query.order_by(Shift.start_time, Shift.id)).all()
+
+def plan_autofill(session, start_date=None, end_date=None):
+    """Plans assignments for open shifts (optionally only those overlapping [start_date, end_date))."""
+    t0 = _time.perf_counter()
+    open_shifts = load_open_shifts(session, start_date, end_date)
+    t1 = _time.perf_counter()
+    problem = load_problem(session, open_shifts)
+    t2 = _time.perf_counter()
+    solution = solve_balanced_matching(problem) if problem.shifts and problem.employees else {}
+    t3 = _time.perf_counter()
+    assignments = [(problem.shifts[i], problem.employees[j]) for i, j in sorted(solution.items())]
+    return AutofillPlan(problem, assignments, {"load": t1 - t0, "matrix": t2 - t1, "solve": t3 - t2})
+
+def apply_plan(session, plan):
+    """Writes the planned assignments in one commit and returns the filled shifts."""
+    for shift, employee in plan.assignments:
+        shift.employee_id = employee.id
+        session.add(shift)
+    session.commit()
+    for shift, _ in plan.assignments:
+        session.refresh(shift)
+    return [shift for shift, _ in plan.assignments]
+
+def preview_plan(plan):
+    """Unsaved copies of the filled shifts for dry runs."""
+    return [Shift(**{**shift.model_dump(), "employee_id": employee.id}) for shift, employee in plan.assignments]
@@ -0,0 +1,183 @@
+"""
+Optimizing autofill (POST /shifts/autofill/?mode=optimize).
+
+Formulates the week's open shifts as a MILP and solves it with the HiGHS solver
+bundled in scipy (scipy.optimize.milp) under a time budget, returning the best
+solution found so far when the budget runs out.
+
+Variables: x[i,j] = open shift i goes to employee j (only for eligible pairs, see
+autofill_engine.EligibilityProblem), ot[j,w] = overtime hours of j in week w.
+
+Hard constraints:
+  - each open shift gets at most one employee
+  - an employee works at most one of any set of overlapping open shifts
+  - weekly hours <= max_weekly_hours
+  - no_overtime employees stay at or under OVERTIME_THRESHOLD hours
+  - daily hours (by shift start day) <= DAILY_HOURS_LIMIT, the call sheet's 16h ceiling
+Objective: fill as many shifts as possible, then minimise overtime hours, then
+seniority violations (giving a shift to a junior employee instead of a senior one).
+"""
+import time as _time
+import numpy as np
+from scipy.optimize import milp, LinearConstraint, Bounds
+from scipy.sparse import coo_matrix
+from autofill_engine import AutofillPlan, load_open_shifts, load_problem
+from scheduling_rules import RULES
+
+OVERTIME_THRESHOLD = RULES.param("weekly_overtime", "hours")
+DAILY_HOURS_LIMIT = RULES.param("daily_safety_limit", "hours")
+DEFAULT_TIME_LIMIT = 10.0
+MAX_TIME_LIMIT = 120.0
+
+FILL_WEIGHT = 1000.0  # Per filled shift
+OVERTIME_WEIGHT = 10.0  # Per overtime hour
+SENIORITY_WEIGHT = 1.0  # Most junior employee costs this much more than the most senior
+
+_STATUS = {0: "optimal", 1: "time_limit", 2: "infeasible", 3: "unbounded", 4: "error"}
+
+class _Rows:
+    """Accumulates sparse constraint rows: lower <= A x <= upper."""
+
+    def __init__(self):
+        self.rows, self.cols, self.vals, self.lower, self.upper = [], [], [], [], []
+
+    def add(self, cols, vals, upper, lower=-np.inf):
+        r = len(self.upper)
+        self.rows.extend([r] * len(cols))
+        self.cols.extend(cols)
+        self.vals.extend(vals)
+        self.lower.append(lower)
+        self.upper.append(upper)
+
+    def constraint(self, num_vars):
+        A = coo_matrix((self.vals, (self.rows, self.cols)), shape=(len(self.upper), num_vars)).tocsr()
+        return LinearConstraint(A, np.array(self.lower), np.array(self.upper))
+
+def seniority_rank(employees):
+    """0.0 for the most senior (earliest hire_date) to 1.0 for the most junior; no hire date = junior."""
+    order = sorted(range(len(employees)), key=lambda j: (employees[j].hire_date is None, employees[j].hire_date or 0, employees[j].id))
+    rank = np.zeros(len(employees))
+    if len(employees) > 1:
+        for position, j in enumerate(order):
+            rank[j] = position / (len(employees) - 1)
+    return rank
+
+def build_model(problem):
+    eligible = problem.eligibility()
+    pairs = np.argwhere(eligible)  # [(i, j)] -> variable index
+    num_x = len(pairs)
+    duration = problem.duration
+
+    by_emp = {}
+    for v, (i, j) in enumerate(pairs):
+        by_emp.setdefault(int(j), []).append((int(i), v))
+
+    # Overtime variables per (employee, week) that has any candidate shift
+    ot_index = {}
+    for j, items in by_emp.items():
+        for i, _ in items:
+            ot_index.setdefault((j, int(problem.week_idx[i])), num_x + len(ot_index))
+    num_vars = num_x + len(ot_index)
+
+    rank = seniority_rank(problem.employees)
+    c = np.zeros(num_vars)
+    c[:num_x] = -FILL_WEIGHT + SENIORITY_WEIGHT * rank[pairs[:, 1]] if num_x else 0
+    c[num_x:] = OVERTIME_WEIGHT
+
+    lower = np.zeros(num_vars)
+    upper = np.ones(num_vars)
+    upper[num_x:] = np.inf
+    integrality = np.zeros(num_vars)
+    integrality[:num_x] = 1
+
+    rows = _Rows()
+
+    # Each shift filled at most once
+    by_shift = {}
+    for v, (i, _) in enumerate(pairs):
+        by_shift.setdefault(int(i), []).append(v)
+    for variables in by_shift.values():
+        if len(variables) > 1:
+            rows.add(variables, [1.0] * len(variables), 1.0)
+
+    daily_existing = problem.existing_daily_hours()
+    seen_cliques = set()
+    for j, items in by_emp.items():
+        shifts = [i for i, _ in items]
+        var_of = dict(items)
+
+        # Overlapping shifts: every overlap includes the later start, so one clique per start time
+        for i in shifts:
+            clique = tuple(sorted(k for k in shifts if problem.start[k] <= problem.start[i] < problem.end[k]))
+            if len(clique) > 1 and (j, clique) not in seen_cliques:
+                seen_cliques.add((j, clique))
+                rows.add([var_of[k] for k in clique], [1.0] * len(clique), 1.0)
+
+        # Weekly cap, overtime and no_overtime
+        employee = problem.employees[j]
+        weeks = {}
+        days = {}
+        for i, v in items:
+            weeks.setdefault(int(problem.week_idx[i]), []).append((i, v))
+            days.setdefault(problem.shifts[i].start_time.date(), []).append((i, v))
+        for w, week_items in weeks.items():
+            existing = problem.hours[w, j]
+            cols = [v for _, v in week_items]
+            vals = [duration[i] for i, _ in week_items]
+            if np.isfinite(problem.cap[j]):
+                rows.add(cols, vals, max(problem.cap[j] - existing, 0.0))
+            ot_var = ot_index[(j, w)]
+            rows.add(cols + [ot_var], vals + [-1.0], OVERTIME_THRESHOLD - existing)
+            if employee.no_overtime:
+                upper[ot_var] = max(existing - OVERTIME_THRESHOLD, 0.0)
+
+        # 16 hour daily ceiling
+        for day, day_items in days.items():
+            existing = daily_existing.get((j, day), 0.0)
+            rows.add([v for _, v in day_items], [duration[i] for i, _ in day_items], max(DAILY_HOURS_LIMIT - existing, 0.0))
+
+    constraints = [rows.constraint(num_vars)] if rows.upper else []
+    return pairs, c, integrality, Bounds(lower, upper), constraints, len(rows.upper)
+
+def optimize_autofill(session, start_date, end_date, time_limit=DEFAULT_TIME_LIMIT):
+    """Plans assignments for the open shifts in [start_date, end_date) with the MILP solver."""
+    time_limit = min(max(float(time_limit), 0.1), MAX_TIME_LIMIT)
+    t0 = _time.perf_counter()
+    open_shifts = load_open_shifts(session, start_date, end_date)
+    t1 = _time.perf_counter()
+    problem = load_problem(session, open_shifts)
+    t2 = _time.perf_counter()
+
+    assignments = []
+    solver = {"status": "empty", "variables": 0, "constraints": 0}
+    if problem.shifts and problem.employees:
+        pairs, c, integrality, bounds, constraints, num_constraints = build_model(problem)
+        solver.update(variables=len(c), constraints=num_constraints)
+        if len(pairs):
+            t_solve = _time.perf_counter()
+            res = milp(c, integrality=integrality, bounds=bounds, constraints=constraints,
+                       options={"time_limit": time_limit, "disp": False})
+            solver.update(
+                status=_STATUS.get(res.status, str(res.status)),
+                message=res.message,
+                solve_seconds=round(_time.perf_counter() - t_solve, 3),
+                time_limit=time_limit,
+                objective=None if res.fun is None else round(float(res.fun), 3),
+                mip_gap=getattr(res, "mip_gap", None),
+                mip_node_count=getattr(res, "mip_node_count", None),
+            )
+            if res.x is not None:
+                x = res.x[:len(pairs)] > 0.5
+                chosen = pairs[x]
+                assignments = [(problem.shifts[int(i)], problem.employees[int(j)]) for i, j in sorted(map(tuple, chosen))]
+                overtime = res.x[len(pairs):]
+                solver["overtime_hours"] = round(float(overtime.sum()), 2)
+                rank = seniority_rank(problem.employees)
+                solver["seniority_cost"] = round(float(rank[chosen[:, 1]].sum()), 3) if len(chosen) else 0.0
+        else:
+            solver["status"] = "no_eligible_pairs"
+    t3 = _time.perf_counter()
+
+    plan = AutofillPlan(problem, assignments, {"load": t1 - t0, "matrix": t2 - t1, "solve": t3 - t2})
+    plan.solver = solver
+    return plan
@@ -0,0 +1,310 @@
+"""
+Compiled availability: a week of 15-minute slots (7 x 96 = 672) as bitmasks.
+
+Availability is entered three ways - Availability rows ("HH:MM" ranges per
+weekday), the availability_grid JSON (day x 1st/2nd/3rd shift) and free-text
+notes. They are compiled into two masks per employee, stored on the employee
+row and kept in an in-memory cache:
+
+  work_mask   slots the employee can be working (Availability rows). A shift is
+              allowed when every slot it covers is set.
+  start_mask  slots a shift may start in (availability_grid and notes, which have
+              always been judged by the shift's start day and hour).
+
+Bit i is slot i of the week, Monday 00:00 = slot 0 (weekday() order, like the
+Availability rows). Times are rounded to slots conservatively: available ranges
+shrink to whole slots, unavailable ranges and shifts grow to whole slots.
+
+Masks are recompiled at write time: whenever an Employee's notes/grid or any
+Availability row is flushed, the affected employees' columns are rewritten in
+the same transaction and their cache entries are dropped on commit.
+
+Usage: python availability_mask.py [path/to/schedule.db]   (recompiles every employee)
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+from sqlalchemy import event, inspect, update, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import select
+from models import Employee, Availability
+import note_constraints
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES  # 96
+WEEK_SLOTS = 7 * SLOTS_PER_DAY  # 672
+FULL_MASK = (1 << WEEK_SLOTS) - 1
+MASK_BYTES = WEEK_SLOTS // 8  # 84
+
+GRID_DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Columns the masks are compiled from
+SOURCE_FIELDS = ("availability_grid", "notes") + note_constraints.COLUMNS
+
+Compiled = namedtuple("Compiled", "work_mask start_mask notes")
+
+def shift_type_of(hour):
+    """3rd: midnight-6am, 1st: 6am-2pm, 2nd: 2pm-midnight (same split as the call sheet)."""
+    if 0 <= hour < 6:
+        return '3rd'
+    elif 6 <= hour < 14:
+        return '1st'
+    return '2nd'
+
+def hhmm_to_minutes(value):
+    h, m = map(int, value.split(':')[:2])
+    return h * 60 + m
+
+def week_minute(dt):
+    return dt.weekday() * 24 * 60 + dt.hour * 60 + dt.minute
+
+def slot_of(dt):
+    return week_minute(dt) // SLOT_MINUTES
+
+def span_slots(start, end):
+    """[first, last) slots a shift covers, last may run past WEEK_SLOTS (wraps to Monday)."""
+    start_minute = week_minute(start)
+    end_minute = start_minute + int((end - start).total_seconds() // 60)
+    first = start_minute // SLOT_MINUTES
+    last = -(-end_minute // SLOT_MINUTES)
+    return first, min(max(last, first + 1), first + WEEK_SLOTS)
+
+def _range_mask(first, last):
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+def _day_mask(day):
+    return _range_mask(day * SLOTS_PER_DAY, (day + 1) * SLOTS_PER_DAY)
+
+# --- Compilation ---
+def compile_work_mask(availabilities):
+    """Availability rows -> work mask. Positive rows on a day limit that day to them,
+    negative rows always block."""
+    by_day = {}
+    for a in availabilities:
+        by_day.setdefault(a.day_of_week, []).append(a)
+    mask = FULL_MASK
+    for day, rows in by_day.items():
+        if not 0 <= day < 7:
+            continue
+        base = day * SLOTS_PER_DAY
+        positive = [a for a in rows if a.is_available]
+        if positive:
+            allowed = 0
+            for a in positive:
+                end = hhmm_to_minutes(a.end_time)
+                end = 24 * 60 if end >= 24 * 60 - 1 else end  # "23:59" means end of day
+                first = -(-hhmm_to_minutes(a.start_time) // SLOT_MINUTES)
+                allowed |= _range_mask(base + first, base + end // SLOT_MINUTES)
+            mask &= ~_day_mask(day) | allowed
+        for a in rows:
+            if not a.is_available:
+                first = hhmm_to_minutes(a.start_time) // SLOT_MINUTES
+                last = -(-hhmm_to_minutes(a.end_time) // SLOT_MINUTES)
+                mask &= ~_range_mask(base + first, base + min(last, SLOTS_PER_DAY))
+    return mask & FULL_MASK
+
+def _start_mask_where(allowed):
+    """Start mask with the slots for which allowed(weekday, hour) is true."""
+    mask = 0
+    for day in range(7):
+        for hour in range(24):
+            if allowed(day, hour):
+                first = day * SLOTS_PER_DAY + hour * 60 // SLOT_MINUTES
+                mask |= _range_mask(first, first + 60 // SLOT_MINUTES)
+    return mask
+
+def grid_allows(availability_grid, start_time):
+    """False when the availability_grid marks this day/shift type unavailable."""
+    if not availability_grid:
+        return True
+    try:
+        grid = json.loads(availability_grid)
+        return grid.get(GRID_DAYS[start_time.weekday()], {}).get(shift_type_of(start_time.hour), True) is not False
+    except (json.JSONDecodeError, AttributeError):
+        return True
+
+def grid_start_mask(availability_grid):
+    if not availability_grid:
+        return FULL_MASK
+    try:
+        grid = json.loads(availability_grid)
+        return _start_mask_where(lambda day, hour: grid.get(GRID_DAYS[day], {}).get(shift_type_of(hour), True) is not False)
+    except (json.JSONDecodeError, AttributeError):
+        return FULL_MASK  # Invalid JSON, ignore
+
+def notes_start_mask(constraints):
+    if constraints.days is None and constraints.shifts is None and constraints.after_hour is None:
+        return FULL_MASK
+    monday = datetime(2024, 1, 1)  # Any Monday; only weekday and hour matter
+    return _start_mask_where(lambda day, hour: note_constraints.allows_start(constraints, monday.replace(day=1 + day, hour=hour)))
+
+def compile_employee(constraints, availability_grid, availabilities):
+    """constraints: the employee's NoteConstraints (note_constraints.from_employee)."""
+    start_mask = grid_start_mask(availability_grid) & notes_start_mask(constraints)
+    return Compiled(compile_work_mask(availabilities), start_mask, constraints)
+
+def encode(mask):
+    return mask.to_bytes(MASK_BYTES, "little").hex()
+
+def decode(value):
+    return int.from_bytes(bytes.fromhex(value), "little") if value else FULL_MASK
+
+# --- Checks ---
+def allows(compiled, start, end):
+    """Single shift check: start slot allowed and every covered slot workable."""
+    if not (compiled.start_mask >> slot_of(start)) & 1:
+        return False
+    first, last = span_slots(start, end)
+    span = _range_mask(first, last)
+    work = compiled.work_mask | (compiled.work_mask << WEEK_SLOTS)  # Shifts may wrap into Monday
+    return span & ~work == 0
+
+def mask_bits(masks):
+    """(k, WEEK_SLOTS) bool array from k integer masks."""
+    raw = b"".join(m.to_bytes(MASK_BYTES, "little") for m in masks)
+    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")
+    return bits.reshape(len(masks), WEEK_SLOTS).astype(bool)
+
+def start_matrix(shifts, compiled):
+    """(n, k) bool: shift i may start for employee j."""
+    if not shifts or not compiled:
+        return np.ones((len(shifts), len(compiled)), dtype=bool)
+    bits = mask_bits([c.start_mask for c in compiled])
+    return bits[:, [slot_of(s.start_time) for s in shifts]].T
+
+def work_matrix(shifts, compiled):
+    """(n, k) bool: every slot shift i covers is workable for employee j."""
+    if not shifts or not compiled:
+        return np.ones((len(shifts), len(compiled)), dtype=bool)
+    blocked = ~mask_bits([c.work_mask for c in compiled])
+    blocked = np.concatenate([blocked, blocked], axis=1)
+    prefix = np.zeros((len(compiled), 2 * WEEK_SLOTS + 1), dtype=np.int32)
+    np.cumsum(blocked, axis=1, out=prefix[:, 1:])
+    spans = np.array([span_slots(s.start_time, s.end_time) for s in shifts])
+    return (prefix[:, spans[:, 1]] - prefix[:, spans[:, 0]] == 0).T
+
+# --- Cache ---
+_cache = {}  # employee_id -> Compiled
+
+def get_compiled(session, employees):
+    """Compiled availability for Employee objects, in the same order.
+
+    Cache misses decode the employee's stored masks; employees whose masks were
+    never compiled (rows written by scripts that bypass the ORM) are compiled from
+    their sources with one Availability query.
+    """
+    result = [_cache.get(e.id) for e in employees]
+    missing = [e for e, c in zip(employees, result) if c is None]
+    uncompiled = [e.id for e in missing if e.availability_mask is None or e.start_mask is None]
+    rows = {}
+    if uncompiled:
+        for a in session.exec(select(Availability).where(Availability.employee_id.in_(uncompiled))):
+            rows.setdefault(a.employee_id, []).append(a)
+    for e in missing:
+        if e.availability_mask is None or e.start_mask is None:
+            compiled = compile_employee(note_constraints.from_employee(e), e.availability_grid, rows.get(e.id, []))
+        else:
+            compiled = Compiled(decode(e.availability_mask), decode(e.start_mask), note_constraints.from_employee(e))
+        _cache[e.id] = compiled
+    return [_cache[e.id] for e in employees]
+
+def clear_cache():
+    _cache.clear()
+
+# --- Write-time compilation ---
+def _recompile(connection, employee_ids):
+    """Recompiles and stores masks for employee_ids. Returns {employee_id: Compiled}."""
+    table = Employee.__table__
+    ids = sorted(employee_ids)
+    if not ids:
+        return {}
+    sources = connection.execute(select(table).where(table.c.id.in_(ids))).all()
+    rows = {}
+    for a in connection.execute(select(Availability.__table__).where(Availability.__table__.c.employee_id.in_(ids))).all():
+        rows.setdefault(a.employee_id, []).append(a)
+    compiled = {}
+    updates = []
+    for row in sources:
+        emp_id = row.id
+        compiled[emp_id] = compile_employee(note_constraints.from_employee(row), row.availability_grid, rows.get(emp_id, []))
+        updates.append({"_id": emp_id, "availability_mask": encode(compiled[emp_id].work_mask), "start_mask": encode(compiled[emp_id].start_mask)})
+    if updates:
+        connection.execute(
+            update(table).where(table.c.id == bindparam("_id")).values(
+                availability_mask=bindparam("availability_mask"), start_mask=bindparam("start_mask")),
+            updates,
+        )
+    return compiled
+
+def _touched_employees(session):
+    ids = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Employee):
+            state = inspect(obj)
+            if obj in session.new or any(state.attrs[f].history.has_changes() for f in SOURCE_FIELDS):
+                ids.add(obj.id)
+        elif isinstance(obj, Availability):
+            history = inspect(obj).attrs.employee_id.history
+            ids.update(i for i in (history.deleted or []) if i is not None)
+            ids.add(obj.employee_id)
+    for obj in session.deleted:
+        if isinstance(obj, Availability):
+            ids.add(obj.employee_id)
+    deleted_employees = {obj.id for obj in session.deleted if isinstance(obj, Employee)}
+    return {i for i in ids if i is not None} - deleted_employees, deleted_employees
+
+@event.listens_for(Session, "after_flush")
+def _compile_flushed_availability(session, flush_context):
+    ids, deleted = _touched_employees(session)
+    if not ids and not deleted:
+        return
+    compiled = _recompile(session.connection(), ids)
+    # Keep loaded Employee objects in step with the columns just written
+    for emp_id, c in compiled.items():
+        obj = session.identity_map.get((Employee, (emp_id,), None))
+        if obj is not None:
+            set_committed_value(obj, "availability_mask", encode(c.work_mask))
+            set_committed_value(obj, "start_mask", encode(c.start_mask))
+    session.info.setdefault("availability_changes", set()).update(ids | deleted)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_availability(session):
+    for emp_id in session.info.pop("availability_changes", ()):
+        _cache.pop(emp_id, None)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_availability(session):
+    session.info.pop("availability_changes", None)
+
+# --- Rebuild ---
+def rebuild(session):
+    """Recompiles every employee's masks. Returns the number of employees."""
+    ids = session.exec(select(Employee.id)).all()
+    _recompile(session.connection(), ids)
+    session.commit()
+    clear_cache()
+    return len(ids)
+
+def ensure_built(session):
+    """Compiles masks for employees that have none (first start after upgrading, script imports)."""
+    ids = session.exec(select(Employee.id).where((Employee.availability_mask == None) | (Employee.start_mask == None))).all()
+    if not ids:
+        return 0
+    _recompile(session.connection(), ids)
+    session.commit()
+    for emp_id in ids:
+        _cache.pop(emp_id, None)
+    return len(ids)
+
+if __name__ == "__main__":
+    import sys
+    from sqlmodel import SQLModel, Session as SQLModelSession
+    from database import make_engine
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "schedule.db"
+    engine = make_engine(f"sqlite:///{db_path}", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with SQLModelSession(engine) as session:
+        print(f"Compiled availability masks: {rebuild(session)} employees")
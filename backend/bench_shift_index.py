@@ -0,0 +1,74 @@
+"""
+Benchmark: overlap checks via SQL (one query per candidate, as the endpoints did)
+versus the in-memory ShiftIntervalIndex.
+
+Usage: python bench_shift_index.py [employees] [weeks] [checks]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlmodel import SQLModel, Session, select, insert
+from database import make_engine
+from models import Shift, Role
+from shift_index import ShiftIntervalIndex
+
+def build_db(num_employees, num_weeks):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = make_engine(f"sqlite:///{path}", echo=False)
+    SQLModel.metadata.create_all(engine)
+    base = datetime(2023, 1, 7)
+    rows = []
+    for emp_id in range(1, num_employees + 1):
+        for week in range(num_weeks):
+            for day in range(5):
+                start = base + timedelta(weeks=week, days=day, hours=6 + (emp_id % 3) * 8)
+                rows.append({"employee_id": emp_id, "role_id": 1, "start_time": start, "end_time": start + timedelta(hours=8),
+                             "is_vacation": False, "is_repeating": False, "is_locked": False})
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        session.exec(insert(Shift), params=rows)
+        session.commit()
+    return engine, base, len(rows)
+
+def main(num_employees=150, num_weeks=156, num_checks=5000):
+    engine, base, total = build_db(num_employees, num_weeks)
+    print(f"{total} shifts, {num_employees} employees, {num_weeks} weeks")
+
+    rng = random.Random(42)
+    checks = []
+    for _ in range(num_checks):
+        start = base + timedelta(weeks=rng.randrange(num_weeks), days=rng.randrange(7), hours=rng.randrange(24))
+        checks.append((rng.randint(1, num_employees), start, start + timedelta(hours=8)))
+
+    with Session(engine) as session:
+        t0 = time.perf_counter()
+        sql_results = []
+        for emp_id, start, end in checks:
+            conflict = session.exec(select(Shift.id).where(
+                Shift.employee_id == emp_id,
+                Shift.start_time < end,
+                Shift.end_time > start
+            )).first()
+            sql_results.append(conflict is not None)
+        sql_time = time.perf_counter() - t0
+
+        index = ShiftIntervalIndex()
+        t0 = time.perf_counter()
+        index.load(session)
+        load_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    mem_results = [index.has_conflict(emp_id, start, end) for emp_id, start, end in checks]
+    mem_time = time.perf_counter() - t0
+
+    assert sql_results == mem_results, "Index disagrees with SQL"
+    print(f"SQL path:       {sql_time * 1000:8.1f} ms ({sql_time / num_checks * 1e6:.1f} us/check)")
+    print(f"Index load:     {load_time * 1000:8.1f} ms (once per process)")
+    print(f"Interval index: {mem_time * 1000:8.1f} ms ({mem_time / num_checks * 1e6:.1f} us/check)")
+    print(f"Speedup:        {sql_time / mem_time:8.1f}x")
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:4]])
@@ -0,0 +1,81 @@
+"""
+Benchmark: creating shifts one commit at a time (as create_shift did: add,
+commit, refresh per occurrence and per vacation cover, plus a second commit for
+the parent link) versus shift_bulk.insert_shifts (one insert, one commit).
+
+Usage: python bench_shift_inserts.py [requests] [shifts_per_request]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlmodel import SQLModel, Session, select, func
+from database import make_engine
+from models import Shift, Role, Employee
+import week_hours  # Ledger hooks, as in the app
+import shift_bulk
+
+BASE = datetime(2025, 1, 4, 6)
+
+def build_db():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = make_engine(f"sqlite:///{path}", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        session.add(Employee(id=1, first_name="Bench", last_name="Mark", default_role_id=1))
+        session.commit()
+    return engine
+
+def request_rows(request, per_request):
+    # A vacation occurrence per day plus its open cover, grouped under the first one
+    rows = []
+    for day in range(per_request // 2):
+        start = BASE + timedelta(weeks=request, days=day)
+        rows.append({"employee_id": 1, "role_id": 1, "start_time": start, "end_time": start + timedelta(hours=8),
+                     "is_vacation": True, "parent": 0})
+        rows.append({"employee_id": None, "role_id": 1, "start_time": start, "end_time": start + timedelta(hours=8),
+                     "notes": "Cover for Vacation", "parent": 0})
+    return rows
+
+def loop_create(session, rows):
+    # The old per-shift path
+    parent_id = None
+    for i, row in enumerate(rows):
+        shift = Shift(**{k: v for k, v in row.items() if k != "parent"}, parent_id=parent_id)
+        session.add(shift)
+        session.commit()
+        session.refresh(shift)
+        if i == 0:
+            parent_id = shift.id
+            shift.parent_id = shift.id
+            session.add(shift)
+            session.commit()
+
+def bulk_create(session, rows):
+    shift_bulk.insert_shifts(session, rows)
+    session.commit()
+
+def run(create, requests, per_request):
+    engine = build_db()
+    with Session(engine) as session:
+        t0 = time.perf_counter()
+        for request in range(requests):
+            create(session, request_rows(request, per_request))
+        elapsed = time.perf_counter() - t0
+        count = session.exec(select(func.count(Shift.id))).one()
+        hours = session.exec(select(func.sum(week_hours.EmployeeWeekHours.raw_hours))).one()
+    return elapsed, count, hours
+
+def main(requests=50, per_request=58):
+    loop_time, loop_count, loop_hours = run(loop_create, requests, per_request)
+    bulk_time, bulk_count, bulk_hours = run(bulk_create, requests, per_request)
+    assert (loop_count, loop_hours) == (bulk_count, bulk_hours), "Paths wrote different shifts"
+    print(f"{requests} requests x {per_request} shifts ({bulk_count} shifts)")
+    print(f"Commit per shift: {loop_time * 1000:8.1f} ms ({loop_time / requests * 1000:.2f} ms/request)")
+    print(f"Bulk insert:      {bulk_time * 1000:8.1f} ms ({bulk_time / requests * 1000:.2f} ms/request)")
+    print(f"Speedup:          {loop_time / bulk_time:8.1f}x")
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
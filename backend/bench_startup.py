@@ -0,0 +1,66 @@
+"""
+Benchmark: cost of importing main (what every server start and every script
+doing `from main import ...` pays) now that the OCR stack loads lazily, versus
+loading it eagerly at import as main did (cv2, pytesseract, pdf2image,
+pillow_heif, easyocr and easyocr.Reader(['en'])).
+
+Each variant runs in a fresh interpreter; peak RSS is that process's maximum.
+With easyocr missing the eager variant stops after the imports it can do (and
+says so), which understates the eager cost.
+
+Usage: python bench_startup.py [runs]
+"""
+import json
+import subprocess
+import sys
+import os
+
+LAZY = """
+import main
+"""
+
+EAGER = """
+import main
+import cv2, numpy, pytesseract, pdf2image, pillow_heif
+pillow_heif.register_heif_opener()
+try:
+    import ocr_worker
+    ocr_worker.get_reader()
+except ImportError as e:
+    note = f"reader not built: {e}"
+"""
+
+PROBE = """
+import json, resource, sys, time
+note = None
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+heavy = sorted(m for m in ("cv2", "easyocr", "torch", "pytesseract", "pdf2image", "pillow_heif") if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss, "heavy": heavy, "note": note}}))
+"""
+
+def run(code):
+    out = subprocess.run([sys.executable, "-c", PROBE.format(code=code)], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def best(code, runs):
+    results = [run(code) for _ in range(runs)]
+    return min(results, key=lambda r: r["seconds"])
+
+def main(runs=3):
+    lazy = best(LAZY, runs)
+    eager = best(EAGER, runs)
+    print(f"Best of {runs} fresh interpreters")
+    print(f"Eager OCR imports: {eager['seconds'] * 1000:8.1f} ms  {eager['rss_mb']:7.1f} MB peak RSS  loads {', '.join(eager['heavy'])}")
+    if eager["note"]:
+        print(f"                   ({eager['note']})")
+    print(f"Lazy (import main):{lazy['seconds'] * 1000:8.1f} ms  {lazy['rss_mb']:7.1f} MB peak RSS  loads {', '.join(lazy['heavy']) or 'no OCR modules'}")
+    print(f"Speedup:           {eager['seconds'] / lazy['seconds']:8.1f}x, {eager['rss_mb'] - lazy['rss_mb']:.1f} MB less")
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
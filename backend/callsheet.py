@@ -0,0 +1,481 @@
+"""
+Ranked call sheets for open shifts.
+
+build_call_sheet() is the call sheet GET /shifts/{shift_id}/call-sheet has always
+returned: maintenance split into PT/FT standard and OT tiers (FT in rotation
+order), cashiers split into pages 1-3 with probationary employees last, then a
+status, details and answer for every candidate.
+
+Everything a sheet needs besides the target shift is read once per week by
+prefetch_week(): the role groups' candidates, hours and shifts (callsheet_cache),
+the FT maintenance rotation and the candidates' compiled availability. A single
+sheet uses a prefetch for its own week; GET /callsheets/week shares one prefetch
+between every open shift of the week. render_week_html() lays the sheets out
+for printing the way ShiftCallSheet.jsx does, one page per sheet section.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from html import escape
+import numpy as np
+from sqlmodel import select
+from models import Shift, RotationState
+from callsheet_cache import callsheet_cache, role_group
+import availability_mask
+import note_constraints
+import week_hours
+import shift_series
+from scheduling_rules import RULES, RuleContext
+
+CALL_SHEET_ROLE_IDS = [3, 4, 7, 8]
+MAINT_ROTATION_KEY = "maint_ft"
+
+OVERTIME_HOURS = RULES.param("weekly_overtime", "hours")
+PROBATION_DAYS = RULES.param("probation", "days")
+DAILY_HOURS_PREFERRED = RULES.param("daily_hours_preferred", "hours")
+DAILY_SAFETY_HOURS = RULES.param("daily_safety_limit", "hours")
+OVERTIME_RULE = RULES.compile(["weekly_overtime"])
+CASHIER_PAGE_RULES = RULES.compile(["part_time_hours", "weekly_overtime", "probation"])
+CANDIDATE_RULES = RULES.compile(["weekly_overtime", "daily_safety_limit", "no_plaza"])
+
+# groups: {group: CallSheetGroup}; maint_last_called: employee id from RotationState or None;
+# compiled: {employee_id: availability_mask.Compiled}
+WeekPrefetch = namedtuple("WeekPrefetch", "week_start groups maint_last_called compiled")
+
+def prefetch_week(session, week_start, groups):
+    loaded = {group: callsheet_cache.get(session, group, week_start) for group in groups}
+    rot_state = session.get(RotationState, MAINT_ROTATION_KEY) if "maintenance" in loaded else None
+    compiled = {}
+    for group in loaded.values():
+        compiled.update(zip([e.id for e in group.employees], availability_mask.get_compiled(session, group.employees)))
+    return WeekPrefetch(week_start, loaded, rot_state.last_employee_id if rot_state else None, compiled)
+
+def week_open_shifts(session, week_start, role_id=None):
+    """Unassigned call sheet shifts starting in the week (stored and recurring), in start order."""
+    roles = [role_id] if role_id is not None else CALL_SHEET_ROLE_IDS
+    query = select(Shift).where(
+        Shift.employee_id == None,
+        Shift.role_id.in_(roles),
+        Shift.start_time >= week_start,
+        Shift.start_time < week_start + timedelta(days=7)
+    )
+    shifts = list(session.exec(query.order_by(Shift.start_time, Shift.id)).all())
+    # Open occurrences of recurring series (generated, not stored)
+    generated = [
+        s for s in shift_series.expand(session, week_start, week_start + timedelta(days=7))
+        if s.employee_id is None and s.role_id in roles and s.start_time >= week_start
+    ]
+    if not generated:
+        return shifts
+    return sorted(shifts + generated, key=lambda s: (s.start_time, s.id))
+
+def _maintenance_candidates(group, maint_last_called, target_shift):
+    # Maintenance (already in hire date order)
+    pt_maint = [e for e in group.employees if not e.is_full_time]
+    ft_maint = [e for e in group.employees if e.is_full_time]
+
+    # Apply Rotation for FT Maintenance
+    if maint_last_called is not None and ft_maint:
+        # Rotate list
+        try:
+            # Find index of last called
+            idx = next(i for i, emp in enumerate(ft_maint) if emp.id == maint_last_called)
+            # Rotate: Start from idx + 1
+            ft_maint = ft_maint[idx+1:] + ft_maint[:idx+1]
+        except StopIteration:
+            pass # Last called person not found in list (maybe deleted/changed role), keep default order
+
+    # Paid weekly hours (after lunch deduction) for OT calculation
+    maint_hours = group.paid_hours
+
+    # Apply 30min lunch deduction for target if >= 7.5h
+    effective_target = week_hours.paid_shift_hours(target_shift.start_time, target_shift.end_time, week_hours.MAINTENANCE_ROLE_ID)
+
+    def overtime(employees):
+        weekly = np.array([maint_hours[emp.id] for emp in employees], dtype=float)
+        return ~OVERTIME_RULE(RuleContext(weekly=weekly, duration=effective_target))["weekly_overtime"]
+
+    # Split PT Maint into standard vs OT
+    pt_standard = []
+    pt_ot = []
+    for emp, is_ot in zip(pt_maint, overtime(pt_maint)):
+        if is_ot:
+            pt_ot.append((emp, "Part Time Maintenance (OT)"))
+        else:
+            pt_standard.append((emp, "Part Time Maintenance"))
+
+    # Split FT Maint into standard vs OT
+    ft_standard = []
+    ft_ot = []
+    for emp, is_ot in zip(ft_maint, overtime(ft_maint)):
+        if is_ot:
+            ft_ot.append((emp, "Full Time Maintenance (OT)"))
+        else:
+            ft_standard.append((emp, "Full Time / Probationary Maintenance"))
+
+    # Order: PT standard, FT standard, PT OT, FT OT
+    return pt_standard + ft_standard + pt_ot + ft_ot
+
+def _cashier_candidates(group, target_shift, now):
+    # Cashier - employees with Supervisor as secondary role and inactive employees are already left out
+    all_cashiers = group.employees
+
+    # Helper function for consistent FT check
+    def is_full_time(emp):
+        return emp.is_full_time == True or emp.is_full_time == 1
+
+    # Weekly hours for each employee from the ledger
+    cashier_hours = group.raw_hours
+
+    target_duration = (target_shift.end_time - target_shift.start_time).total_seconds() / 3600
+
+    # Sort by hire date
+    sorted_cashiers = sorted(all_cashiers, key=lambda x: x.hire_date or datetime.max)
+
+    # Page thresholds and probation (hire_date + probation days >= current date) from the rules
+    weekly = np.array([round(cashier_hours[emp.id], 1) for emp in sorted_cashiers], dtype=float)  # Round to fix floating point precision
+    employed_days = np.array([(now - emp.hire_date).total_seconds() / 86400 if emp.hire_date else np.nan for emp in sorted_cashiers], dtype=float)
+    checks = CASHIER_PAGE_RULES(RuleContext(weekly=weekly, duration=target_duration, employed_days=employed_days))
+    at_part_time_hours = checks["part_time_hours"]
+    at_overtime = ~checks["weekly_overtime"] | (weekly >= OVERTIME_HOURS)
+    probationary = ~checks["probation"]
+
+    # Separate regular and probationary for each page
+    # Page 1: PT + FT under 40h, Page 2: FT at/over 40h (OT), Page 3: ALL PT for OT (no FT)
+    page_1_regular = []
+    page_1_probation = []
+    page_2_regular = []
+    page_2_probation = []
+    page_3_regular = []
+    page_3_probation = []
+
+    for i, emp in enumerate(sorted_cashiers):
+        is_ft = is_full_time(emp)
+        is_prob = probationary[i]
+
+        # FT with <= 32h scheduled is treated as PT for call sheet
+        treat_as_pt = (not is_ft) or (is_ft and at_part_time_hours[i])
+
+        if treat_as_pt:
+            # PT employee (or FT with <= 32h) -> Page 1 AND Page 3
+            if is_prob:
+                page_1_probation.append((emp, "Page 1 (Probationary)"))
+                page_3_probation.append((emp, "Page 3 (Probationary)"))
+            else:
+                page_1_regular.append((emp, "Page 1"))
+                page_3_regular.append((emp, "Page 3"))
+        elif is_ft:
+            # FT employee with > 32h
+            if at_overtime[i]:
+                # FT at or over 40h -> Page 2 (OT)
+                if is_prob:
+                    page_2_probation.append((emp, "Page 2 (Probationary)"))
+                else:
+                    page_2_regular.append((emp, "Page 2"))
+            else:
+                # FT between 32-40h -> Page 1 only
+                if is_prob:
+                    page_1_probation.append((emp, "Page 1 (Probationary)"))
+                else:
+                    page_1_regular.append((emp, "Page 1"))
+
+    # Combine: regular first, probationary at end of each page section
+    return page_1_regular + page_1_probation + page_2_regular + page_2_probation + page_3_regular + page_3_probation
+
+def build_call_sheet(session, target_shift, prefetch=None, now=None):
+    """Ranked candidates for target_shift (role must be in CALL_SHEET_ROLE_IDS).
+
+    prefetch must be for the week target_shift starts in; it is read when omitted."""
+    now = now or datetime.now()
+    start_of_week = week_hours.week_start_of(target_shift.start_time)
+    group_name = role_group(target_shift.role_id)
+    if prefetch is None:
+        prefetch = prefetch_week(session, start_of_week, [group_name])
+    group = prefetch.groups[group_name]
+
+    # Target Day info
+    day_start = target_shift.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=1)
+
+    if target_shift.role_id == week_hours.MAINTENANCE_ROLE_ID:
+        candidate_objects = _maintenance_candidates(group, prefetch.maint_last_called, target_shift)
+    else:
+        candidate_objects = _cashier_candidates(group, target_shift, now)
+
+    if not candidate_objects:
+        return []
+
+    emp_shifts = group.shifts
+    paid_hours = group.paid_hours
+
+    # Target duration logic (Maintenance Unpaid Meal)
+    raw_target_duration = week_hours.shift_hours(target_shift.start_time, target_shift.end_time)
+    effective_target_duration = week_hours.paid_shift_hours(target_shift.start_time, target_shift.end_time, target_shift.role_id)
+
+    target_shift_notes = []
+    if effective_target_duration < raw_target_duration:
+         target_shift_notes.append("30m Unpaid Lunch")
+
+    # Compiled availability of every candidate (prefetched); the target is a single start slot
+    target_slot = availability_mask.slot_of(target_shift.start_time)
+    target_day = availability_mask.GRID_DAYS[target_shift.start_time.weekday()].upper()
+    target_shift_type = availability_mask.shift_type_of(target_shift.start_time.hour)
+
+    # Overlap with the target and hours already worked that day, per candidate
+    overlaps = []
+    working = []
+    daily = []
+    for emp, _ in candidate_objects:
+        overlap_duration = 0
+        working_today = False
+        daily_hours = 0
+
+        for s in emp_shifts.get(emp.id, []):
+            if s.start_time < target_shift.end_time and s.end_time > target_shift.start_time:
+                latest_start = max(s.start_time, target_shift.start_time)
+                earliest_end = min(s.end_time, target_shift.end_time)
+                delta = (earliest_end - latest_start).total_seconds() / 3600
+                if delta > 0: overlap_duration += delta
+
+            if s.start_time >= day_start and s.end_time < day_end:
+                working_today = True
+                # Recalculate Daily Hours with Deduction Logic
+                daily_hours += week_hours.paid_shift_hours(s.start_time, s.end_time, s.role_id)
+        overlaps.append(overlap_duration)
+        working.append(working_today)
+        daily.append(daily_hours)
+
+    # Weekly overtime, 16h safety limit and the structured no_plaza field for every candidate at once
+    checks = CANDIDATE_RULES(RuleContext(
+        weekly=np.array([paid_hours[emp.id] for emp, _ in candidate_objects], dtype=float),
+        daily=np.array(daily, dtype=float),
+        duration=effective_target_duration,
+        location=np.array([target_shift.location], dtype=object),
+        no_plaza=np.array([bool(emp.no_plaza) for emp, _ in candidate_objects], dtype=bool),
+    ))
+
+    results = []
+    rank = 1
+
+    for i, (emp, section) in enumerate(candidate_objects):
+        # Weekly Hours with Deduction Logic for existing Maintenance Shifts
+        weekly_hours = paid_hours[emp.id]
+        overlap_duration = overlaps[i]
+        working_today = working[i]
+        daily_hours = daily[i]
+        over_40 = not checks["weekly_overtime"][i]
+
+        status = "Available"
+        details = ""
+
+        # Check if probationary (section contains '(Probationary)')
+        is_probationary_emp = "(Probationary)" in section
+        if is_probationary_emp:
+            if emp.hire_date:
+                days_since_hire = (now - emp.hire_date).days
+                days_remaining = PROBATION_DAYS - days_since_hire
+                details = f"Probationary ({days_remaining} days left)"
+            else:
+                details = "Probationary"
+
+        # Check if this is the employee who originally had the shift (Called Out)
+        if target_shift.employee_id and emp.id == target_shift.employee_id:
+            status = "CO"
+            details = "Called Out - Original shift holder"
+        elif overlap_duration > 0:
+            status = "Working"
+            details = f"Overlap {overlap_duration:.1f}h"
+        elif working_today:
+             status = "Working"
+             details = f"Shift today ({daily_hours:.1f}h)"
+
+             # Daily Limit Logic
+             if section == "Part Time Cashiers (Priority)":
+                 limit = DAILY_HOURS_PREFERRED
+                 if daily_hours + effective_target_duration > limit:
+                     status = "OT"
+                     details = f"Daily > {limit:g}h ({daily_hours+effective_target_duration:.1f}h)"
+
+        # Global 16h Safety Warning
+        if not checks["daily_safety_limit"][i]:
+            details += f" Warning: >{DAILY_SAFETY_HOURS:g}h ({daily_hours+effective_target_duration:.1f}h)"
+
+        # Weekly OT Logic
+        if over_40:
+            status = "OT"
+            details = f"Weekly > {OVERTIME_HOURS:g}h ({weekly_hours+effective_target_duration:.1f}h)"
+
+        # Append notes about meal break to details if applicable
+        if target_shift_notes:
+             details += " (" + ", ".join(target_shift_notes) + ")"
+
+        # Note-Based Constraints Logic (compiled once per employee, see availability_mask.py)
+        violation_reason = None  # Initialize before checking
+        compiled = prefetch.compiled[emp.id]
+        start_ok = (compiled.start_mask >> target_slot) & 1
+
+        # Check the structured no_overtime field first
+        if emp.no_overtime:
+            violation_reason = "Restricted: No Overtime"
+
+        # Check the structured no_plaza field
+        if not violation_reason and not checks["no_plaza"][i]:
+            violation_reason = "Restricted: No Plaza"
+
+        # availability_grid day/shift type (only looked at when the start mask says no)
+        if not violation_reason and not start_ok and not availability_mask.grid_allows(emp.availability_grid, target_shift.start_time):
+            violation_reason = f"Unavailable: {target_day} {target_shift_type} Shift"
+
+        # Notes restrictions (NO PLAZA, NO OT, days, shifts, AFTER ...)
+        if not violation_reason and (not start_ok or compiled.notes.no_plaza or compiled.notes.no_overtime):
+            violation_reason = note_constraints.restriction_reason(compiled.notes, target_shift.start_time, target_shift.location)
+            if violation_reason:
+                status = "Unavailable"
+                # Prepend restriction to details for visibility
+                details = f"{violation_reason}. " + details
+
+        # Determine Answer Field Value
+        answer_val = ""
+        if violation_reason:
+            answer_val = "No"
+        elif overlap_duration > 0:
+            answer_val = f"OL {overlap_duration:.1f}h"
+        elif section.startswith("Page 2") or section.startswith("Page 3"):
+            # OT pages (Page 2 & 3) - don't mark as OT since they're on an OT page
+            if status == "Working":
+                answer_val = "W"
+            # else leave blank - they're expected to work OT
+        elif over_40:
+            answer_val = f"Over {OVERTIME_HOURS:g}"
+        elif status == "Working":
+            answer_val = "W"
+
+        entry = {
+            "rank": rank,
+            "section": section,
+            "id": emp.id,
+            "name": f"{emp.first_name} {emp.last_name}",
+            "phone": emp.phone,
+            "hire_date": emp.hire_date.isoformat() if emp.hire_date else None,
+            "notes": emp.notes,
+            "status": status,
+            "details": details.strip(),
+            "weekly_hours": round(weekly_hours, 1),
+            "answer": answer_val
+        }
+        results.append(entry)
+        rank += 1
+
+    return results
+
+def build_week(session, week_start, role_id=None, now=None):
+    """Call sheets for every open shift of the week: [{"shift": Shift, "candidates": [...]}]."""
+    now = now or datetime.now()
+    shifts = week_open_shifts(session, week_start, role_id)
+    prefetch = prefetch_week(session, week_start, sorted({role_group(s.role_id) for s in shifts}))
+    return [{"shift": s, "candidates": build_call_sheet(session, s, prefetch, now)} for s in shifts]
+
+# --- Printable week ---
+CASHIER_PAGES = [("Page 1", "Part Time"), ("Page 2", "Page 2: Full Time (OT)"), ("Page 3", "PT for OT")]
+CASHIER_COLUMNS = ["#", "Name", "Phone", "Hired", "Status", "Notes", "Time", "Spoke", "Ans"]
+MAINT_COLUMNS = ["#", "Name", "Phone", "Hired", "Status / Answer"]
+
+PRINT_CSS = """
+body { font-family: Arial, sans-serif; font-size: 12px; color: #000; margin: 0; }
+.sheet-section { page-break-after: always; padding: 8px; }
+h1 { font-size: 16px; text-align: center; text-transform: uppercase; border-bottom: 1px solid #000; margin: 0 0 4px; padding-bottom: 4px; }
+h2 { font-size: 12px; text-transform: uppercase; border-bottom: 1px solid #000; margin: 4px 0 2px; }
+.meta { display: flex; justify-content: space-between; margin-bottom: 4px; }
+table { width: 100%; border-collapse: collapse; }
+table.compact { font-size: 9px; }
+table.comfortable { font-size: 13px; }
+th, td { border: 1px solid #000; padding: 3px; }
+table.compact th, table.compact td { padding: 1px; }
+th { background: #e5e7eb; }
+td.section { background: #f3f4f6; text-align: center; text-transform: uppercase; font-weight: bold; font-size: 9px; }
+td.rank, td.status, td.answer { text-align: center; }
+td.name, td.status, td.answer { font-weight: bold; }
+.note { font-style: italic; }
+.signature { display: flex; justify-content: space-between; border: 1px solid #000; margin-top: 8px; padding: 4px; page-break-inside: avoid; }
+.line { display: inline-block; border-bottom: 1px solid #000; margin-left: 8px; }
+@media print { .sheet-section { padding: 0; } }
+"""
+
+def _hired(hire_date):
+    return datetime.fromisoformat(hire_date).strftime("%m/%d/%y") if hire_date else "-"
+
+def _time(dt):
+    return dt.strftime("%I:%M %p").lstrip("0")
+
+def _header(shift):
+    title = "Maintenance Call Sheet" if shift.role_id == week_hours.MAINTENANCE_ROLE_ID else "Cashier Call Sheet"
+    return (
+        f"<h1>{title}</h1>"
+        f"<div class=\"meta\"><div><b>Date:</b> {shift.start_time.strftime('%m/%d/%Y')}</div>"
+        f"<div><b>Loc:</b> {escape(shift.location or 'N/A')}</div>"
+        f"<div><b>Shift:</b> {_time(shift.start_time)} - {_time(shift.end_time)}</div></div>"
+    )
+
+def _signature():
+    return (
+        "<div class=\"signature\"><div><b>Signature:</b><span class=\"line\" style=\"width:150px\">&nbsp;</span></div>"
+        "<div><b>Date/Time:</b><span class=\"line\" style=\"width:100px\">&nbsp;</span></div></div>"
+    )
+
+def _table(columns, rows, css_class="comfortable"):
+    head = "".join(f"<th>{c}</th>" for c in columns)
+    return f"<table class=\"{css_class}\"><thead><tr>{head}</tr></thead><tbody>{''.join(rows)}</tbody></table>"
+
+def _maintenance_section(shift, candidates):
+    rows = []
+    for idx, c in enumerate(candidates, 1):
+        rows.append(
+            f"<tr><td class=\"rank\">{idx}</td><td class=\"name\">{escape(c['name'])}</td>"
+            f"<td>{escape(c['phone'] or '')}</td><td>{_hired(c['hire_date'])}</td>"
+            f"<td class=\"status\">{escape(c['details']) or '&nbsp;'}</td></tr>"
+        )
+    return (
+        f"<div class=\"sheet-section\">{_header(shift)}<h2>Active Maintenance Staff</h2>"
+        f"{_table(MAINT_COLUMNS, rows)}{_signature()}</div>"
+    )
+
+def _cashier_sections(shift, candidates):
+    sections = []
+    for prefix, title in CASHIER_PAGES:
+        page = [c for c in candidates if c["section"].startswith(prefix)]
+        # Same sizing as the on-screen sheet: compact above 15 rows
+        css_class = "comfortable" if len(page) <= 15 else "compact"
+        rows = []
+        for index, c in enumerate(page):
+            if index == 0 or c["section"] != page[index - 1]["section"]:
+                rows.append(f"<tr><td colspan=\"{len(CASHIER_COLUMNS)}\" class=\"section\">{escape(c['section'])}</td></tr>")
+            note = f"<div class=\"note\">Note: {escape(c['notes'])}</div>" if c["notes"] else ""
+            rows.append(
+                f"<tr><td class=\"rank\">{c['rank']}</td><td class=\"name\">{escape(c['name'])}</td>"
+                f"<td>{escape(c['phone'] or '')}</td><td class=\"rank\">{_hired(c['hire_date'])}</td>"
+                f"<td class=\"status\">{c['status']}</td><td><div>{escape(c['details'])}</div>{note}</td>"
+                f"<td></td><td></td><td class=\"answer\">{escape(c['answer'])}</td></tr>"
+            )
+        if not rows:
+            rows.append(f"<tr><td colspan=\"{len(CASHIER_COLUMNS)}\" class=\"note\">No candidates.</td></tr>")
+        sections.append(
+            f"<div class=\"sheet-section\">{_header(shift)}<h2>{title}</h2>"
+            f"{_table(CASHIER_COLUMNS, rows, css_class)}{_signature()}</div>"
+        )
+    return "".join(sections)
+
+def render_week_html(week_start, sheets):
+    """One printable document for build_week() output, a page per sheet section."""
+    body = []
+    for sheet in sheets:
+        shift = sheet["shift"]
+        if shift.role_id == week_hours.MAINTENANCE_ROLE_ID:
+            body.append(_maintenance_section(shift, sheet["candidates"]))
+        else:
+            body.append(_cashier_sections(shift, sheet["candidates"]))
+    if not body:
+        body.append("<div class=\"sheet-section\"><h1>No open shifts</h1></div>")
+    title = f"Call Sheets - Week of {week_start.strftime('%m/%d/%Y')}"
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title}</title>"
+        f"<style>{PRINT_CSS}</style></head><body>{''.join(body)}</body></html>"
+    )
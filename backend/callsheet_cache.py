@@ -0,0 +1,186 @@
+"""
+Cache of call sheet inputs per (week, role group).
+
+Every call sheet for a maintenance or cashier shift needs the same data for its
+week: the group's candidates in seniority order and their hours and shifts for
+that week. Supervisors click through many open shifts of one week, so this is
+loaded once per (week_start, group) and reused; only the per-shift part (OT
+tiers, pages, overlap with the target) is computed per request.
+
+Entries are dropped, not patched:
+  - a shift change drops the entry for the week the shift starts in, for the
+    group its employee belongs to (shift_events, after commit)
+  - an employee or role-link change drops every week of the affected groups
+  - a recurring series created or ended, or an occurrence skipped, drops
+    everything (generated occurrences are not reported by shift_events)
+Rotation state is read per request, so calling someone does not invalidate.
+"""
+import threading
+from collections import namedtuple, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlmodel import select
+from models import Employee, EmployeeRole, Shift
+from week_hours import week_start_of, get_week_hours, MAINTENANCE_ROLE_ID
+import shift_events
+import shift_series
+
+CASHIER_ROLE_IDS = [3, 7, 8]
+SUPERVISOR_ROLE_ID = 5
+GROUPS = ("maintenance", "cashier")
+
+# employees: Employee snapshots (not bound to any session) sorted by hire date
+# shifts: {employee_id: [ShiftSpan]} starting in the week
+CallSheetGroup = namedtuple("CallSheetGroup", "employees raw_hours paid_hours shifts")
+
+def role_group(role_id):
+    if role_id == MAINTENANCE_ROLE_ID:
+        return "maintenance"
+    if role_id in CASHIER_ROLE_IDS:
+        return "cashier"
+    return None
+
+def _snapshot(employee):
+    return Employee(**employee.model_dump())
+
+def load_group(session, group, week_start):
+    """Reads a CallSheetGroup from the database (no caching)."""
+    supervisors = set(session.exec(select(EmployeeRole.employee_id).where(EmployeeRole.role_id == SUPERVISOR_ROLE_ID)).all())
+    if group == "maintenance":
+        query = select(Employee).where(Employee.default_role_id == MAINTENANCE_ROLE_ID)
+    else:
+        query = select(Employee).where(Employee.default_role_id.in_(CASHIER_ROLE_IDS), Employee.is_active != False)
+    employees = [e for e in session.exec(query).all() if e.id not in supervisors]
+    employees.sort(key=lambda e: e.hire_date or datetime.max)
+    ids = [e.id for e in employees]
+
+    week_end = week_start + timedelta(days=7)
+    shifts = {emp_id: [] for emp_id in ids}
+    if ids:
+        for s in session.exec(select(Shift).where(Shift.employee_id.in_(ids), Shift.start_time >= week_start, Shift.start_time < week_end)).all():
+            shifts[s.employee_id].append(shift_events.span_of(s))
+        for s in shift_series.expand(session, week_start, week_end, ids):
+            if s.start_time >= week_start:
+                shifts[s.employee_id].append(shift_events.span_of(s))
+    return CallSheetGroup(
+        [_snapshot(e) for e in employees],
+        get_week_hours(session, ids, week_start),
+        get_week_hours(session, ids, week_start, paid=True),
+        shifts,
+    )
+
+class CallSheetCache:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}  # (week_start, group) -> CallSheetGroup
+        self._members = {}  # (week_start, group) -> set of employee ids
+        self._generation = defaultdict(int)  # group -> bumped on every invalidation of that group
+        self.stats = {group: {"hits": 0, "misses": 0, "invalidations": 0} for group in GROUPS}
+
+    def get(self, session, group, week_start):
+        key = (week_start, group)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.stats[group]["hits"] += 1
+                return entry
+            self.stats[group]["misses"] += 1
+            generation = self._generation[group]
+        entry = load_group(session, group, week_start)
+        with self._lock:
+            # Skip storing if a commit invalidated the group while we were loading
+            if self._generation[group] == generation:
+                self._entries[key] = entry
+                self._members[key] = {e.id for e in entry.employees}
+        return entry
+
+    def _drop(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._members.pop(key, None)
+            self.stats[key[1]]["invalidations"] += 1
+
+    def invalidate_shifts(self, changes):
+        with self._lock:
+            # Loads running right now may have read the old rows; do not let them store
+            for group in GROUPS:
+                self._generation[group] += 1
+            for change in changes:
+                for span in (change.before, change.after):
+                    if span is None or span.employee_id is None or span.start_time is None:
+                        continue
+                    week = week_start_of(span.start_time)
+                    for group in GROUPS:
+                        key = (week, group)
+                        if span.employee_id in self._members.get(key, ()):
+                            self._drop(key)
+
+    def invalidate_groups(self, groups):
+        with self._lock:
+            for group in groups:
+                self._generation[group] += 1
+                for key in [k for k in self._entries if k[1] == group]:
+                    self._drop(key)
+
+    def clear(self):
+        self.invalidate_groups(GROUPS)
+
+    def report(self):
+        with self._lock:
+            report = {"entries": len(self._entries), "groups": {}}
+            for group, counts in self.stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                report["groups"][group] = {**counts, "hit_rate": round(counts["hits"] / lookups, 3) if lookups else None}
+            return report
+
+callsheet_cache = CallSheetCache()
+
+@shift_events.on_commit
+def invalidate_committed_shifts(changes):
+    callsheet_cache.invalidate_shifts(changes)
+
+# --- Employee changes ---
+def _groups_of(session, employee_ids):
+    groups = set()
+    for role_id in session.connection().execute(
+        select(Employee.__table__.c.default_role_id).where(Employee.__table__.c.id.in_(list(employee_ids)))
+    ).scalars():
+        groups.add(role_group(role_id))
+    return groups
+
+@event.listens_for(Session, "after_flush")
+def _collect_employee_changes(session, flush_context):
+    groups = set()
+    linked = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Employee):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            history = inspect(obj).attrs.default_role_id.history
+            for role_id in (history.deleted or []) + [obj.default_role_id]:
+                groups.add(role_group(role_id))
+        elif isinstance(obj, EmployeeRole) and obj.role_id == SUPERVISOR_ROLE_ID:
+            linked.add(obj.employee_id)
+    if linked:
+        groups |= _groups_of(session, linked)
+    groups.discard(None)
+    if groups:
+        session.info.setdefault("callsheet_groups", set()).update(groups)
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_employee_changes(orm_execute_state):
+    # Set-based UPDATE/DELETE of employees or role links (e.g. update_employee replacing role_ids)
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in (Employee, EmployeeRole):
+            orm_execute_state.session.info.setdefault("callsheet_groups", set()).update(GROUPS)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_employees(session):
+    groups = session.info.pop("callsheet_groups", None)
+    if groups:
+        callsheet_cache.invalidate_groups(groups)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_employees(session):
+    session.info.pop("callsheet_groups", None)
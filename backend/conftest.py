@@ -0,0 +1,18 @@
+"""
+Shared setup of the backend tests. pytest loads this file on its own; the test
+scripts import from it, so they still run directly (python test_x.py).
+"""
+import os
+import tempfile
+from datetime import datetime
+from sqlmodel import SQLModel, create_engine
+import models  # noqa: F401  (registers the tables)
+
+SAT = datetime(2025, 1, 4)  # A Saturday: the first day of a week (week_hours.week_start_of)
+
+def make_engine(**connect_args):
+    """Engine on an empty schedule database, all tables created, in a new temporary directory."""
+    path = os.path.join(tempfile.mkdtemp(), "schedule.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args=connect_args)
+    SQLModel.metadata.create_all(engine)
+    return engine
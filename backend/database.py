@@ -1,13 +1,98 @@
+import os
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
 
 sqlite_file_name = "schedule.db"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+# Set SCHEDULER_SQL_ECHO=1 to print every SQL statement (debugging only)
+SQL_ECHO = os.environ.get("SCHEDULER_SQL_ECHO", "").lower() in ("1", "true", "yes")
+
+# Pragmas applied to every new connection.
+# WAL lets the calendar keep reading while an import or a drag is writing,
+# NORMAL sync is safe under WAL, and busy_timeout makes writers queue instead of failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms
+    "mmap_size": 268435456,  # 256 MB
+    "cache_size": -65536,  # negative = KiB, i.e. 64 MB
+    "temp_store": "MEMORY",
+}
+
+# FastAPI runs sync endpoints in a threadpool of 40 workers, so allow that many connections
+POOL_SIZE = int(os.environ.get("SCHEDULER_DB_POOL_SIZE", 20))
+POOL_MAX_OVERFLOW = int(os.environ.get("SCHEDULER_DB_POOL_OVERFLOW", 20))
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def make_engine(url=sqlite_url, echo=None):
+    """Creates a SQLite engine with the production pragma profile and connection pool."""
+    engine = create_engine(
+        url,
+        echo=SQL_ECHO if echo is None else echo,
+        connect_args={"check_same_thread": False},
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+    event.listen(engine, "connect", _apply_pragmas)
+    return engine
+
+engine = make_engine()
+
+def ensure_indexes(bind=engine):
+    """Create any declared index that is missing from an existing database.
+
+    create_all() only builds indexes together with new tables, so databases
+    created before an index was declared never get it. Returns the names created.
+    """
+    from sqlalchemy import inspect
+
+    inspector = inspect(bind)
+    created = []
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+                created.append(index.name)
+    return created
+
+def ensure_columns(bind=engine):
+    """Add declared nullable columns that are missing from existing tables.
+
+    Like ensure_indexes(), this covers databases created before a column was
+    declared. Only nullable columns without a server default are added; anything
+    else still needs its own migration script. Returns "table.column" names added.
+    """
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(bind)
+    added = []
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable or column.primary_key:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            added.append(f"{table.name}.{column.name}")
+    return added
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    ensure_columns()
+    ensure_indexes()
 
 def get_session():
     with Session(engine) as session:
@@ -40,6 +40,12 @@ def main():
     # Get headers
     headers = [cell.value for cell in ws[1]]
     
+    # Notes and grid are written directly, so drop what the server derived from them;
+    # it re-parses/recompiles those employees on its next start
+    cursor.execute("PRAGMA table_info(employee)")
+    columns = [col[1] for col in cursor.fetchall()]
+    stale = [c for c in ("notes_parser_version", "availability_mask", "start_mask") if c in columns]
+    
     days = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
     shifts = ['1st', '2nd', '3rd']
     
@@ -105,6 +111,9 @@ def main():
                 emp_id
             ))
             
+            if stale:
+                cursor.execute(f"UPDATE employee SET {', '.join(c + ' = NULL' for c in stale)} WHERE id = ?", (emp_id,))
+            
             updated += 1
             print(f"Updated: {first_name} {last_name} (ID: {emp_id})")
             
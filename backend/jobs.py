@@ -0,0 +1,194 @@
+"""
+Background jobs, persisted in the job table of schedule.db.
+
+The heavy endpoints (OCR import, apply-schedule, Excel export, autofill) take
+?async=true: the request stores a Job and returns its id, and a bounded pool of
+worker threads (SCHEDULER_JOB_WORKERS, default 2) runs it with its own session.
+
+    GET  /jobs/               recent jobs
+    GET  /jobs/{id}           status, progress, message, error
+    GET  /jobs/{id}/result    the JSON result, or the file the job produced
+    POST /jobs/{id}/cancel    queued jobs stop at once, running ones at their
+                              next progress report
+
+Handlers register with @handler(kind) and are called with (job, params), job
+being a JobContext. job.progress(fraction, message) records progress and raises
+JobCancelled once cancellation was requested. Uploads a job needs and files it
+produces live in JOB_DIR, so its inputs outlive the request.
+
+Jobs survive restarts: runner.start() (at startup) puts jobs that were running
+when the process stopped back in the queue and submits every queued job.
+"""
+import json
+import os
+import shutil
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlmodel import Session, select
+from models import Job
+
+JOB_WORKERS = int(os.environ.get("SCHEDULER_JOB_WORKERS", 2))
+JOB_DIR = os.environ.get("SCHEDULER_JOB_DIR", "job_files")
+FINISHED = ("succeeded", "failed", "cancelled")
+
+_handlers = {}  # kind -> fn(job, params)
+
+def handler(kind):
+    """Registers fn(job, params) as the handler of jobs of this kind; its return value is the JSON result."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+class JobCancelled(Exception):
+    pass
+
+class JobContext:
+    def __init__(self, runner, job_id):
+        self.runner = runner
+        self.id = job_id
+        self.result_file = None
+
+    @property
+    def upload_path(self):
+        """File the request stored for this job (submit(..., upload=...))."""
+        return self.runner.path(self.id, "upload")
+
+    def progress(self, fraction, message=None):
+        """Records progress (0..1). Raises JobCancelled when the job is to stop."""
+        with Session(self.runner.engine) as session:
+            job = session.get(Job, self.id)
+            job.progress = round(min(max(fraction, 0.0), 1.0), 4)
+            if message is not None:
+                job.message = message
+            session.add(job)
+            session.commit()
+            if job.cancel_requested:
+                raise JobCancelled()
+
+    def save_file(self, data, filename):
+        """Stores a produced file, served by GET /jobs/{id}/result as filename."""
+        path = self.runner.path(self.id, filename)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.result_file = path
+        return path
+
+class JobRunner:
+    def __init__(self):
+        self.engine = None
+        self.workers = JOB_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self, engine, workers=None, job_dir=None):
+        """Binds the runner to engine and resumes unfinished jobs. Returns the number resumed."""
+        global JOB_DIR
+        self.engine = engine
+        if workers:
+            self.workers = workers
+        if job_dir:
+            JOB_DIR = job_dir
+        os.makedirs(JOB_DIR, exist_ok=True)
+        with Session(engine) as session:
+            for job in session.exec(select(Job).where(Job.status == "running")).all():
+                job.status = "queued"
+                job.message = "Requeued after restart"
+                session.add(job)
+            session.commit()
+            queued = session.exec(select(Job.id).where(Job.status == "queued").order_by(Job.id)).all()
+        for job_id in queued:
+            self._pool().submit(self._run, job_id)
+        return len(queued)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def path(self, job_id, name):
+        return os.path.join(JOB_DIR, f"{job_id}_{name}")
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            return self._executor
+
+    def submit(self, kind, params, upload=None):
+        """Stores a queued job and hands it to the pool. Returns the Job.
+
+        upload: bytes, or the path of a spooled file the job takes over (moved to JOB_DIR)."""
+        if kind not in _handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        with Session(self.engine) as session:
+            job = Job(kind=kind, params=json.dumps(params, default=str))
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+        if isinstance(upload, (bytes, bytearray)):
+            with open(self.path(job.id, "upload"), "wb") as f:
+                f.write(upload)
+        elif upload is not None:
+            shutil.move(upload, self.path(job.id, "upload"))
+        self._pool().submit(self._run, job.id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancels a queued job, or asks a running one to stop. Returns the Job (None when missing)."""
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = datetime.utcnow()
+            job.cancel_requested = True
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+
+    def _run(self, job_id):
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            if job is None or job.status != "queued":
+                return  # Cancelled (or taken) while waiting
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job.attempts += 1
+            session.add(job)
+            session.commit()
+            kind, params = job.kind, json.loads(job.params)
+
+        context = JobContext(self, job_id)
+        try:
+            result = _handlers[kind](context, params)
+            self._finish(job_id, "succeeded", result=json.dumps(result, default=str), result_file=context.result_file)
+        except JobCancelled:
+            self._finish(job_id, "cancelled")
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job_id, "failed", error=str(e) or type(e).__name__)
+        finally:
+            upload = context.upload_path
+            if os.path.exists(upload):
+                os.remove(upload)
+
+    def _finish(self, job_id, status, **fields):
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            job.status = status
+            job.finished_at = datetime.utcnow()
+            if status == "succeeded":
+                job.progress = 1.0
+            for key, value in fields.items():
+                setattr(job, key, value)
+            session.add(job)
+            session.commit()
+        print(f"Job {job_id} {status}")
+
+runner = JobRunner()
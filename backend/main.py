@@ -1,10 +1,26 @@
 from fastapi import FastAPI, Depends, HTTPException, Query, UploadFile, File
 from sqlmodel import SQLModel, Session, select, create_engine, delete
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta, time
-from database import create_db_and_tables, get_session
-from models import Employee, Role, Shift, Availability, EmployeeRole, EmployeeBase, RotationState
+from database import create_db_and_tables, get_session, engine
+from models import Employee, Role, Shift, Availability, EmployeeRole, EmployeeBase, RotationState, ShiftSeries, ShiftSeriesException
 from pydantic import BaseModel
+from shift_index import shift_index, get_shift_index
+import week_hours
+import availability_mask
+import note_constraints
+from callsheet_cache import callsheet_cache
+import callsheet
+import rotation
+import shift_validation
+import shift_series
+import shift_bulk
+import projection
+import jobs
+import ocr_worker
+import uploads
+from scheduling_rules import RULES
+from week_hours import week_start_of
 
 app = FastAPI()
 
@@ -70,6 +86,88 @@ def on_startup():
 
     create_db_and_tables()
 
+    # Build the in-memory shift interval index used for overlap checks
+    with Session(engine) as session:
+        count = shift_index.load(session)
+        print(f"Shift interval index loaded ({count} shifts)")
+        ledger = week_hours.check_consistency(session, repair=True)
+        if ledger["repaired"]:
+            print(f"Rebuilt employee_week_hours ledger ({ledger['ledger_shifts']} shifts counted, {ledger['shifts']} in the table)")
+        parsed = note_constraints.backfill(session)
+        if parsed:
+            print(f"Parsed notes for {parsed} employees (parser v{note_constraints.PARSER_VERSION})")
+        compiled = availability_mask.ensure_built(session)
+        if compiled:
+            print(f"Compiled availability masks for {compiled} employees")
+        # Rotation rings follow ORM employee writes; scripts may have edited employees directly
+        rotation.rebuild(session)
+        session.commit()
+
+    # Background jobs: resume what was queued or running when the server stopped
+    resumed = jobs.runner.start(engine)
+    if resumed:
+        print(f"Resumed {resumed} background jobs")
+
+    # Load the OCR model in the background so the first upload does not wait for it
+    if ocr_worker.OCR_WARMUP:
+        ocr_worker.warm_up()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    jobs.runner.shutdown(wait=False)
+    ocr_worker.shutdown()
+
+# --- Background Jobs ---
+import json
+import os
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse
+from models import Job
+
+class JobAccepted(BaseModel):
+    job_id: int
+    status: str
+
+def job_accepted(job):
+    # Response of an ?async=true request; poll GET /jobs/{job_id}
+    return {"job_id": job.id, "status": job.status}
+
+def job_or_404(session, job_id):
+    job = session.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/", response_model=List[Job])
+def read_jobs(status: Optional[str] = None, limit: int = 50, session: Session = Depends(get_session)):
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status:
+        query = query.where(Job.status == status)
+    return session.exec(query).all()
+
+@app.get("/jobs/{job_id}", response_model=Job)
+def read_job(job_id: int, session: Session = Depends(get_session)):
+    return job_or_404(session, job_id)
+
+@app.get("/jobs/{job_id}/result")
+def read_job_result(job_id: int, session: Session = Depends(get_session)):
+    job = job_or_404(session, job_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}" + (f": {job.error}" if job.error else ""))
+    if job.result_file:
+        if not os.path.exists(job.result_file):
+            raise HTTPException(status_code=410, detail="Job file no longer exists")
+        filename = os.path.basename(job.result_file).split("_", 1)[1]
+        return FileResponse(job.result_file, filename=filename)
+    return json.loads(job.result) if job.result else None
+
+@app.post("/jobs/{job_id}/cancel", response_model=Job)
+def cancel_job(job_id: int, session: Session = Depends(get_session)):
+    job = jobs.runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 from pydantic import BaseModel, ConfigDict
 
 # --- Employees ---
@@ -100,6 +198,11 @@ class EmployeeUpdate(BaseModel):
     willing_to_work_vacation_week: Optional[bool] = None
     max_weekly_hours: Optional[float] = None
     hire_date: Optional[datetime] = None
+    notes: Optional[str] = None
+    availability_grid: Optional[str] = None
+    no_overtime: Optional[bool] = None
+    no_plaza: Optional[bool] = None
+    is_active: Optional[bool] = None
     role_ids: Optional[List[int]] = None # New field for multi-role
 
 @app.put("/employees/{employee_id}", response_model=Employee)
@@ -137,12 +240,17 @@ def read_roles(session: Session = Depends(get_session)):
 def read_shifts(
     start_date: datetime,
     end_date: datetime,
+    include_templates: bool = False,  # Also preview template occurrences not applied yet (id null)
     session: Session = Depends(get_session)
 ):
     # Get shifts that overlap with the date range (not strictly within)
     # A shift overlaps if: shift_start < range_end AND shift_end > range_start
     statement = select(Shift).where(Shift.start_time < end_date).where(Shift.end_time > start_date)
     shifts = session.exec(statement).all()
+    # Plus the recurring series' occurrences in the range (generated, see shift_series.py)
+    shifts = list(shifts) + shift_series.expand(session, start_date, end_date)
+    if include_templates:
+        shifts += projection.template_preview(session, start_date, end_date)
     return shifts
 
 class ShiftCreate(BaseModel):
@@ -154,7 +262,8 @@ class ShiftCreate(BaseModel):
     location: Optional[str] = None
     booth_number: Optional[str] = None
     is_vacation: bool = False
-    repeat: Optional[str] = None # "daily", "weekly", "mon-fri"
+    repeat: Optional[str] = None # "daily", "weekly", "mon-fri" or an RRULE ("FREQ=WEEKLY;BYDAY=SA,SU")
+    repeat_until: Optional[datetime] = None # Last day to repeat on (None = forever)
     create_open_shift: bool = False # If vacation, create covering open shift
 
 class ShiftRead(BaseModel):
@@ -176,88 +285,106 @@ def create_shift(shift_data: ShiftCreate, session: Session = Depends(get_session
     if shift_data.end_time <= shift_data.start_time:
         raise HTTPException(status_code=400, detail="End time must be after start time")
     
-    # 1. Base Shift Data
-    shifts_to_create = []
-    
-    # Calculate duration
-    duration = shift_data.end_time - shift_data.start_time
-    
-    # Determine start dates based on recurrence
-    start_dates = [shift_data.start_time]
-    
+    # Recurring shifts are stored once as a series and expanded on read
     if shift_data.repeat:
-        # Generate for next 4 weeks (28 days)
-        current = shift_data.start_time
-        for _ in range(28): # Check next 28 days
-            current += timedelta(days=1)
-            
-            should_add = False
-            if shift_data.repeat == "daily":
-                should_add = True
-            elif shift_data.repeat == "weekly":
-                if current.weekday() == shift_data.start_time.weekday():
-                    should_add = True
-            elif shift_data.repeat == "mon-fri":
-                if current.weekday() < 5:
-                    should_add = True
-            
-            if should_add:
-                start_dates.append(current)
-                
-    # Create Shift Objects
-    parent_id = None # Will be set to first shift's ID if repeating
-    
-    created_shifts = []
+        return create_shift_series(shift_data, session)
+    
+    rows = [{
+        "employee_id": shift_data.employee_id,
+        "role_id": shift_data.role_id,
+        "start_time": shift_data.start_time,
+        "end_time": shift_data.end_time,
+        "notes": shift_data.notes,
+        "location": shift_data.location,
+        "booth_number": shift_data.booth_number,
+        "is_vacation": shift_data.is_vacation,
+    }]
+    
+    # Handle Vacation Cover
+    if shift_data.is_vacation and shift_data.create_open_shift:
+        # Open shift covering the vacation, linked to it
+        rows.append({
+            "employee_id": None,
+            "role_id": shift_data.role_id,
+            "start_time": shift_data.start_time,
+            "end_time": shift_data.end_time,
+            "notes": f"Cover for {shift_data.notes or 'Vacation'}",
+            "parent": 0,
+        })
     
-    for i, start_dt in enumerate(start_dates):
-        end_dt = start_dt + duration
-        
-        # Conflict Check (Skip for Vacation? Maybe warn but allow? Let's check for now)
-        # If vacation, we might want to allow it even if there's a work shift (and maybe delete work shift?)
-        # For MVP, simple check.
-        
-        # Create Shift
-        shift = Shift(
-            employee_id=shift_data.employee_id,
-            role_id=shift_data.role_id,
-            start_time=start_dt,
-            end_time=end_dt,
-            notes=shift_data.notes,
-            location=shift_data.location,
-            booth_number=shift_data.booth_number,
-            is_vacation=shift_data.is_vacation,
-            parent_id=parent_id
-        )
-        session.add(shift)
-        session.commit()
-        session.refresh(shift)
-        
-        if i == 0 and len(start_dates) > 1:
-            parent_id = shift.id
-            shift.parent_id = shift.id # Self-reference for parent
-            session.add(shift)
-            session.commit()
-            
-        created_shifts.append(shift)
-        
-        # Handle Vacation Cover
-        if shift_data.is_vacation and shift_data.create_open_shift:
-            # Create Open Shift
-            open_shift = Shift(
-                employee_id=None, # Open
-                role_id=shift_data.role_id,
-                start_time=start_dt,
-                end_time=end_dt,
-                notes=f"Cover for {shift_data.notes or 'Vacation'}"
-            )
-            session.add(open_shift)
-            session.commit()
-            created_shifts.append(open_shift)
-            
-            created_shifts.append(open_shift)
-            
+    # One insert and one commit for the shift and its cover
+    created_shifts = shift_bulk.insert_shifts(session, rows)
+    session.commit()
     return created_shifts
 
+# Days of occurrences returned when a series is created (the old repeat window)
+SERIES_PREVIEW_DAYS = 29
+
+def create_shift_series(shift_data: ShiftCreate, session: Session):
+    try:
+        shift_series.check_rule(shift_data.repeat, shift_data.start_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    until = None
+    if shift_data.repeat_until:
+        until = shift_data.repeat_until.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        if until <= shift_data.start_time:
+            raise HTTPException(status_code=400, detail="repeat_until must not be before the first shift")
+    
+    series = ShiftSeries(
+        employee_id=shift_data.employee_id,
+        role_id=shift_data.role_id,
+        start_time=shift_data.start_time,
+        end_time=shift_data.end_time,
+        rule=shift_data.repeat,
+        until=until,
+        notes=shift_data.notes,
+        location=shift_data.location,
+        booth_number=shift_data.booth_number,
+        is_vacation=shift_data.is_vacation
+    )
+    created = [series]
+    if shift_data.is_vacation and shift_data.create_open_shift:
+        # Covering open shifts repeat alongside the vacation
+        created.append(ShiftSeries(
+            employee_id=None,
+            role_id=shift_data.role_id,
+            start_time=shift_data.start_time,
+            end_time=shift_data.end_time,
+            rule=shift_data.repeat,
+            until=until,
+            notes=f"Cover for {shift_data.notes or 'Vacation'}"
+        ))
+    session.add_all(created)
+    session.commit()
+    callsheet_cache.clear()
+    
+    preview_end = shift_data.start_time + timedelta(days=SERIES_PREVIEW_DAYS)
+    return sorted(
+        [shift_series.occurrence(s, start) for s in created for start in shift_series.starts(s, s.start_time, preview_end)],
+        key=lambda shift: shift.start_time
+    )
+
+@app.get("/shift-series/", response_model=List[ShiftSeries])
+def read_shift_series(session: Session = Depends(get_session)):
+    return session.exec(select(ShiftSeries).order_by(ShiftSeries.start_time)).all()
+
+@app.delete("/shift-series/{series_id}")
+def delete_shift_series(series_id: int, from_date: Optional[datetime] = None, session: Session = Depends(get_session)):
+    """Ends a series: occurrences from from_date on stop (default: the whole series). Materialized shifts are kept."""
+    series = session.get(ShiftSeries, series_id)
+    if not series:
+        raise HTTPException(status_code=404, detail="Series not found")
+    if from_date and from_date > series.start_time:
+        series.until = min(series.until, from_date) if series.until else from_date
+        session.add(series)
+    else:
+        session.exec(delete(ShiftSeriesException).where(ShiftSeriesException.series_id == series_id))
+        session.delete(series)
+    session.commit()
+    callsheet_cache.clear()
+    return {"ok": True}
+
 @app.get("/shifts/agenda/{employee_id}", response_model=List[Shift])
 def get_agenda(employee_id: int, session: Session = Depends(get_session)):
     # Get future shifts for employee
@@ -266,7 +393,9 @@ def get_agenda(employee_id: int, session: Session = Depends(get_session)):
         Shift.employee_id == employee_id,
     ).order_by(Shift.start_time)
     shifts = session.exec(statement).all()
-    return shifts
+    # Recurring occurrences are generated for the next SERIES_PREVIEW_DAYS
+    generated = shift_series.expand(session, now, now + timedelta(days=SERIES_PREVIEW_DAYS), [employee_id])
+    return sorted(list(shifts) + generated, key=lambda shift: shift.start_time)
 
 class ShiftUpdate(BaseModel):
     employee_id: Optional[int] = None
@@ -282,14 +411,15 @@ class ShiftUpdate(BaseModel):
 
 @app.get("/shifts/{shift_id}", response_model=ShiftRead)
 def get_shift(shift_id: int, session: Session = Depends(get_session)):
-    shift = session.get(Shift, shift_id)
+    shift = shift_series.get(session, shift_id)
     if not shift:
         raise HTTPException(status_code=404, detail="Shift not found")
     return shift
 
 @app.put("/shifts/{shift_id}", response_model=Shift)
 def update_shift(shift_id: int, shift_data: ShiftUpdate, session: Session = Depends(get_session)):
-    shift = session.get(Shift, shift_id)
+    # Editing a recurring occurrence writes it as its own shift first
+    shift = session.get(Shift, shift_id) if shift_id >= 0 else shift_series.materialize(session, shift_id)
     if not shift:
         raise HTTPException(status_code=404, detail="Shift not found")
     
@@ -311,13 +441,9 @@ def update_shift(shift_id: int, shift_data: ShiftUpdate, session: Session = Depe
         if end_time <= start_time:
             raise HTTPException(status_code=400, detail="End time must be after start time")
         
-        statement = select(Shift).where(
-            Shift.employee_id == update_data['employee_id'],
-            Shift.start_time < end_time,
-            Shift.end_time > start_time,
-            Shift.id != shift_id
-        )
-        conflicts = session.exec(statement).all()
+        conflicts = get_shift_index(session).overlapping(update_data['employee_id'], start_time, end_time, exclude_id=shift.id)
+        # The index holds stored shifts; generated series occurrences are checked for the same window
+        conflicts = conflicts or shift_series.overlapping(session, update_data['employee_id'], start_time, end_time, exclude_id=shift.id)
         if conflicts:
             raise HTTPException(status_code=400, detail="Shift overlaps with an existing shift.")
     
@@ -332,6 +458,13 @@ def update_shift(shift_id: int, shift_data: ShiftUpdate, session: Session = Depe
 
 @app.delete("/shifts/{shift_id}")
 def delete_shift(shift_id: int, force: bool = False, session: Session = Depends(get_session)):
+    if shift_id < 0:
+        # A recurring occurrence: stop generating it
+        if not shift_series.skip(session, shift_id):
+            raise HTTPException(status_code=404, detail="Shift not found")
+        session.commit()
+        callsheet_cache.clear()
+        return {"ok": True}
     shift = session.get(Shift, shift_id)
     if not shift:
         raise HTTPException(status_code=404, detail="Shift not found")
@@ -341,68 +474,87 @@ def delete_shift(shift_id: int, force: bool = False, session: Session = Depends(
     session.commit()
     return {"ok": True}
 
+@app.get("/shift-index/consistency")
+def check_shift_index(repair: bool = False, session: Session = Depends(get_session)):
+    """Compares the in-memory overlap index with the shift table (repair=true reloads it)."""
+    return get_shift_index(session).check_consistency(session, repair=repair)
+
+@app.get("/week-hours/consistency")
+def check_week_hours(repair: bool = False, session: Session = Depends(get_session)):
+    """Compares the employee_week_hours ledger totals with the shift table (repair=true rebuilds it)."""
+    return week_hours.check_consistency(session, repair=repair)
+
 # --- Bulk Update Shifts ---
+class ShiftFilter(BaseModel):
+    start_date: Optional[datetime] = None  # Shifts starting on or after
+    end_date: Optional[datetime] = None  # Shifts starting before
+    location: Optional[str] = None
+    role_id: Optional[int] = None
+
 class BulkShiftUpdate(BaseModel):
-    shift_ids: List[int]
+    shift_ids: Optional[List[int]] = None
+    filters: Optional[ShiftFilter] = None  # Instead of (or narrowing) shift_ids, e.g. a whole week
     role_id: Optional[int] = None
     location: Optional[str] = None
     booth_number: Optional[str] = None
     is_locked: Optional[bool] = None
+    force: bool = False  # Also change locked shifts
+
+def bulk_selection(session, shift_ids, filters):
+    # ids and/or filter values for shift_bulk; at least one has to narrow the selection.
+    # Recurring occurrences (negative ids) are materialized first, as PUT /shifts/{id} does.
+    filter_values = filters.model_dump(exclude_none=True) if filters else {}
+    if not shift_ids and not filter_values:
+        raise HTTPException(status_code=400, detail="No shift IDs provided")
+    if not shift_ids:
+        return None, filter_values, {}
+    ids, materialized = shift_series.resolve(session, shift_ids)
+    return ids, filter_values, materialized
 
 @app.post("/shifts/bulk-update/")
 def bulk_update_shifts(data: BulkShiftUpdate, session: Session = Depends(get_session)):
-    if not data.shift_ids:
-        raise HTTPException(status_code=400, detail="No shift IDs provided")
-    
-    if data.role_id is None and data.location is None and data.booth_number is None and data.is_locked is None:
+    values = data.model_dump(include={"role_id", "location", "booth_number", "is_locked"}, exclude_none=True)
+    if not values:
         raise HTTPException(status_code=400, detail="No updates specified")
+    ids, filters, materialized = bulk_selection(session, data.shift_ids, data.filters)
     
-    updated_count = 0
-    for shift_id in data.shift_ids:
-        shift = session.get(Shift, shift_id)
-        if shift:
-            if data.role_id is not None:
-                shift.role_id = data.role_id
-            if data.location is not None:
-                shift.location = data.location
-            if data.booth_number is not None:
-                shift.booth_number = data.booth_number
-            if data.is_locked is not None:
-                shift.is_locked = data.is_locked
-            session.add(shift)
-            updated_count += 1
-    
+    # Locked shifts only take lock changes (as in PUT /shifts/{id}), unless forced
+    updated_ids, skipped_ids = shift_bulk.update_shifts(session, values, ids, filters, skip_locked=shift_bulk.skips_locked(values, data.force))
     session.commit()
-    return {"ok": True, "updated_count": updated_count}
+    return {"ok": True, "updated_count": len(updated_ids), "updated_ids": updated_ids, "skipped_locked_ids": skipped_ids,
+            "materialized_ids": materialized}
 
 # --- Bulk Delete Shifts ---
 class BulkShiftDelete(BaseModel):
-    shift_ids: List[int]
+    shift_ids: Optional[List[int]] = None
+    filters: Optional[ShiftFilter] = None
+    force: bool = False  # Also delete locked shifts
 
 @app.post("/shifts/bulk-delete/")
 def bulk_delete_shifts(data: BulkShiftDelete, session: Session = Depends(get_session)):
-    if not data.shift_ids:
-        raise HTTPException(status_code=400, detail="No shift IDs provided")
-    
-    deleted_count = 0
-    for shift_id in data.shift_ids:
-        shift = session.get(Shift, shift_id)
-        if shift:
-            session.delete(shift)
-            deleted_count += 1
+    ids, filters, materialized = bulk_selection(session, data.shift_ids, data.filters)
     
+    # A deleted materialized occurrence keeps its exception, so the series stops generating it
+    deleted_ids, skipped_ids = shift_bulk.delete_shifts(session, ids, filters, skip_locked=not data.force)
     session.commit()
-    return {"ok": True, "deleted_count": deleted_count}
+    return {"ok": True, "deleted_count": len(deleted_ids), "deleted_ids": deleted_ids, "skipped_locked_ids": skipped_ids,
+            "materialized_ids": materialized}
 
 # --- Project Locked Shifts to Future Weeks ---
 class ProjectLockedRequest(BaseModel):
     base_week_start: datetime  # Saturday of the base week
     num_weeks: int = 4  # Number of future weeks to project to
+    dry_run: bool = False  # Return the plan without writing it
+
+def projection_result(plan, dry_run):
+    # Per-week counts, plus the planned shifts and deletions on a dry run
+    result = {"ok": True, "dry_run": dry_run, "weeks": plan.weeks()}
+    if dry_run:
+        result.update(plan.preview())
+    return result
 
 @app.post("/shifts/project-locked/")
 def project_locked_shifts(data: ProjectLockedRequest, session: Session = Depends(get_session)):
-    from datetime import timedelta
-    
     # Get all locked shifts in the base week
     base_week_end = data.base_week_start + timedelta(days=7)
     locked_shifts = session.exec(
@@ -410,68 +562,55 @@ def project_locked_shifts(data: ProjectLockedRequest, session: Session = Depends
             Shift.is_locked == True,
             Shift.start_time >= data.base_week_start,
             Shift.start_time < base_week_end
-        )
+        ).order_by(Shift.start_time, Shift.id)
     ).all()
     
     if not locked_shifts:
         raise HTTPException(status_code=400, detail="No locked shifts found in the base week")
     
-    created_count = 0
-    updated_count = 0
-    
-    for week_offset in range(1, data.num_weeks + 1):
-        days_offset = timedelta(days=7 * week_offset)
-        
-        for base_shift in locked_shifts:
-            new_start = base_shift.start_time + days_offset
-            new_end = base_shift.end_time + days_offset
-            
-            # Target day range
-            target_day_start = new_start.replace(hour=0, minute=0, second=0, microsecond=0)
-            target_day_end = target_day_start + timedelta(days=1)
-            
-            # Check for existing shifts for this employee on this day
-            existing_shifts = session.exec(
-                select(Shift).where(
-                    Shift.employee_id == base_shift.employee_id,
-                    Shift.start_time >= target_day_start,
-                    Shift.start_time < target_day_end
-                )
-            ).all()
-            
-            # Logic:
-            # 1. If any existing shift is LOCKED, skip this projection (conflict with another master)
-            # 2. If existing shifts are UNLOCKED, delete them (assume we are overwriting with new master)
-            
-            has_locked_conflict = any(s.is_locked for s in existing_shifts)
-            if has_locked_conflict:
-                continue # Skip, respect future lock
-            
-            # Delete existing unlocked shifts on this day to prevent recurrence duplicates
-            for s in existing_shifts:
-                session.delete(s)
-                updated_count += 1 # Count deletions as updates
-            
-            # Create new projected shift
-            new_shift = Shift(
-                employee_id=base_shift.employee_id,
-                role_id=base_shift.role_id,
-                start_time=new_start,
-                end_time=new_end,
-                notes=base_shift.notes,
-                location=base_shift.location,
-                booth_number=base_shift.booth_number,
-                is_locked=False,  # Projected shifts are not locked
-                is_vacation=base_shift.is_vacation
-            )
-            session.add(new_shift)
-            created_count += 1
+    # Whole horizon at once: targets, one query for what is there, diff, bulk write (see projection.py)
+    week_starts, rows = projection.locked_targets(locked_shifts, data.base_week_start, data.num_weeks)
+    plan = projection.plan_locked(week_starts, rows, projection.existing_shifts(session, rows))
+    if not data.dry_run:
+        projection.apply(session, plan)
+        session.commit()
     
-    session.commit()
-    return {"ok": True, "created_count": created_count, "deleted_old_count": updated_count, "weeks_projected": data.num_weeks}
+    result = projection_result(plan, data.dry_run)
+    result.update({"created_count": len(plan.creates), "deleted_old_count": len(plan.deletes), "weeks_projected": data.num_weeks})
+    return result
 
 # --- Shift Templates (Master Schedule) ---
-from models import ShiftTemplate
+from models import ShiftTemplate, TemplateCycle
+
+@app.get("/template-cycles/", response_model=List[TemplateCycle])
+def read_template_cycles(session: Session = Depends(get_session)):
+    return session.exec(select(TemplateCycle)).all()
+
+class TemplateCycleRequest(BaseModel):
+    name: str
+    length_weeks: int = 2
+    anchor_date: datetime  # First day of cycle week 0
+
+@app.post("/template-cycles/", response_model=TemplateCycle)
+def create_template_cycle(data: TemplateCycleRequest, session: Session = Depends(get_session)):
+    if data.length_weeks < 1:
+        raise HTTPException(status_code=400, detail="length_weeks must be at least 1")
+    cycle = TemplateCycle(name=data.name, length_weeks=data.length_weeks, anchor_date=data.anchor_date)
+    session.add(cycle)
+    session.commit()
+    session.refresh(cycle)
+    return cycle
+
+@app.delete("/template-cycles/{cycle_id}")
+def delete_template_cycle(cycle_id: int, session: Session = Depends(get_session)):
+    cycle = session.get(TemplateCycle, cycle_id)
+    if not cycle:
+        raise HTTPException(status_code=404, detail="Cycle not found")
+    if session.exec(select(ShiftTemplate.id).where(ShiftTemplate.cycle_id == cycle_id)).first() is not None:
+        raise HTTPException(status_code=400, detail="Cycle still has templates")
+    session.delete(cycle)
+    session.commit()
+    return {"ok": True}
 
 @app.get("/templates/", response_model=List[ShiftTemplate])
 def read_templates(session: Session = Depends(get_session)):
@@ -485,10 +624,20 @@ class ShiftTemplateRequest(BaseModel):
     end_time: str
     location: Optional[str] = None
     booth_number: Optional[str] = None
+    cycle_id: Optional[int] = None  # Rotation the template belongs to (None = every week)
+    cycle_week: int = 0  # Week of the rotation it applies in
     sync_to_locked: bool = False
 
 @app.post("/templates/", response_model=ShiftTemplate)
 def create_template(data: ShiftTemplateRequest, session: Session = Depends(get_session)):
+    cycle = None
+    if data.cycle_id is not None:
+        cycle = session.get(TemplateCycle, data.cycle_id)
+        if not cycle:
+            raise HTTPException(status_code=404, detail="Cycle not found")
+        if not 0 <= data.cycle_week < cycle.length_weeks:
+            raise HTTPException(status_code=400, detail=f"cycle_week must be between 0 and {cycle.length_weeks - 1}")
+    
     template = ShiftTemplate(
         employee_id=data.employee_id,
         role_id=data.role_id,
@@ -496,75 +645,18 @@ def create_template(data: ShiftTemplateRequest, session: Session = Depends(get_s
         start_time=data.start_time,
         end_time=data.end_time,
         location=data.location,
-        booth_number=data.booth_number
+        booth_number=data.booth_number,
+        cycle_id=data.cycle_id,
+        cycle_week=data.cycle_week if cycle else None
     )
     session.add(template)
-    session.commit()
-    session.refresh(template)
     
     if data.sync_to_locked:
-        from datetime import date
-        today = datetime.now().date()
-        
-        # Calculate first occurrence of the target day
-        days_ahead = data.day_of_week - today.weekday()
-        if days_ahead < 0: 
-            days_ahead += 7
-        
-        start_date = today + timedelta(days=days_ahead)
-        
-        # Sync for 8 weeks
-        for i in range(8):
-            target_date = start_date + timedelta(weeks=i)
-            
-            # Find ANY shift for this employee on this day
-            day_start = datetime.combine(target_date, time(0,0))
-            day_end = datetime.combine(target_date, time(23,59,59))
-            
-            existing_shift = session.exec(select(Shift).where(
-                Shift.employee_id == data.employee_id,
-                Shift.start_time >= day_start,
-                Shift.start_time <= day_end
-            )).first()
-            
-            # Prepare new times
-            th, tm = map(int, data.start_time.split(':'))
-            eh, em = map(int, data.end_time.split(':'))
-            
-            new_start_dt = datetime.combine(target_date, time(th, tm))
-            
-            if data.start_time > data.end_time:
-                end_date = target_date + timedelta(days=1)
-            else:
-                end_date = target_date
-            
-            new_end_dt = datetime.combine(end_date, time(eh, em))
-            
-            if existing_shift:
-                # Update and Lock
-                existing_shift.start_time = new_start_dt
-                existing_shift.end_time = new_end_dt
-                existing_shift.role_id = data.role_id
-                existing_shift.location = data.location
-                existing_shift.booth_number = data.booth_number
-                existing_shift.is_locked = True
-                session.add(existing_shift)
-            else:
-                # Create New
-                new_shift = Shift(
-                    employee_id=data.employee_id,
-                    role_id=data.role_id,
-                    start_time=new_start_dt,
-                    end_time=new_end_dt,
-                    location=data.location,
-                    booth_number=data.booth_number,
-                    is_locked=True,
-                    is_repeating=False
-                )
-                session.add(new_shift)
-                
-        session.commit()
-
+        # Next 8 weeks of occurrences: one lookup, then batched updates/inserts (see projection.py)
+        projection.sync_locked(session, template, cycle, datetime.now().date())
+    
+    session.commit()
+    session.refresh(template)
     return template
 
 @app.delete("/templates/{template_id}")
@@ -579,77 +671,37 @@ def delete_template(template_id: int, session: Session = Depends(get_session)):
 class ApplyScheduleRequest(BaseModel):
     start_date: datetime
     num_weeks: int = 4
+    dry_run: bool = False  # Return the plan without writing it
 
 @app.post("/shifts/apply-schedule/")
-def apply_schedule(data: ApplyScheduleRequest, session: Session = Depends(get_session)):
+def apply_schedule(data: ApplyScheduleRequest, run_async: bool = Query(False, alias="async"), session: Session = Depends(get_session)):
+    if run_async:
+        return job_accepted(jobs.runner.submit("apply_schedule", data.model_dump(mode="json")))
+    return run_apply_schedule(data, session)
+
+@jobs.handler("apply_schedule")
+def apply_schedule_job(job, params):
+    with Session(engine) as session:
+        return run_apply_schedule(ApplyScheduleRequest(**params), session, job.progress)
+
+def run_apply_schedule(data, session, progress=None):
     # Applies templates to generate shifts
-    templates = session.exec(select(ShiftTemplate)).all()
+    templates, cycles = projection.load_templates(session)
     if not templates:
         raise HTTPException(status_code=400, detail="No templates found")
-        
-    created_count = 0
-    from datetime import timedelta
     
-    # Loop through weeks
-    for week_i in range(data.num_weeks):
-        # Calculate Monday of this week
-        # Assumes start_date is the start of the period
-        week_start = data.start_date + timedelta(weeks=week_i)
-        
-        for tmpl in templates:
-            # Calculate target date: Week Start + Day of Week
-            # Note: template.day_of_week 0=Monday. 
-            # If week_start is Saturday, we need to adjust.
-            # Let's assume week_start provided is the "Start of Week" (e.g. Saturday)
-            # And our Week definition is Sat=0? Or Mon=0?
-            # Model says 0=Monday.
-            # Week starts on Saturday (5). Monday is (0).
-            # So if start_date is Saturday:
-            # Sat(5), Sun(6), Mon(0), Tue(1)...
-            
-            # Simple approach: Find the date that matches the day_of_week within the 7 days following week_start containing
-            
-            for day_offset in range(7):
-                current_day = week_start + timedelta(days=day_offset)
-                if current_day.weekday() == tmpl.day_of_week:
-                    # Match! Create shift
-                    
-                    # Parse HH:MM
-                    th, tm = map(int, tmpl.start_time.split(':'))
-                    eh, em = map(int, tmpl.end_time.split(':'))
-                    
-                    s_dt = current_day.replace(hour=th, minute=tm, second=0, microsecond=0)
-                    e_dt = current_day.replace(hour=eh, minute=em, second=0, microsecond=0)
-                    
-                    # Handle overnight shifts (end < start)
-                    if e_dt <= s_dt:
-                        e_dt += timedelta(days=1)
-                        
-                    # Check for existing locked shift? (Respect Manual Locks)
-                    existing = session.exec(select(Shift).where(
-                        Shift.employee_id == tmpl.employee_id,
-                        Shift.start_time == s_dt,
-                        Shift.is_locked == True
-                    )).first()
-                    
-                    if not existing:
-                        # Create locked shift from template
-                        shift = Shift(
-                            employee_id=tmpl.employee_id,
-                            role_id=tmpl.role_id,
-                            start_time=s_dt,
-                            end_time=e_dt,
-                            location=tmpl.location,
-                            booth_number=tmpl.booth_number,
-                            is_repeating=False,
-                            is_locked=True # Template shifts are locked by default
-                        )
-                        session.add(shift)
-                        created_count += 1
-                    break
+    # Locked shift per template occurrence (in its cycle week), unless one is already locked in at that start
+    week_starts, rows = projection.template_targets(templates, cycles, data.start_date, data.num_weeks)
+    plan = projection.plan_templates(week_starts, rows, projection.existing_shifts(session, rows))
+    if progress:
+        progress(0.5, f"Planned {len(plan.creates)} shifts")
+    if not data.dry_run:
+        projection.apply(session, plan)
+        session.commit()
     
-    session.commit()
-    return {"ok": True, "created_count": created_count}
+    result = projection_result(plan, data.dry_run)
+    result.update({"created_count": len(plan.creates), "skipped_count": sum(w["skipped"] for w in result["weeks"])})
+    return result
 
 @app.post("/templates/import-from-locked/")
 def import_templates_from_locked(week_start: datetime, session: Session = Depends(get_session)):
@@ -716,109 +768,66 @@ def create_availability(avail: Availability, session: Session = Depends(get_sess
     return avail
 
 # --- Auto-Scheduler ---
-@app.post("/shifts/autofill/", response_model=List[Shift])
-def autofill_shifts(session: Session = Depends(get_session)):
-    # 1. Get all open shifts
-    open_shifts = session.exec(select(Shift).where(Shift.employee_id == None)).all()
-    
-    filled_shifts = []
-    
-    for shift in open_shifts:
-        # Get potential candidates with matching role
-        candidates = session.exec(select(Employee).where(Employee.default_role_id == shift.role_id)).all()
-        
-        best_candidate = None
-        
-        for employee in candidates:
-            # --- Check 1: Conflicts ---
-            conflict = session.exec(select(Shift).where(
-                Shift.employee_id == employee.id,
-                Shift.start_time < shift.end_time,
-                Shift.end_time > shift.start_time
-            )).first()
-            if conflict:
-                continue
-
-            # --- Check 2: Availability ---
-            # Get availability for this day of week (0=Mon, 6=Sun)
-            day_of_week = shift.start_time.weekday()
-            availabilities = session.exec(select(Availability).where(
-                Availability.employee_id == employee.id,
-                Availability.day_of_week == day_of_week
-            )).all()
-            
-            is_available = True
-            
-            # If there are "Available" (True) records, shift MUST fit inside one
-            positive_avail = [a for a in availabilities if a.is_available]
-            if positive_avail:
-                fits_in_slot = False
-                shift_start_str = shift.start_time.strftime("%H:%M")
-                shift_end_str = shift.end_time.strftime("%H:%M")
-                
-                for slot in positive_avail:
-                    if slot.start_time <= shift_start_str and slot.end_time >= shift_end_str:
-                        fits_in_slot = True
-                        break
-                if not fits_in_slot:
-                    is_available = False
-            
-            # If there are "Unavailable" (False) records, shift MUST NOT overlap
-            negative_avail = [a for a in availabilities if not a.is_available]
-            for slot in negative_avail:
-                shift_start_str = shift.start_time.strftime("%H:%M")
-                shift_end_str = shift.end_time.strftime("%H:%M")
-                
-                # Check overlap: start < slot_end AND end > slot_start
-                if shift_start_str < slot.end_time and shift_end_str > slot.start_time:
-                    is_available = False
-                    break
-            
-            if not is_available:
-                continue
-
-            # --- Check 3: Weekly Hours Cap ---
-            if employee.max_weekly_hours:
-                shift_start = shift.start_time
-                # Week starts on Saturday (5). Monday is 0.
-                # Calculate days to subtract to get to previous Saturday
-                # Mon(0)->Sat(-2 or +5), Tue(1)->Sat(-3)...
-                # Formula: (weekday + 2) % 7 is days since Saturday?
-                # 0(Mon) -> 2 days since Sat? Sat(-2), Sun(-1)? Yes.
-                # 5(Sat) -> 0 days since Sat.
-                # 6(Sun) -> 1 day since Sat.
-                days_since_saturday = (shift_start.weekday() + 2) % 7
-                start_of_week = shift_start - timedelta(days=days_since_saturday)
-                start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-                end_of_week = start_of_week + timedelta(days=7)
-                
-                weekly_shifts = session.exec(select(Shift).where(
-                    Shift.employee_id == employee.id,
-                    Shift.start_time >= start_of_week,
-                    Shift.end_time < end_of_week
-                )).all()
-                
-                current_hours = sum((s.end_time - s.start_time).total_seconds() / 3600 for s in weekly_shifts)
-                new_shift_hours = (shift.end_time - shift.start_time).total_seconds() / 3600
-                
-                if current_hours + new_shift_hours > employee.max_weekly_hours:
-                    continue
-
-            # If we passed all checks, assign this employee
-            # (Simple logic: take the first valid one. Could be optimized to balance hours)
-            best_candidate = employee
-            break
-        
-        if best_candidate:
-            shift.employee_id = best_candidate.id
-            session.add(shift)
-            filled_shifts.append(shift)
-    
-    session.commit()
-    for s in filled_shifts:
-        session.refresh(s)
-        
-    return filled_shifts
+from autofill_engine import plan_autofill, apply_plan, preview_plan
+from autofill_optimizer import optimize_autofill, DEFAULT_TIME_LIMIT
+
+class AutofillStats(BaseModel):
+    open_shifts: int
+    candidates: int
+    filled: int
+    unfilled: int
+    rounds: int = 0  # Matching rounds (greedy)
+    timings_ms: Dict[str, float] = {}
+    solver: Optional[dict] = None  # MILP statistics (optimize)
+
+class AutofillResult(BaseModel):
+    shifts: List[Shift]  # Filled shifts (proposed ones on a dry run)
+    stats: AutofillStats
+
+@app.post("/shifts/autofill/", response_model=Union[AutofillResult, JobAccepted])
+def autofill_shifts(
+    dry_run: bool = False,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    mode: str = "greedy",
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    run_async: bool = Query(False, alias="async"),
+    session: Session = Depends(get_session)
+):
+    # greedy: fill open shifts (optionally only those in [start_date, end_date)) with a
+    #   balanced matching over role, conflicts, availability and weekly hours cap.
+    # optimize: solve the week's open shifts as a MILP within time_limit seconds.
+    # Both return {"shifts": filled shifts, "stats": plan statistics (solver ones in optimize)};
+    # dry_run returns the proposed assignments without saving them.
+    if mode not in ("greedy", "optimize"):
+        raise HTTPException(status_code=400, detail="mode must be 'greedy' or 'optimize'")
+    if run_async:
+        params = {"dry_run": dry_run, "start_date": start_date, "end_date": end_date, "mode": mode, "time_limit": time_limit}
+        return job_accepted(jobs.runner.submit("autofill", params))
+    return run_autofill(session, dry_run, start_date, end_date, mode, time_limit)
+
+@jobs.handler("autofill")
+def autofill_job(job, params):
+    for key in ("start_date", "end_date"):
+        if params[key]:
+            params[key] = datetime.fromisoformat(params[key])
+    with Session(engine) as session:
+        return jsonable_encoder(run_autofill(session, progress=job.progress, **params))
+
+def run_autofill(session, dry_run, start_date, end_date, mode, time_limit, progress=None):
+    if mode == "optimize":
+        if start_date is None:
+            start_date = week_start_of(datetime.now())
+        if end_date is None:
+            end_date = start_date + timedelta(days=7)
+        plan = optimize_autofill(session, start_date, end_date, time_limit)
+    elif mode == "greedy":
+        plan = plan_autofill(session, start_date, end_date)
+    if progress:
+        progress(0.9, f"Planned {len(plan.assignments)} assignments")
+
+    filled = preview_plan(plan) if dry_run else apply_plan(session, plan)
+    return {"shifts": filled, "stats": plan.stats()}
 
 # --- Excel Import ---
 from io import BytesIO
@@ -827,15 +836,20 @@ from dateutil import parser
 
 @app.post("/import/excel/")
 async def import_excel(file: UploadFile = File(...), session: Session = Depends(get_session)):
-    contents = await file.read()
-    wb = openpyxl.load_workbook(BytesIO(contents))
-    sheet = wb.active
+    path = await uploads.spool(file)
+    try:
+        # Read-only: cell values are streamed from the file instead of loading the whole workbook
+        wb = openpyxl.load_workbook(path, read_only=True)
+        rows = list(wb.active.iter_rows(min_row=2, values_only=True))
+        wb.close()
+    finally:
+        uploads.discard(path)
     
     imported_count = 0
     errors = []
     
     # Assuming headers in row 1: Employee, Role, Date, Start Time, End Time, Notes
-    for i, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+    for i, row in enumerate(rows, start=2):
         if not row[0]: continue # Skip empty rows
         
         emp_name, role_name, date_str, start_str, end_str, notes = row[0], row[1], row[2], row[3], row[4], row[5] if len(row) > 5 else None
@@ -917,102 +931,27 @@ class ValidationRequest(BaseModel):
 
 @app.post("/shifts/validate/")
 def validate_shifts(request: ValidationRequest, session: Session = Depends(get_session)):
-    report = {
-        "valid": True,
-        "conflicts": [],
-        "overtime_warnings": []
-    }
-    
-    # Group proposed shifts by employee for OT calc
-    emp_hours = {} # {emp_id: total_hours}
-    
-    # 1. Pre-load existing hours for the relevant week(s)
-    # For simplicity, we'll just calculate based on the proposed shifts + existing shifts in DB
-    # This is a complex check, let's do a per-shift check
-    
-    for idx, shift in enumerate(request.shifts):
-        if not shift.employee_id: continue
-        
-        # Ensure datetimes
-        if isinstance(shift.start_time, str):
-            shift.start_time = parser.parse(shift.start_time)
-        if isinstance(shift.end_time, str):
-            shift.end_time = parser.parse(shift.end_time)
-            
-        # --- Conflict Check ---
-        # Check against DB
-        db_conflicts = session.exec(select(Shift).where(
-            Shift.employee_id == shift.employee_id,
-            Shift.start_time < shift.end_time,
-            Shift.end_time > shift.start_time,
-            Shift.id != shift.id # Exclude self if updating
-        )).all()
-        
-        if db_conflicts:
-            report["valid"] = False
-            report["conflicts"].append(f"Shift {idx+1} overlaps with existing shift ID {[s.id for s in db_conflicts]}")
-            
-        # Check against other proposed shifts in this batch
-        for other_idx, other_shift in enumerate(request.shifts):
-            if idx == other_idx: continue
-            if other_shift.employee_id != shift.employee_id: continue
-            
-            # Ensure datetimes for other shift too (might be redundant but safe)
-            other_start = other_shift.start_time
-            if isinstance(other_start, str): other_start = parser.parse(other_start)
-            other_end = other_shift.end_time
-            if isinstance(other_end, str): other_end = parser.parse(other_end)
-            
-            if (shift.start_time < other_end and shift.end_time > other_start):
-                 report["valid"] = False
-                 report["conflicts"].append(f"Shift {idx+1} overlaps with proposed shift {other_idx+1}")
-
-        # --- Overtime Check ---
-        # Calculate hours for this shift
-        duration = (shift.end_time - shift.start_time).total_seconds() / 3600
-        
-        # Add to accumulator
-        if shift.employee_id not in emp_hours:
-            # Fetch existing hours for this week from DB
-            employee = session.get(Employee, shift.employee_id)
-            if not employee: continue
-            
-            # Week starts on Saturday
-            days_since_saturday = (shift_start.weekday() + 2) % 7
-            start_of_week = shift_start - timedelta(days=days_since_saturday)
-            start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_week = start_of_week + timedelta(days=7)
-            
-            weekly_shifts = session.exec(select(Shift).where(
-                Shift.employee_id == shift.employee_id,
-                Shift.start_time >= start_of_week,
-                Shift.end_time < end_of_week
-            )).all()
-            
-            existing_hours = sum((s.end_time - s.start_time).total_seconds() / 3600 for s in weekly_shifts)
-            emp_hours[shift.employee_id] = {
-                "total": existing_hours,
-                "limit": employee.max_weekly_hours or 40,
-                "name": f"{employee.first_name} {employee.last_name}"
-            }
-            
-        emp_hours[shift.employee_id]["total"] += duration
+    """
+    Checks proposed shifts against each other and the schedule: overlaps (make the
+    batch invalid), rest periods under shift_validation.MIN_REST_HOURS and weekly
+    overtime (warnings). One sweep per employee, see shift_validation.py.
+    """
+    return shift_validation.validate(session, request.shifts)
 
-    # Generate OT warnings
-    for emp_id, data in emp_hours.items():
-        if data["total"] > data["limit"]:
-            report["overtime_warnings"].append(
-                f"Employee {data['name']} is projected to work {data['total']:.1f} hours (Limit: {data['limit']})"
-            )
-            
-    return report
+@app.get("/rules/")
+def get_scheduling_rules():
+    """Declared scheduling rules with per-rule evaluation counts and time, see scheduling_rules.py."""
+    return RULES.report()
 
 # --- Smart Recommendations ---
+from recommendations import Slot, recommend
+
 @app.get("/recommendations/")
 def get_recommendations(
     start_time: datetime,
     end_time: datetime,
     role_id: Optional[int] = None,
+    location: Optional[str] = None,
     session: Session = Depends(get_session)
 ):
     """
@@ -1024,263 +963,109 @@ def get_recommendations(
     4. Weekly Hours (Prefer < Max)
     5. Daily Hours (Prefer < 8)
     """
-    
-    # 1. Get candidates (Broad role check)
-    if role_id:
-        # Match if default_role_id == role_id OR role_id is in their secondary roles
-        # This is hard to do in one SQL select with SQLModel effectively without join complexity
-        # Easier to fetch all active employees and filter in python for this MVP scale (<100 employees)
-        all_emps = session.exec(select(Employee).where(Employee.is_active == True)).all()
-        candidates = []
-        for emp in all_emps:
-            # Check default role
-            if emp.default_role_id == role_id:
-                candidates.append(emp)
-                continue
-            # Check secondary roles
-            if any(r.id == role_id for r in emp.roles):
-                candidates.append(emp)
-    else:
-        candidates = session.exec(select(Employee).where(Employee.is_active == True)).all()
-    # 2. Filter and Score Employees
-    recommendations = []
-    
-    # Calculate start/end of the week for the proposed shift
-    # Week starts on Saturday (5)
-    days_since_saturday = (shift_date.weekday() + 2) % 7
-    start_of_week = shift_date - timedelta(days=days_since_saturday)
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    # Ensure naive datetime for logic consistency
-    week_start_dt = datetime.combine(start_of_week, datetime.min.time())
-    week_end_dt = datetime.combine(end_of_week, datetime.max.time())
-
-    for emp in candidates:
-        score = 100
-        reasons = []
-        is_valid = True
-        
-        # Check for Vacation in the current week
-        # We need to query if this employee has ANY vacation shift this week
-        vacation_shifts = session.exec(select(Shift).where(
-            Shift.employee_id == emp.id,
-            Shift.is_vacation == True,
-            Shift.start_time >= week_start_dt,
-            Shift.end_time <= week_end_dt
-        )).all()
-        
-        has_vacation_this_week = len(vacation_shifts) > 0
-        
-        if has_vacation_this_week:
-            if emp.is_full_time:
-                # FT: No calls if on vacation this week
-                is_valid = False
-                reasons.append("Full-time employee on vacation this week")
-            else:
-                # PT: Only if willing
-                if not emp.willing_to_work_vacation_week:
-                    is_valid = False
-                    reasons.append("Part-time employee on vacation this week and not willing to work")
-                # If willing, ensure no direct conflict (handled below) and strictly non-vacation day?
-                # The direct conflict check below handles the specific time slot.
-                # User said: "only on their non vacation shift days".
-                # If they have a vacation shift TODAY, they are busy.
-                # The conflict check below will catch if the vacation shift overlaps with the proposed time.
-                # But if the vacation shift is all day (e.g. 9-5) and we ask for 6-10?
-                # If is_vacation is True, usually implies unavailable for work that day?
-                # Current implementation: Vacation is a shift with start/end.
-                # So conflict check works.
-                if is_valid: # Only add reason if still valid
-                    reasons.append("Willing to work during vacation week")
-
-        if not is_valid:
-            continue # Skip invalid candidates
-            
-        # 1. Conflict Check
-        conflict = session.exec(select(Shift).where(
-            Shift.employee_id == emp.id,
-            Shift.start_time < end_time,
-            Shift.end_time > start_time
-        )).first()
-        if conflict:
-            is_valid = False
-            reasons.append("Has conflicting shift")
-            
-        # 2. Availability Check
-        day_of_week = start_time.weekday()
-        availabilities = session.exec(select(Availability).where(
-            Availability.employee_id == emp.id,
-            Availability.day_of_week == day_of_week
-        )).all()
-        
-        # Logic: If ANY positive availability exists, must match one.
-        # If ANY negative availability exists, must NOT overlap.
-        positive_avail = [a for a in availabilities if a.is_available]
-        if positive_avail:
-            fits = False
-            s_str = start_time.strftime("%H:%M")
-            e_str = end_time.strftime("%H:%M")
-            for slot in positive_avail:
-                if slot.start_time <= s_str and slot.end_time >= e_str:
-                    fits = True
-                    break
-            if not fits:
-                is_valid = False
-                reasons.append("Outside available hours")
-        
-        negative_avail = [a for a in availabilities if not a.is_available]
-        for slot in negative_avail:
-            s_str = start_time.strftime("%H:%M")
-            e_str = end_time.strftime("%H:%M")
-            if s_str < slot.end_time and e_str > slot.start_time:
-                is_valid = False
-                reasons.append("During unavailable block")
-                break
-                
-        if not is_valid:
-            continue # Skip invalid candidates
-            
-        # 3. Weekly Hours Check
-        # Week starts on Saturday
-        days_since_saturday = (start_time.weekday() + 2) % 7
-        start_of_week = start_time - timedelta(days=days_since_saturday)
-        start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_week = start_of_week + timedelta(days=7)
-        
-        weekly_shifts = session.exec(select(Shift).where(
-            Shift.employee_id == emp.id,
-            Shift.start_time >= start_of_week,
-            Shift.end_time < end_of_week
-        )).all()
-        
-        current_weekly_hours = sum((s.end_time - s.start_time).total_seconds() / 3600 for s in weekly_shifts)
-        new_shift_hours = (end_time - start_time).total_seconds() / 3600
-        projected_weekly = current_weekly_hours + new_shift_hours
-        
-        if emp.max_weekly_hours and projected_weekly > emp.max_weekly_hours:
-            # User Request: STRICT "None OT"
-            is_valid = False
-            reasons.append(f"Would exceed max hours ({projected_weekly:.1f} > {emp.max_weekly_hours})")
-        else:
-            reasons.append(f"Weekly: {projected_weekly:.1f} hrs")
-            
-        if not is_valid:
-            continue
-            
-        # 4. Daily Hours Check
-        # Get shifts for just this day
-        start_of_day = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
-        
-        daily_shifts = session.exec(select(Shift).where(
-            Shift.employee_id == emp.id,
-            Shift.start_time >= start_of_day,
-            Shift.end_time < end_of_day
-        )).all()
-        
-        current_daily_hours = sum((s.end_time - s.start_time).total_seconds() / 3600 for s in daily_shifts)
-        projected_daily = current_daily_hours + new_shift_hours
-        
-        if projected_daily > 8:
-            score -= 20
-            reasons.append(f"Long Day: {projected_daily:.1f} hrs")
-            
-        recommendations.append({
-            "employee": emp,
-            "score": score,
-            "reasons": reasons
+    employees, results = recommend(session, [Slot(start_time, end_time, role_id, location=location)])
+    return [
+        {"employee": employees[r["employee_id"]], "score": r["score"], "reasons": r["reasons"]}
+        for r in results[0]
+    ]
+
+class RecommendationSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    role_id: Optional[int] = None
+    location: Optional[str] = None
+
+class BatchRecommendationRequest(BaseModel):
+    shift_ids: Optional[List[int]] = None  # Existing open shifts
+    shifts: Optional[List[RecommendationSlot]] = None  # Ad-hoc slots
+    start_date: Optional[datetime] = None  # Or every open shift overlapping [start_date, end_date)
+    end_date: Optional[datetime] = None
+    role_id: Optional[int] = None  # Filter for the date range
+    limit: Optional[int] = None  # Max recommendations per slot
+
+@app.post("/recommendations/batch")
+def get_batch_recommendations(request: BatchRecommendationRequest, session: Session = Depends(get_session)):
+    """
+    Ranked employees for many slots at once, same rules as GET /recommendations/.
+    Data for the whole window is fetched once and every (slot, employee) pair is
+    scored together, so cost no longer grows with one round of queries per candidate.
+    """
+    slots = []
+    if request.shift_ids:
+        shifts = session.exec(select(Shift).where(Shift.id.in_(request.shift_ids))).all()
+        found = {s.id: s for s in shifts}
+        missing = [i for i in request.shift_ids if i not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Shifts not found: {missing}")
+        slots += [Slot.from_shift(found[i]) for i in request.shift_ids]
+    if request.shifts:
+        for s in request.shifts:
+            if s.end_time <= s.start_time:
+                raise HTTPException(status_code=400, detail="Slot end_time must be after start_time")
+        slots += [Slot(s.start_time, s.end_time, s.role_id, location=s.location) for s in request.shifts]
+    if request.start_date or request.end_date:
+        if not (request.start_date and request.end_date):
+            raise HTTPException(status_code=400, detail="start_date and end_date must be given together")
+        query = select(Shift).where(
+            Shift.employee_id == None,
+            Shift.end_time > request.start_date,
+            Shift.start_time < request.end_date
+        )
+        if request.role_id is not None:
+            query = query.where(Shift.role_id == request.role_id)
+        slots += [Slot.from_shift(s) for s in session.exec(query.order_by(Shift.start_time, Shift.id)).all()]
+    if not (request.shift_ids or request.shifts or request.start_date):
+        raise HTTPException(status_code=400, detail="Provide shift_ids, shifts or start_date/end_date")
+
+    employees, results = recommend(session, slots)
+    used = set()
+    response = []
+    for slot, ranked in zip(slots, results):
+        if request.limit is not None:
+            ranked = ranked[:request.limit]
+        used.update(r["employee_id"] for r in ranked)
+        response.append({
+            "shift_id": slot.shift_id,
+            "start_time": slot.start_time,
+            "end_time": slot.end_time,
+            "role_id": slot.role_id,
+            "recommendations": ranked
         })
-        
-    # Sort by score desc
-    # Sort by score desc, then by Hire Date asc (Seniority)
-    # We use a tuple key: (-score, hire_date)
-    # -score makes larger scores come first (since we sort ascending by default with this key)
-    # hire_date asc makes older dates come first
-    recommendations.sort(key=lambda x: (-x["score"], x["employee"].hire_date if x["employee"].hire_date else datetime.max))
-    return recommendations
+    return {
+        "slots": response,
+        "employees": {emp_id: employees[emp_id] for emp_id in sorted(used)}
+    }
 
 # --- Call Sheet Rotation ---
 @app.get("/callsheet/rotation/")
 def get_call_rotation(role_id: Optional[int] = None, session: Session = Depends(get_session)):
     """
     Returns employees sorted for call sheet rotation.
-    Group 1: Full Time (Sorted by Hire Date)
+    Group 1: Full Time (Sorted by Hire Date, starting after the last call)
     Group 2: Part Time + FT < Max Hours (Sorted by Hire Date)
     """
-    query = select(Employee)
-    if role_id:
-        query = query.where(Employee.default_role_id == role_id)
-        
-    employees = session.exec(query).all()
+    # Persisted rotation ring (rebuilt by employee writes and at startup), see rotation.py
+    next_id = rotation.next_employee_id(session, role_id)
     
-    # Calculate weekly hours for FT employees to see if they should be on PT list
-    # Week starts Saturday
-    today = datetime.now()
-    days_since_saturday = (today.weekday() + 2) % 7
-    start_of_week = today - timedelta(days=days_since_saturday)
-    start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_week = start_of_week + timedelta(days=7)
+    # Employees in seniority order with this week's hours (week starts Saturday), one query
+    rows = rotation.load_employees(session, role_id, week_start_of(datetime.now()))
     
     full_time = []
     part_time = []
     
-    for emp in employees:
-        if emp.is_full_time:
+    for emp, hours in rows:
+        if emp["is_full_time"]:
             full_time.append(emp)
             
-            # Check if under hours
-            weekly_shifts = session.exec(select(Shift).where(
-                Shift.employee_id == emp.id,
-                Shift.start_time >= start_of_week,
-                Shift.end_time < end_of_week
-            )).all()
-            
-            hours = sum((s.end_time - s.start_time).total_seconds() / 3600 for s in weekly_shifts)
-            max_hours = emp.max_weekly_hours if emp.max_weekly_hours else 40.0
-            
+            # FT under max hours also go on the PT list for extra shifts
+            max_hours = emp["max_weekly_hours"] if emp["max_weekly_hours"] else rotation.DEFAULT_MAX_HOURS
             if hours < max_hours:
-                # Add to PT list for extra shifts
-                # We clone or just append? Appending is fine, frontend handles display.
-                # Maybe add a flag or note?
                 part_time.append(emp)
         else:
             part_time.append(emp)
     
-    # Sort by Hire Date (Seniority = Oldest First)
-    # Handle None hire_date (put at end)
-    def sort_key(e):
-        return e.hire_date if e.hire_date else datetime.max
-        
-    full_time.sort(key=sort_key)
-    part_time.sort(key=sort_key)
-    
-    # Apply Rotation to Full Time List
     # "Start at the person after the last call"
-    # 1. Find the employee with the most recent last_call_time
-    last_called_emp = None
-    most_recent_time = datetime.min
-    
-    for emp in full_time:
-        if emp.last_call_time and emp.last_call_time > most_recent_time:
-            most_recent_time = emp.last_call_time
-            last_called_emp = emp
-            
-    if last_called_emp:
-        try:
-            # Find index in the seniority-sorted list
-            # We use ID to match to avoid object identity issues if session refreshed
-            idx = -1
-            for i, e in enumerate(full_time):
-                if e.id == last_called_emp.id:
-                    idx = i
-                    break
-            
-            if idx != -1:
-                # Rotate: Elements after idx come first, then elements up to and including idx
-                # List: [A, B, C, D] -> Last Called B (idx 1) -> [C, D, A, B]
-                full_time = full_time[idx+1:] + full_time[:idx+1]
-        except ValueError:
-            pass # Should not happen given logic above
+    full_time = rotation.rotate(full_time, next_id)
 
     return {
         "full_time": full_time,
@@ -1293,8 +1078,7 @@ def update_last_call(employee_id: int, session: Session = Depends(get_session)):
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
         
-    employee.last_call_time = datetime.now()
-    session.add(employee)
+    rotation.mark_called(session, employee)
     session.commit()
     session.refresh(employee)
     return employee
@@ -1317,10 +1101,26 @@ def login(request: LoginRequest):
         raise HTTPException(status_code=401, detail="Invalid password")
 
 # --- Excel Export ---
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, HTMLResponse
 
 @app.get("/export/excel/")
-def export_excel(session: Session = Depends(get_session)):
+def export_excel(run_async: bool = Query(False, alias="async"), session: Session = Depends(get_session)):
+    if run_async:
+        return job_accepted(jobs.runner.submit("export_excel", {}))
+    buffer = build_excel_export(session)
+    headers = {
+        'Content-Disposition': 'attachment; filename="schedule_export.xlsx"'
+    }
+    return StreamingResponse(buffer, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+@jobs.handler("export_excel")
+def export_excel_job(job, params):
+    with Session(engine) as session:
+        buffer = build_excel_export(session)
+    job.save_file(buffer.getvalue(), "schedule_export.xlsx")
+    return {"filename": "schedule_export.xlsx"}
+
+def build_excel_export(session):
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Schedule"
@@ -1329,12 +1129,21 @@ def export_excel(session: Session = Depends(get_session)):
     headers = ["Employee", "Role", "Date", "Start Time", "End Time", "Notes"]
     ws.append(headers)
     
-    # Data
-    shifts = session.exec(select(Shift).order_by(Shift.start_time)).all()
+    # Data: stored shifts, plus recurring occurrences up to the last stored shift
+    # (at least SERIES_PREVIEW_DAYS ahead; series without an end never run out)
+    shifts = list(session.exec(select(Shift).order_by(Shift.start_time)).all())
+    first_series = session.exec(select(ShiftSeries.start_time).order_by(ShiftSeries.start_time).limit(1)).first()
+    if first_series:
+        export_end = max([datetime.now() + timedelta(days=SERIES_PREVIEW_DAYS)] + [s.end_time for s in shifts])
+        shifts = sorted(shifts + shift_series.expand(session, first_series, export_end), key=lambda shift: shift.start_time)
+    employees = {e.id: e for e in session.exec(select(Employee)).all()}
+    roles = {r.id: r for r in session.exec(select(Role)).all()}
     
     for shift in shifts:
-        emp_name = f"{shift.employee.first_name} {shift.employee.last_name}" if shift.employee else "OPEN"
-        role_name = shift.role.name if shift.role else "Unknown"
+        employee = employees.get(shift.employee_id)
+        role = roles.get(shift.role_id)
+        emp_name = f"{employee.first_name} {employee.last_name}" if employee else "OPEN"
+        role_name = role.name if role else "Unknown"
         date_str = shift.start_time.strftime("%Y-%m-%d")
         start_str = shift.start_time.strftime("%H:%M")
         end_str = shift.end_time.strftime("%H:%M")
@@ -1358,115 +1167,56 @@ def export_excel(session: Session = Depends(get_session)):
     buffer = BytesIO()
     wb.save(buffer)
     buffer.seek(0)
-    
-    headers = {
-        'Content-Disposition': 'attachment; filename="schedule_export.xlsx"'
-    }
-    headers = {
-        'Content-Disposition': 'attachment; filename="schedule_export.xlsx"'
-    }
-    return StreamingResponse(buffer, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return buffer
 
 # --- OCR Import ---
-import pytesseract
-from PIL import Image
-import io
-from pdf2image import convert_from_bytes
-import cv2
-import numpy as np
-import pillow_heif
-import easyocr
-import gc
-
-# Register HEIF opener
-pillow_heif.register_heif_opener()
-
-# Initialize EasyOCR Reader (loads model into memory once)
-# gpu=False to be safe, or True if available. False is safer for general compatibility.
-reader = easyocr.Reader(['en'], gpu=False)
-
-def deskew_image(image):
-    # Convert PIL to OpenCV
-    img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    
-    # Grayscale
-    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-    
-    # Invert (text is usually black on white, we want white on black for contours)
-    gray = cv2.bitwise_not(gray)
-    
-    # Threshold to get text
-    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
-    
-    # Find all coordinates of non-zero pixels
-    coords = np.column_stack(np.where(thresh > 0))
-    
-    # Find minimum area rectangle
-    angle = cv2.minAreaRect(coords)[-1]
-    
-    # Correct angle
-    if angle < -45:
-        angle = -(90 + angle)
-    else:
-        angle = -angle
-        
-    # Rotate
-    (h, w) = img_cv.shape[:2]
-    center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    rotated = cv2.warpAffine(img_cv, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-    
-    # Convert back to PIL
-    return Image.fromarray(cv2.cvtColor(rotated, cv2.COLOR_BGR2RGB))
+import re
+import traceback
+from fastapi.concurrency import run_in_threadpool
 
-def correct_orientation(image):
-    try:
-        osd = pytesseract.image_to_osd(image)
-        # More robust parsing - check if rotation info exists
-        if '\nRotation: ' in osd:
-            rotation_line = osd.split('\nRotation: ')[1].split('\n')[0]
-            rotation = int(rotation_line)
-            if rotation != 0:
-                image = image.rotate(-rotation, expand=True)
-                print(f"Rotated image by {-rotation} degrees")
-        else:
-            print("No rotation info in OSD, using original orientation")
-            
-    except Exception as e:
-        print(f"Orientation detection failed: {e}, using original orientation")
-        # Return original image on any error
-        pass
-    return image
-
-def preprocess_image(image):
-    # Convert to grayscale
-    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
-    
-    # Check dimensions
-    height, width = gray.shape
-    
-    # Only rescale if image is small (e.g. < 2000px width)
-    # If it's huge (e.g. 4000px+), downscale or keep as is
-    if width < 2000:
-        gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-    elif width > 4000:
-        # Downscale slightly to speed up processing without losing much detail for OCR
-        gray = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
-    
-    # Apply Otsu's thresholding to binarize
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    # Denoise - reduce strength for speed on large images
-    denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
-    
-    return Image.fromarray(denoised)
+@app.get("/ocr/status")
+def ocr_status():
+    # ready: the OCR model is loaded in at least one worker process (see ocr_worker.py)
+    return ocr_worker.status()
 
 @app.post("/import/ocr/")
-async def import_ocr(dry_run: bool = False, file: UploadFile = File(...), session: Session = Depends(get_session)):
+async def import_ocr(dry_run: bool = False, run_async: bool = Query(False, alias="async"), file: UploadFile = File(...), session: Session = Depends(get_session)):
     print(f"OCR Request Received: {file.filename}, dry_run={dry_run}")
+    path = await uploads.spool(file)
+    if run_async:
+        # The job takes the spooled file over
+        job = jobs.runner.submit("ocr_import", {"filename": file.filename, "dry_run": dry_run}, upload=path)
+        return job_accepted(job)
+    try:
+        read = await ocr_worker.read(path, file.filename)
+    except Exception as e:
+        traceback.print_exc()
+        return {"message": "OCR Failed", "errors": [str(e)]}
+    finally:
+        uploads.discard(path)
+    # Matching and the commit use the synchronous session: off the event loop as well
+    result = await run_in_threadpool(import_ocr_pages, read["pages"], dry_run, session)
+    result["memory"] = read["memory"]
+    return result
+
+@jobs.handler("ocr_import")
+def ocr_import_job(job, params):
+    with Session(engine) as session:
+        return run_ocr_import(job.upload_path, params["filename"], params["dry_run"], session, job.progress)
+
+def run_ocr_import(path, filename, dry_run, session, progress=None):
+    # OCR errors propagate, so the job is recorded as failed
+    if progress:
+        progress(0.0, "Running OCR")
+    read = ocr_worker.read_document(path, filename, progress)
+    result = import_ocr_pages(read["pages"], dry_run, session, progress)
+    result["memory"] = read["memory"]
+    return result
+
+def import_ocr_pages(pages, dry_run, session, progress=None):
+    # pages: text lines per page from ocr_worker.read_pages
+    # progress(fraction, message) is given when running as a background job
     try:
-        contents = await file.read()
-        
         # Initialize result containers
         parsed_shifts = []
         errors = []
@@ -1474,148 +1224,12 @@ async def import_ocr(dry_run: bool = False, file: UploadFile = File(...), sessio
         unmatched_employees = []
         imported_count = 0
         
-        # Convert PDF to image if needed
-        images = []
-        extracted_text = ""
-        
-        # 1. Try Direct Text Extraction for PDFs
-        if file.filename.lower().endswith('.pdf'):
-            try:
-                from pypdf import PdfReader
-                pdf_reader = PdfReader(io.BytesIO(contents))
-                raw_text = ""
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        raw_text += text + "\n"
-                
-                if len(raw_text.strip()) > 50:
-                    print("Direct PDF text extraction successful. Skipping OCR.")
-                    extracted_text = raw_text
-                else:
-                    print("PDF has insufficient text (likely scanned). Falling back to OCR.")
-                    raise Exception("Insufficient text")
-            except Exception as e:
-                print(f"Direct text extraction skipped: {e}")
-                # Fallback to Image Extraction
-                try:
-                    images = convert_from_bytes(contents)
-                except Exception as e:
-                    print(f"pdf2image failed (likely missing poppler): {e}")
-                    # Fallback: Try extracting images with pypdf
-                    try:
-                        from pypdf import PdfReader
-                        pdf_reader = PdfReader(io.BytesIO(contents))
-                        for page in pdf_reader.pages:
-                            for image_file_object in page.images:
-                                images.append(Image.open(io.BytesIO(image_file_object.data)))
-                        
-                        if not images:
-                            raise Exception("No images found in PDF (and poppler is missing for rendering text PDFs).")
-                        print(f"Successfully extracted {len(images)} images via pypdf fallback.")
-                    except Exception as pypdf_error:
-                        print(f"pypdf fallback failed: {pypdf_error}")
-                        raise Exception("PDF processing failed. Please install 'poppler' (brew install poppler) or upload an image.")
-        else:
-            images = [Image.open(io.BytesIO(contents))]
-            
-        # Ensure all images are RGB for OpenCV/EasyOCR compatibility
-        if images:
-            images = [img.convert('RGB') for img in images]
-            
-        # Only run OCR if we don't have text yet
         extracted_text = ""
-        determined_angle = None
         column_dates = {}
         
-        for img in images:
-            # 1. Correct Orientation (90/180/270)
-            # We still run this fast check as it might catch simple flips
-            img = correct_orientation(img)
-
-            # EasyOCR Strategy
-            # Convert PIL to bytes or numpy array for EasyOCR
-            img_np = np.array(img)
-            
-            results = []
-            
-            # 4-Way Rotation Check
-            # If we haven't determined the angle yet (first page), run the check
-            if determined_angle is None:
-                best_results = []
-                best_score = -1
-                best_angle = 0
-                
-                import re
-                
-                for angle in [0, 90, 180, 270]:
-                    # Rotate image
-                    rotated_img = img.rotate(-angle, expand=True)
-                    img_np_rot = np.array(rotated_img)
-                    
-                    # Run EasyOCR
-                    curr_results = reader.readtext(img_np_rot, detail=1, paragraph=False, x_ths=0.5)
-                    
-                    # Score this orientation
-                    score = 0
-                    text_content = " ".join([r[1] for r in curr_results])
-                    
-                    # Check for time patterns (e.g. 9:00, 9-5)
-                    time_matches = re.findall(r'\d{1,2}[:\.]?\d{0,2}\s*-\s*\d{1,2}[:\.]?\d{0,2}', text_content)
-                    score += len(time_matches) * 2
-                    
-                    # Check for day names
-                    days = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
-                    day_matches = [d for d in text_content.lower().split() if any(day in d for day in days)]
-                    score += len(day_matches)
-                    
-                    with open("ocr_debug.log", "a") as f:
-                        f.write(f"Angle {angle}: Score {score} (Times: {len(time_matches)}, Days: {len(day_matches)})\n")
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_results = curr_results
-                        best_angle = angle
-                
-                determined_angle = best_angle
-                results = best_results
-                
-                with open("ocr_debug.log", "a") as f:
-                    f.write(f"Determined Document Angle: {determined_angle} with Score {best_score}\n")
-            else:
-                # Use determined angle for subsequent pages
-                if determined_angle != 0:
-                    img = img.rotate(-determined_angle, expand=True)
-                    img_np = np.array(img)
-                
-                # Use x_ths=0.5 to prevent merging of close words (like headers)
-                results = reader.readtext(img_np, detail=1, paragraph=False, x_ths=0.5)
-        
-            # Sort by Y
-            results.sort(key=lambda x: x[0][0][1])
-        
-        # Group into lines
-            lines_data = [] # List of lists of (bbox, text)
-            current_line = []
-            last_y = -1
-            
-            for (bbox, text, prob) in results:
-                y = bbox[0][1]
-                if last_y == -1:
-                    current_line.append((bbox, text))
-                    last_y = y
-                    continue
-                
-                if abs(y - last_y) < 35:
-                    current_line.append((bbox, text))
-                else:
-                    current_line.sort(key=lambda x: x[0][0][0])
-                    lines_data.append(current_line)
-                    current_line = [(bbox, text)]
-                    last_y = y
-            if current_line:
-                current_line.sort(key=lambda x: x[0][0][0])
-                lines_data.append(current_line)
+        for page, lines_data in enumerate(pages):
+            if progress:
+                progress(0.9 + 0.1 * page / len(pages), f"Importing page {page + 1} of {len(pages)}")
                 
             # Process Lines for this Page
             
@@ -1703,7 +1317,6 @@ async def import_ocr(dry_run: bool = False, file: UploadFile = File(...), sessio
                 
                 # 0. Check Location
                 line_upper = full_line_text.upper()
-                import re # Ensure re is available
                 
                 for loc in KNOWN_LOCATIONS + list(LOCATION_MAPPINGS.keys()):
                     # Use regex to ensure we don't match "Lot 2" inside "Lot 2:45"
@@ -2502,16 +2115,6 @@ async def import_ocr(dry_run: bool = False, file: UploadFile = File(...), sessio
                 else:
                     unmatched_lines.append(full_line_text)
 
-            # --- Memory Cleanup per Page ---
-            del img
-            del img_np
-            if 'rotated_img' in locals(): del rotated_img
-            if 'img_np_rot' in locals(): del img_np_rot
-            if 'curr_results' in locals(): del curr_results
-            if 'results' in locals(): del results
-            gc.collect()
-
-
         # MOVED OUTSIDE LOOP: Commit all shifts after processing all pages
         print(f"DEBUG: Reached end of image loop. Total imported_count: {imported_count}")
         with open("ocr_debug.log", "a") as f:
@@ -2534,6 +2137,8 @@ async def import_ocr(dry_run: bool = False, file: UploadFile = File(...), sessio
                 traceback.print_exc()
                 with open("ocr_debug.log", "a") as f:
                     f.write(f"DEBUG: COMMIT FAILED: {e}\\n")
+                if progress:
+                    raise
                 return {"message": "Database error", "errors": [str(e)]}
     
         return {
@@ -2545,35 +2150,37 @@ async def import_ocr(dry_run: bool = False, file: UploadFile = File(...), sessio
             "unmatched_employees": unmatched_employees  # Already deduplicated by only adding once per name
         }
     except Exception as e:
-        import traceback
+        if progress:
+            # Running as a job: JobRunner records it as failed (and a cancel as cancelled)
+            raise
         traceback.print_exc()
         return {"message": "OCR Failed", "errors": [str(e)]}
 
 @app.post("/shifts/bulk/")
 def create_shifts_bulk(shifts: List[dict], session: Session = Depends(get_session)):
-    count = 0
+    rows = []
     for s_data in shifts:
         try:
             # Parse dates
             start = datetime.fromisoformat(s_data['start_time'])
             end = datetime.fromisoformat(s_data['end_time'])
             
-            shift = Shift(
-                employee_id=s_data['employee_id'],
-                role_id=s_data['role_id'],
-                start_time=start,
-                end_time=end,
-                notes=s_data.get('notes'),
-                location=s_data.get('location'), # Added location
-                is_vacation=s_data.get('is_vacation', False)
-            )
-            session.add(shift)
-            count += 1
+            rows.append({
+                "employee_id": s_data['employee_id'],
+                "role_id": s_data['role_id'],
+                "start_time": start,
+                "end_time": end,
+                "notes": s_data.get('notes'),
+                "location": s_data.get('location'), # Added location
+                "is_vacation": s_data.get('is_vacation', False)
+            })
         except Exception as e:
             print(f"Error creating shift: {e}")
             continue
             
     try:
+        # All rows in one insert, one transaction
+        count = len(shift_bulk.insert_shifts(session, rows))
         session.commit()
     except Exception as e:
         session.rollback()
@@ -2599,454 +2206,48 @@ def update_rotation(state: RotationState, session: Session = Depends(get_session
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/callsheet/cache/")
+def get_call_sheet_cache_stats():
+    """Hit/miss/invalidation counts of the per-(week, role group) call sheet cache."""
+    return callsheet_cache.report()
+
+@app.get("/callsheets/week")
+def get_week_call_sheets(start: datetime, role: Optional[int] = None, format: str = "json", session: Session = Depends(get_session)):
+    """Call sheets for every open shift in the week containing start, from one prefetch.
+
+    format=html returns a single printable document (a page per sheet section)."""
+    if role is not None and role not in callsheet.CALL_SHEET_ROLE_IDS:
+        raise HTTPException(status_code=400, detail="Call Sheet not available for this role type.")
+    if format not in ("json", "html"):
+        raise HTTPException(status_code=400, detail="format must be json or html")
+    week_start = week_start_of(start)
+    sheets = callsheet.build_week(session, week_start, role)
+    if format == "html":
+        return HTMLResponse(callsheet.render_week_html(week_start, sheets))
+    return {
+        "week_start": week_start,
+        "sheets": [{
+            "shift_id": sheet["shift"].id,
+            "start_time": sheet["shift"].start_time,
+            "end_time": sheet["shift"].end_time,
+            "role_id": sheet["shift"].role_id,
+            "location": sheet["shift"].location,
+            "candidates": sheet["candidates"]
+        } for sheet in sheets]
+    }
+
 @app.get("/shifts/{shift_id}/call-sheet")
 def get_call_sheet(shift_id: int, session: Session = Depends(get_session)):
     try:
-        # ... (Existing logic for Shift, Dates) ...
-        target_shift = session.get(Shift, shift_id)
+        target_shift = shift_series.get(session, shift_id)
         if not target_shift: raise HTTPException(status_code=404, detail="Shift not found")
         
-        # Target Week (Saturday to Saturday)
-        start_dt = target_shift.start_time
-        # Saturday is weekday 5. If today is Mon (0), we go back 2 days. If Sat (5), stay. If Sun (6), go back 1.
-        days_since_saturday = (start_dt.weekday() + 2) % 7  # Sat=0, Sun=1, Mon=2, ..., Fri=6
-        start_of_week = start_dt.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_since_saturday)
-        end_of_week = start_of_week + timedelta(days=7)
-        
-        # Target Day info
-        day_start = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        
-        # Candidates
-        cand_role_id = target_shift.role_id
-    
         # Whitelist
-        ALLOWED_ROLES = [3, 4, 7, 8]
-        if cand_role_id not in ALLOWED_ROLES:
+        if target_shift.role_id not in callsheet.CALL_SHEET_ROLE_IDS:
             raise HTTPException(status_code=400, detail="Call Sheet not available for this role type.")
         
-        candidate_objects = []
-        
-        # Helper: Check if employee has Supervisor as secondary role
-        def has_supervisor_role(emp):
-            """Returns True if employee has Supervisor (role_id=5) as a secondary role."""
-            return any(r.id == 5 for r in emp.roles)
-        
-        if cand_role_id == 4:
-            # Maintenance
-            pt_maint = [e for e in session.exec(select(Employee).where(Employee.default_role_id == 4, Employee.is_full_time == False)).all() if not has_supervisor_role(e)]
-            ft_maint = [e for e in session.exec(select(Employee).where(Employee.default_role_id == 4, Employee.is_full_time == True)).all() if not has_supervisor_role(e)]
-            
-            pt_maint.sort(key=lambda x: x.hire_date or datetime.max)
-            ft_maint.sort(key=lambda x: x.hire_date or datetime.max)
-            
-            # Apply Rotation for FT Maintenance
-            rot_state = session.get(RotationState, "maint_ft")
-            if rot_state and ft_maint:
-                # Rotate list
-                try:
-                    # Find index of last called
-                    idx = next(i for i, emp in enumerate(ft_maint) if emp.id == rot_state.last_employee_id)
-                    # Rotate: Start from idx + 1
-                    ft_maint = ft_maint[idx+1:] + ft_maint[:idx+1]
-                except StopIteration:
-                    pass # Last called person not found in list (maybe deleted/changed role), keep default order
-            
-            # Pre-fetch shifts for OT calculation
-            all_maint = pt_maint + ft_maint
-            maint_ids = [m.id for m in all_maint]
-            maint_week_shifts = session.exec(select(Shift).where(Shift.employee_id.in_(maint_ids), Shift.start_time >= start_of_week, Shift.start_time < end_of_week)).all()
-            maint_shifts_map = {mid: [] for mid in maint_ids}
-            for s in maint_week_shifts: 
-                maint_shifts_map[s.employee_id].append(s)
-            
-            target_duration = (target_shift.end_time - target_shift.start_time).total_seconds() / 3600
-            # Apply 30min lunch deduction for target if >= 7.5h
-            effective_target = target_duration - 0.5 if target_duration >= 7.5 else target_duration
-            
-            # Split PT Maint into standard vs OT
-            pt_standard = []
-            pt_ot = []
-            for emp in pt_maint:
-                shifts = maint_shifts_map.get(emp.id, [])
-                weekly_hours = 0
-                for s in shifts:
-                    dur = (s.end_time - s.start_time).total_seconds() / 3600
-                    if dur >= 7.5: dur -= 0.5  # Lunch deduction
-                    weekly_hours += dur
-                
-                if weekly_hours + effective_target > 40:
-                    pt_ot.append((emp, "Part Time Maintenance (OT)"))
-                else:
-                    pt_standard.append((emp, "Part Time Maintenance"))
-            
-            # Split FT Maint into standard vs OT
-            ft_standard = []
-            ft_ot = []
-            for emp in ft_maint:
-                shifts = maint_shifts_map.get(emp.id, [])
-                weekly_hours = 0
-                for s in shifts:
-                    dur = (s.end_time - s.start_time).total_seconds() / 3600
-                    if dur >= 7.5: dur -= 0.5  # Lunch deduction
-                    weekly_hours += dur
-                
-                if weekly_hours + effective_target > 40:
-                    ft_ot.append((emp, "Full Time Maintenance (OT)"))
-                else:
-                    ft_standard.append((emp, "Full Time / Probationary Maintenance"))
-            
-            # Order: PT standard, FT standard, PT OT, FT OT
-            candidate_objects = pt_standard + ft_standard + pt_ot + ft_ot
-        else:
-            # Cashier - filter out employees with Supervisor as secondary role and inactive employees
-            all_cashiers = [e for e in session.exec(select(Employee).where(Employee.default_role_id.in_([3, 7, 8]))).all() if not has_supervisor_role(e) and e.is_active != False]
-            
-            # Helper function for consistent FT check
-            def is_full_time(emp):
-                return emp.is_full_time == True or emp.is_full_time == 1
-            
-            # Pre-fetch shifts
-            cashier_ids = [c.id for c in all_cashiers]
-            all_week_shifts = session.exec(select(Shift).where(Shift.employee_id.in_(cashier_ids), Shift.start_time >= start_of_week, Shift.start_time < end_of_week)).all()
-            shifts_map = {cid: [] for cid in cashier_ids}
-            for s in all_week_shifts: shifts_map[s.employee_id].append(s)
-            
-            target_duration = (target_shift.end_time - target_shift.start_time).total_seconds() / 3600
-            
-            # Calculate weekly hours for each employee
-            def get_weekly_hours(emp_id):
-                shifts = shifts_map.get(emp_id, [])
-                return sum([(s.end_time - s.start_time).total_seconds()/3600 for s in shifts])
-            
-            # Build all 3 pages
-            page_1_list = []  # PT + FT under 40h
-            page_2_list = []  # FT at/over 40h (OT)
-            page_3_list = []  # ALL PT for OT (no FT)
-            
-            # Sort by hire date
-            sorted_cashiers = sorted(all_cashiers, key=lambda x: x.hire_date or datetime.max)
-            
-            # Probationary: hire_date + 90 days >= current date
-            def is_probationary(emp):
-                if not emp.hire_date:
-                    return False
-                probation_end = emp.hire_date + timedelta(days=90)
-                return probation_end >= datetime.now()
-            
-            # Separate regular and probationary for each page
-            page_1_regular = []
-            page_1_probation = []
-            page_2_regular = []
-            page_2_probation = []
-            page_3_regular = []
-            page_3_probation = []
-            
-            for emp in sorted_cashiers:
-                weekly_hours = round(get_weekly_hours(emp.id), 1)  # Round to fix floating point precision
-                is_ft = is_full_time(emp)
-                is_prob = is_probationary(emp)
-                
-                # FT with <= 32h scheduled is treated as PT for call sheet
-                treat_as_pt = (not is_ft) or (is_ft and weekly_hours <= 32)
-                
-                if treat_as_pt:
-                    # PT employee (or FT with <= 32h) -> Page 1 AND Page 3
-                    if is_prob:
-                        page_1_probation.append((emp, "Page 1 (Probationary)"))
-                        page_3_probation.append((emp, "Page 3 (Probationary)"))
-                    else:
-                        page_1_regular.append((emp, "Page 1"))
-                        page_3_regular.append((emp, "Page 3"))
-                elif is_ft:
-                    # FT employee with > 32h
-                    if weekly_hours >= 40 or (weekly_hours + target_duration) > 40:
-                        # FT at or over 40h -> Page 2 (OT)
-                        if is_prob:
-                            page_2_probation.append((emp, "Page 2 (Probationary)"))
-                        else:
-                            page_2_regular.append((emp, "Page 2"))
-                    else:
-                        # FT between 32-40h -> Page 1 only
-                        if is_prob:
-                            page_1_probation.append((emp, "Page 1 (Probationary)"))
-                        else:
-                            page_1_regular.append((emp, "Page 1"))
-
-            # Combine: regular first, probationary at end of each page section
-            page_1_list = page_1_regular + page_1_probation
-            page_2_list = page_2_regular + page_2_probation
-            page_3_list = page_3_regular + page_3_probation
-            
-            candidate_objects = page_1_list + page_2_list + page_3_list
-        
-        if not candidate_objects:
-            return []
-        
-        # Calculate Final Results
-        cand_ids = [c[0].id for c in candidate_objects]
-        week_shifts = session.exec(select(Shift).where(Shift.employee_id.in_(cand_ids), Shift.start_time >= start_of_week, Shift.start_time < end_of_week)).all()
-        
-        emp_shifts = {cid: [] for cid in cand_ids}
-        for s in week_shifts:
-            if s.employee_id: emp_shifts[s.employee_id].append(s)
-            
-        # Target duration logic (Maintenance Unpaid Meal)
-        raw_target_duration = (target_shift.end_time - target_shift.start_time).total_seconds() / 3600
-        effective_target_duration = raw_target_duration
-        
-        target_shift_notes = []
-        if target_shift.role_id == 4 and raw_target_duration >= 7.5:
-             effective_target_duration -= 0.5
-             target_shift_notes.append("30m Unpaid Lunch")
-        
-        results = []
-        rank = 1
-        
-        for emp, section in candidate_objects:
-            shifts = emp_shifts.get(emp.id, [])
-            
-            # Recalculate Weekly Hours with Deduction Logic for existing Maintenance Shifts
-            weekly_hours = 0
-            for s in shifts:
-                 duration = (s.end_time - s.start_time).total_seconds() / 3600
-                 # If it's a Maintenance shift (Role 4) >= 7.5h, deduct 0.5h
-                 if s.role_id == 4 and duration >= 7.5:
-                     duration -= 0.5
-                 weekly_hours += duration
-            
-            overlap_duration = 0
-            working_today = False
-            daily_hours = 0
-            
-            for s in shifts:
-                if s.start_time < target_shift.end_time and s.end_time > target_shift.start_time:
-                    latest_start = max(s.start_time, target_shift.start_time)
-                    earliest_end = min(s.end_time, target_shift.end_time)
-                    delta = (earliest_end - latest_start).total_seconds() / 3600
-                    if delta > 0: overlap_duration += delta
-                
-                if s.start_time >= day_start and s.end_time < day_end:
-                    working_today = True
-                    # Recalculate Daily Hours with Deduction Logic
-                    duration = (s.end_time - s.start_time).total_seconds() / 3600
-                    if s.role_id == 4 and duration >= 7.5:
-                         duration -= 0.5
-                    daily_hours += duration
-            
-            status = "Available"
-            details = ""
-            
-            # Check if probationary (section contains '(Probationary)')
-            is_probationary_emp = "(Probationary)" in section
-            if is_probationary_emp:
-                if emp.hire_date:
-                    days_since_hire = (datetime.now() - emp.hire_date).days
-                    days_remaining = 90 - days_since_hire
-                    details = f"Probationary ({days_remaining} days left)"
-                else:
-                    details = "Probationary"
-            
-            # Check if this is the employee who originally had the shift (Called Out)
-            if target_shift.employee_id and emp.id == target_shift.employee_id:
-                status = "CO"
-                details = "Called Out - Original shift holder"
-            elif overlap_duration > 0:
-                status = "Working"
-                details = f"Overlap {overlap_duration:.1f}h"
-            elif working_today:
-                 status = "Working"
-                 details = f"Shift today ({daily_hours:.1f}h)"
-                 
-                 # Daily Limit Logic
-                 if section == "Part Time Cashiers (Priority)":
-                     limit = 8
-                     if daily_hours + effective_target_duration > limit:
-                         status = "OT"
-                         details = f"Daily > {limit}h ({daily_hours+effective_target_duration:.1f}h)"
-            
-            # Global 16h Safety Warning
-            if daily_hours + effective_target_duration > 16:
-                details += f" Warning: >16h ({daily_hours+effective_target_duration:.1f}h)"
-
-            # Weekly OT Logic
-            if weekly_hours + effective_target_duration > 40:
-                status = "OT"
-                details = f"Weekly > 40h ({weekly_hours+effective_target_duration:.1f}h)"
-            
-            # Append notes about meal break to details if applicable
-            if target_shift_notes:
-                 details += " (" + ", ".join(target_shift_notes) + ")"
-
-            # Note-Based Constraints Logic
-            violation_reason = None  # Initialize before checking
-            
-            # Helper to determine shift type based on hour
-            # 3rd: midnight-6am, 1st: 6am-2pm, 2nd: 2pm-midnight
-            def get_shift_type(hour, role_id=None):
-                if 0 <= hour < 6:
-                    return '3rd'
-                elif 6 <= hour < 14:
-                    return '1st'
-                else:
-                    return '2nd'
-            
-            # Check the structured no_overtime field first
-            if emp.no_overtime:
-                violation_reason = "Restricted: No Overtime"
-            
-            # Check the structured no_plaza field
-            if not violation_reason and emp.no_plaza:
-                if target_shift.location == "Plaza":
-                    violation_reason = "Restricted: No Plaza"
-            
-            # Check availability_grid (JSON: {day: {shift: bool}})
-            if not violation_reason and emp.availability_grid:
-                import json
-                try:
-                    grid = json.loads(emp.availability_grid)
-                    # Determine day of week (sun, mon, tue, etc.)
-                    day_names = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
-                    shift_day = day_names[target_shift.start_time.weekday()]
-                    
-                    # Determine shift type
-                    hour = target_shift.start_time.hour
-                    shift_type = get_shift_type(hour, target_shift.role_id)
-                    
-                    # Check if available
-                    if shift_day in grid and shift_type in grid[shift_day]:
-                        if not grid[shift_day][shift_type]:
-                            violation_reason = f"Unavailable: {shift_day.upper()} {shift_type} Shift"
-                except (json.JSONDecodeError, KeyError):
-                    pass  # Invalid JSON, ignore
-            
-            # Legacy Note-Based Constraints Logic (fallback)
-            if not violation_reason and emp.notes:
-                notes_lower = emp.notes.lower()
-                notes_upper = emp.notes.upper()
-                
-                # Get target shift info
-                shift_hour = target_shift.start_time.hour
-                shift_day = target_shift.start_time.strftime('%a').upper()[:3]  # SUN, MON, TUE, etc.
-                
-                # Determine which shift type this is (3rd: midnight-6am, 1st: 6am-2pm, 2nd: 2pm-midnight)
-                if 0 <= shift_hour < 6:
-                    shift_type = "3RD"
-                elif 6 <= shift_hour < 14:
-                    shift_type = "1ST"
-                else:
-                    shift_type = "2ND"
-                
-                # Parse days from notes (e.g., "AVAIL SUN,MON", "TUE-SAT", "TUE THUR FRI SAT")
-                day_names = ['SUN', 'MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT']
-                day_aliases = {'THUR': 'THU', 'THURS': 'THU', 'SUNDAY': 'SUN', 'MONDAY': 'MON', 'TUESDAY': 'TUE', 'WEDNESDAY': 'WED', 'THURSDAY': 'THU', 'FRIDAY': 'FRI', 'SATURDAY': 'SAT'}
-                
-                available_days = set()
-                available_shifts = set()
-                has_day_restriction = False
-                has_shift_restriction = False
-                
-                # Check for "NO PLAZA"
-                if "no plaza" in notes_lower and target_shift.location == "Plaza":
-                    violation_reason = "Restricted: No Plaza"
-                
-                # Check for "NO OVERTIME"
-                elif "no overtime" in notes_lower or "no ot" in notes_lower or "do not call for overtime" in notes_lower or "do not call for extra" in notes_lower:
-                    violation_reason = "Restricted: No Overtime"
-                
-                # Check for "1ST SHIFT ONLY", "2ND SHIFT ONLY", "3RD SHIFT ONLY"
-                elif "1st shift only" in notes_lower or "1st only" in notes_lower:
-                    has_shift_restriction = True
-                    available_shifts.add("1ST")
-                elif "2nd shift only" in notes_lower or "2nd only" in notes_lower:
-                    has_shift_restriction = True
-                    available_shifts.add("2ND")
-                elif "3rd shift only" in notes_lower or "3rd only" in notes_lower:
-                    has_shift_restriction = True
-                    available_shifts.add("3RD")
-                
-                # Check for "AVAIL 2ND & 3RD", "AVAIL 1ST AND 2ND", etc.
-                elif "avail" in notes_lower:
-                    # Parse shifts mentioned
-                    if "1st" in notes_lower:
-                        available_shifts.add("1ST")
-                        has_shift_restriction = True
-                    if "2nd" in notes_lower:
-                        available_shifts.add("2ND")
-                        has_shift_restriction = True
-                    if "3rd" in notes_lower:
-                        available_shifts.add("3RD")
-                        has_shift_restriction = True
-                    
-                    # Parse days mentioned
-                    for day in day_names:
-                        if day in notes_upper:
-                            available_days.add(day)
-                            has_day_restriction = True
-                    for alias, day in day_aliases.items():
-                        if alias in notes_upper:
-                            available_days.add(day)
-                            has_day_restriction = True
-                
-                # Check for "AFTER 4PM", "AFTER 5PM" etc.
-                import re
-                after_match = re.search(r'after\s*(\d+)\s*(pm|am)?', notes_lower)
-                if after_match:
-                    after_hour = int(after_match.group(1))
-                    is_pm = after_match.group(2) == 'pm' if after_match.group(2) else (after_hour < 12)
-                    if is_pm and after_hour < 12:
-                        after_hour += 12
-                    if shift_hour < after_hour:
-                        violation_reason = f"Unavailable: Only after {after_match.group(1)}{after_match.group(2) or 'PM'}"
-                
-                # Apply day restriction
-                if has_day_restriction and not violation_reason:
-                    if shift_day not in available_days:
-                        violation_reason = f"Unavailable: Not avail {shift_day}"
-                
-                # Apply shift restriction
-                if has_shift_restriction and not violation_reason:
-                    if shift_type not in available_shifts:
-                        violation_reason = f"Unavailable: Not avail {shift_type} Shift"
-                
-                if violation_reason:
-                    status = "Unavailable"
-                    # Prepend restriction to details for visibility
-                    details = f"{violation_reason}. " + details
-            
-            # Determine Answer Field Value
-            answer_val = ""
-            if violation_reason:
-                answer_val = "No"
-            elif overlap_duration > 0:
-                answer_val = f"OL {overlap_duration:.1f}h"
-            elif section.startswith("Page 2") or section.startswith("Page 3"):
-                # OT pages (Page 2 & 3) - don't mark as OT since they're on an OT page
-                if status == "Working":
-                    answer_val = "W"
-                # else leave blank - they're expected to work OT
-            elif weekly_hours + effective_target_duration > 40:
-                answer_val = "Over 40"
-            elif status == "Working":
-                answer_val = "W"
-
-            entry = {
-                "rank": rank,
-                "section": section,
-                "id": emp.id,
-                "name": f"{emp.first_name} {emp.last_name}",
-                "phone": emp.phone,
-                "hire_date": emp.hire_date.isoformat() if emp.hire_date else None,
-                "notes": emp.notes,
-                "status": status,
-                "details": details.strip(),
-                "weekly_hours": round(weekly_hours, 1),
-                "answer": answer_val
-            }
-            results.append(entry)
-            rank += 1
-            
-        return results
+        # Week's candidates, hours, shifts and rotation (cached per week), see callsheet.py
+        return callsheet.build_call_sheet(session, target_shift)
     except HTTPException:
         raise
     except Exception as e:
@@ -11,89 +11,38 @@ Parses patterns like:
 
 import sqlite3
 import json
-import re
+from note_constraints import parse_notes
 
 DB_PATH = "schedule.db"
 
 DAYS = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
 SHIFTS = ['1st', '2nd', '3rd']
-DAY_ALIASES = {
-    'SUNDAY': 'sun', 'SUN': 'sun',
-    'MONDAY': 'mon', 'MON': 'mon',
-    'TUESDAY': 'tue', 'TUE': 'tue',
-    'WEDNESDAY': 'wed', 'WED': 'wed',
-    'THURSDAY': 'thu', 'THU': 'thu', 'THUR': 'thu', 'THURS': 'thu',
-    'FRIDAY': 'fri', 'FRI': 'fri',
-    'SATURDAY': 'sat', 'SAT': 'sat'
-}
 
 def parse_notes_to_grid(notes, current_no_overtime, current_no_plaza):
     """Parse notes and return (grid, no_overtime, no_plaza)"""
     if not notes:
         return None, current_no_overtime, current_no_plaza
     
-    notes_upper = notes.upper()
-    notes_lower = notes.lower()
+    # Same parser the call sheet uses; "AFTER 4PM" has no grid equivalent and stays in the notes
+    constraints = parse_notes(notes)
+    no_overtime = current_no_overtime or constraints.no_overtime
+    no_plaza = current_no_plaza or constraints.no_plaza
     
-    # Start with all available
-    grid = {day: {shift: True for shift in SHIFTS} for day in DAYS}
-    
-    no_overtime = current_no_overtime
-    no_plaza = current_no_plaza
-    
-    # Check for NO OVERTIME
-    if 'no overtime' in notes_lower or 'no ot' in notes_lower or 'do not call for overtime' in notes_lower or 'do not call for extra' in notes_lower:
-        no_overtime = True
-    
-    # Check for NO PLAZA
-    if 'no plaza' in notes_lower:
-        no_plaza = True
-    
-    # Parse available shifts
-    available_shifts = set()
-    if '1st' in notes_lower or '1ST' in notes_upper:
-        available_shifts.add('1st')
-    if '2nd' in notes_lower or '2ND' in notes_upper:
-        available_shifts.add('2nd')
-    if '3rd' in notes_lower or '3RD' in notes_upper:
-        available_shifts.add('3rd')
-    
-    # Parse available days
-    available_days = set()
-    for alias, day in DAY_ALIASES.items():
-        if alias in notes_upper:
-            available_days.add(day)
-    
-    # Check for "X ONLY" patterns
-    has_only_restriction = 'only' in notes_lower
-    
-    # Apply shift restrictions
-    if available_shifts and has_only_restriction:
-        # If "ONLY" is present, restrict to only those shifts
-        for day in DAYS:
-            for shift in SHIFTS:
-                if shift not in available_shifts:
-                    grid[day][shift] = False
-    elif available_shifts and 'avail' in notes_lower:
-        # If "AVAIL" pattern, restrict to mentioned shifts
-        for day in DAYS:
-            for shift in SHIFTS:
-                if shift not in available_shifts:
-                    grid[day][shift] = False
-    
-    # Apply day restrictions
-    if available_days and ('avail' in notes_lower or has_only_restriction):
-        for day in DAYS:
-            if day not in available_days:
-                for shift in SHIFTS:
-                    grid[day][shift] = False
+    grid = {
+        day: {
+            shift: (constraints.days is None or day.upper() in constraints.days)
+                   and (constraints.shifts is None or shift.upper() in constraints.shifts)
+            for shift in SHIFTS
+        }
+        for day in DAYS
+    }
     
     # Check if we actually parsed something useful
     all_true = all(grid[d][s] for d in DAYS for s in SHIFTS)
     if all_true and not no_overtime and not no_plaza:
         return None, current_no_overtime, current_no_plaza  # No restrictions found
     
-    return grid, no_overtime, no_plaza
+    return (None if all_true else grid), no_overtime, no_plaza
 
 def main():
     conn = sqlite3.connect(DB_PATH)
@@ -149,6 +98,11 @@ def main():
                     (1 if no_overtime else 0, 1 if no_plaza else 0, emp_id)
                 )
         
+        # Compiled availability is rebuilt from the new grid on the next server start
+        cursor.execute("PRAGMA table_info(employee)")
+        if "start_mask" in [col[1] for col in cursor.fetchall()]:
+            cursor.executemany("UPDATE employee SET availability_mask = NULL, start_mask = NULL WHERE id = ?", [(u[0],) for u in updates])
+        
         conn.commit()
         print(f"\n✅ Updated {len(updates)} employees!")
     else:
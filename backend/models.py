@@ -1,5 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel, Relationship
 
 class EmployeeRole(SQLModel, table=True):
@@ -33,7 +34,23 @@ class EmployeeBase(SQLModel):
     is_active: bool = Field(default=True, description="Active employees appear in schedules, inactive do not")
 
 class Employee(EmployeeBase, table=True):
+    __table_args__ = (
+        # Most recently called full-time employee of a role (call rotation)
+        Index("ix_employee_last_call", "is_full_time", "default_role_id", "last_call_time"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Compiled from Availability rows / availability_grid / notes on every write (see availability_mask.py)
+    availability_mask: Optional[str] = Field(default=None, description="Hex 672-bit mask of 15-min week slots the employee can work")
+    start_mask: Optional[str] = Field(default=None, description="Hex 672-bit mask of 15-min week slots a shift may start in")
+    # Parsed from notes on every write (see note_constraints.py)
+    note_no_plaza: Optional[bool] = Field(default=None, description="Notes say NO PLAZA")
+    note_no_overtime: Optional[bool] = Field(default=None, description="Notes say no overtime / do not call for extra")
+    note_days: Optional[str] = Field(default=None, description="Days the notes allow, e.g. 'TUE,THU' (None = any)")
+    note_shifts: Optional[str] = Field(default=None, description="Shift types the notes allow, e.g. '2ND,3RD' (None = any)")
+    note_after_hour: Optional[int] = Field(default=None, description="Notes: only shifts starting at or after this hour")
+    note_after_label: Optional[str] = Field(default=None, description="The 'after' time as written, e.g. '4pm'")
+    notes_parser_version: Optional[int] = Field(default=None, description="note_constraints.PARSER_VERSION that filled the note_* columns")
     
     role: Optional[Role] = Relationship(back_populates="employees") # Primary Role
     roles: List[Role] = Relationship(back_populates="employee_links", link_model=EmployeeRole) # All Roles
@@ -51,6 +68,15 @@ class Availability(SQLModel, table=True):
     employee: Employee = Relationship(back_populates="availabilities")
 
 class Shift(SQLModel, table=True):
+    # Overlap checks, week loads and the open/locked scans all filter on these columns.
+    # Existing databases pick them up via database.ensure_indexes() (see add_shift_indexes.py).
+    __table_args__ = (
+        Index("ix_shift_employee_start_end", "employee_id", "start_time", "end_time"),
+        Index("ix_shift_start_end", "start_time", "end_time"),
+        Index("ix_shift_open", "start_time", "end_time", sqlite_where=text("employee_id IS NULL")),
+        Index("ix_shift_locked", "start_time", "employee_id", sqlite_where=text("is_locked = 1")),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     employee_id: Optional[int] = Field(default=None, foreign_key="employee.id")
     role_id: int = Field(foreign_key="role.id")
@@ -72,6 +98,48 @@ class RotationState(SQLModel, table=True):
     last_employee_id: int
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class RotationMember(SQLModel, table=True):
+    """One link of a persisted rotation ring (see rotation.py); rebuilt when its members change."""
+    __tablename__ = "rotation_member"
+
+    context_key: str = Field(primary_key=True, description="RotationState context the ring belongs to")
+    employee_id: int = Field(primary_key=True)
+    position: int = Field(description="Seniority position in the ring, 0 = most senior")
+    next_employee_id: int = Field(description="Employee called after this one (wraps around)")
+
+class ShiftSeries(SQLModel, table=True):
+    """A recurring shift stored once as a rule; occurrences are expanded on read (see shift_series.py)."""
+    __tablename__ = "shift_series"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    employee_id: Optional[int] = Field(default=None, foreign_key="employee.id")
+    role_id: int = Field(foreign_key="role.id")
+    start_time: datetime = Field(description="First occurrence")
+    end_time: datetime = Field(description="End of the first occurrence (gives the duration)")
+    rule: str = Field(description="'daily', 'weekly', 'mon-fri' or an RRULE (e.g. 'FREQ=WEEKLY;BYDAY=SA,SU')")
+    until: Optional[datetime] = Field(default=None, description="Occurrences start before this; None repeats forever")
+    notes: Optional[str] = None
+    location: Optional[str] = None
+    booth_number: Optional[str] = None
+    is_vacation: bool = Field(default=False)
+
+class ShiftSeriesException(SQLModel, table=True):
+    """An occurrence that is no longer generated: skipped (deleted) or materialized as a real shift."""
+    __tablename__ = "shift_series_exception"
+
+    series_id: int = Field(foreign_key="shift_series.id", primary_key=True)
+    occurrence_start: datetime = Field(primary_key=True)
+    shift_id: Optional[int] = Field(default=None, description="Materialized shift; None when the occurrence was deleted")
+
+class TemplateCycle(SQLModel, table=True):
+    """A rotation of length_weeks weeks; templates in it apply on their week of the cycle only."""
+    __tablename__ = "template_cycle"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    length_weeks: int = Field(default=2, description="Weeks before the rotation repeats")
+    anchor_date: datetime = Field(description="First day of cycle week 0 (any later week start lines up in steps of 7 days)")
+
 class ShiftTemplate(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     employee_id: Optional[int] = Field(default=None, foreign_key="employee.id")
@@ -81,6 +149,35 @@ class ShiftTemplate(SQLModel, table=True):
     end_time: str = Field(description="HH:MM format")
     location: Optional[str] = None
     booth_number: Optional[str] = None
+    cycle_id: Optional[int] = Field(default=None, foreign_key="template_cycle.id", description="None = every week")
+    cycle_week: Optional[int] = Field(default=None, description="Week of the cycle the template applies in (0-based)")
     
     employee: Optional[Employee] = Relationship()
     role: Optional[Role] = Relationship()
+
+class EmployeeWeekHours(SQLModel, table=True):
+    """Materialized weekly hours per employee, maintained by week_hours.py on every shift write."""
+    __tablename__ = "employee_week_hours"
+
+    employee_id: int = Field(foreign_key="employee.id", primary_key=True)
+    week_start: datetime = Field(primary_key=True, description="Saturday 00:00 of the week the shifts start in")
+    raw_hours: float = Field(default=0.0, description="Sum of shift durations")
+    paid_hours: float = Field(default=0.0, description="Raw hours minus the maintenance unpaid lunch")
+    shift_count: int = Field(default=0)
+
+class Job(SQLModel, table=True):
+    """A background job (see jobs.py); params and result are JSON."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(index=True)
+    status: str = Field(default="queued", index=True, description="queued, running, succeeded, failed or cancelled")
+    params: str = Field(default="{}")
+    progress: float = Field(default=0.0, description="0..1")
+    message: Optional[str] = None
+    result: Optional[str] = None
+    result_file: Optional[str] = Field(default=None, description="File the job produced (e.g. an export)")
+    error: Optional[str] = None
+    cancel_requested: bool = Field(default=False)
+    attempts: int = Field(default=0, description="Times a worker started it (more than 1 after a restart)")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,177 @@
+"""
+Restrictions written in an employee's free-text notes.
+
+The call sheet has always read notes such as "AVAIL 2ND & 3RD", "1ST SHIFT ONLY",
+"AVAIL TUE THUR FRI SAT", "AFTER 4PM", "NO PLAZA" or "DO NOT CALL FOR OVERTIME".
+parse_notes() is the only parser for them (migrate_notes_to_grid.py uses it too).
+
+Notes are parsed when an employee is written (create_employee, update_employee or
+any other ORM write), and the result is stored in the employee's note_* columns
+together with PARSER_VERSION. Readers use from_employee(), which only parses
+again for rows written before the current parser (or behind the ORM's back).
+restriction_reason() applies the constraints to a shift with the call sheet's
+precedence and messages.
+
+Bump PARSER_VERSION whenever parse_notes() changes, then run the backfill:
+
+Usage: python note_constraints.py [path/to/schedule.db] [--all]
+"""
+import re
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlmodel import select, or_
+from models import Employee
+
+# days/shifts are None when the notes do not restrict them
+NoteConstraints = namedtuple("NoteConstraints", "no_plaza no_overtime days shifts after_hour after_label")
+
+NO_CONSTRAINTS = NoteConstraints(False, False, None, None, None, None)
+
+DAY_NAMES = ['SUN', 'MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT']
+DAY_ALIASES = {'THUR': 'THU', 'THURS': 'THU', 'SUNDAY': 'SUN', 'MONDAY': 'MON', 'TUESDAY': 'TUE', 'WEDNESDAY': 'WED', 'THURSDAY': 'THU', 'FRIDAY': 'FRI', 'SATURDAY': 'SAT'}
+NO_OVERTIME_PHRASES = ["no overtime", "no ot", "do not call for overtime", "do not call for extra"]
+
+AFTER_PATTERN = re.compile(r'after\s*(\d+)\s*(pm|am)?')
+
+PARSER_VERSION = 1
+
+# Employee columns holding the parsed constraints, in NoteConstraints order
+COLUMNS = ("note_no_plaza", "note_no_overtime", "note_days", "note_shifts", "note_after_hour", "note_after_label")
+
+def note_shift_type(hour):
+    """3RD: midnight-6am, 1ST: 6am-2pm, 2ND: 2pm-midnight."""
+    if 0 <= hour < 6:
+        return "3RD"
+    elif 6 <= hour < 14:
+        return "1ST"
+    return "2ND"
+
+def note_day(dt):
+    return dt.strftime('%a').upper()[:3]
+
+def parse_notes(notes):
+    if not notes:
+        return NO_CONSTRAINTS
+    notes_lower = notes.lower()
+    notes_upper = notes.upper()
+
+    no_plaza = "no plaza" in notes_lower
+    no_overtime = any(phrase in notes_lower for phrase in NO_OVERTIME_PHRASES)
+
+    days = set()
+    shifts = set()
+    # "1ST SHIFT ONLY" / "2ND ONLY" wins over an "AVAIL ..." list
+    for shift in ("1st", "2nd", "3rd"):
+        if f"{shift} shift only" in notes_lower or f"{shift} only" in notes_lower:
+            shifts.add(shift.upper())
+            break
+    else:
+        if "avail" in notes_lower:
+            for shift in ("1st", "2nd", "3rd"):
+                if shift in notes_lower:
+                    shifts.add(shift.upper())
+            for day in DAY_NAMES:
+                if day in notes_upper:
+                    days.add(day)
+            for alias, day in DAY_ALIASES.items():
+                if alias in notes_upper:
+                    days.add(day)
+
+    after_hour = after_label = None
+    after_match = AFTER_PATTERN.search(notes_lower)
+    if after_match:
+        after_hour = int(after_match.group(1))
+        is_pm = after_match.group(2) == 'pm' if after_match.group(2) else (after_hour < 12)
+        if is_pm and after_hour < 12:
+            after_hour += 12
+        after_label = f"{after_match.group(1)}{after_match.group(2) or 'PM'}"
+
+    return NoteConstraints(no_plaza, no_overtime, frozenset(days) or None, frozenset(shifts) or None, after_hour, after_label)
+
+def allows_start(constraints, start_time):
+    """Day, shift type and "after" restrictions for a shift starting at start_time."""
+    if constraints.after_hour is not None and start_time.hour < constraints.after_hour:
+        return False
+    if constraints.days is not None and note_day(start_time) not in constraints.days:
+        return False
+    if constraints.shifts is not None and note_shift_type(start_time.hour) not in constraints.shifts:
+        return False
+    return True
+
+def restriction_reason(constraints, start_time, location=None):
+    """Why the notes rule the shift out (call sheet wording), or None."""
+    reason = None
+    if constraints.no_plaza and location == "Plaza":
+        reason = "Restricted: No Plaza"
+    elif constraints.no_overtime:
+        reason = "Restricted: No Overtime"
+    if constraints.after_hour is not None and start_time.hour < constraints.after_hour:
+        reason = f"Unavailable: Only after {constraints.after_label}"
+    if not reason and constraints.days is not None and note_day(start_time) not in constraints.days:
+        reason = f"Unavailable: Not avail {note_day(start_time)}"
+    if not reason and constraints.shifts is not None and note_shift_type(start_time.hour) not in constraints.shifts:
+        reason = f"Unavailable: Not avail {note_shift_type(start_time.hour)} Shift"
+    return reason
+
+# --- Persistence ---
+def to_columns(constraints):
+    """NoteConstraints -> {column: value} for the employee row (sets stored as "A,B")."""
+    values = constraints._replace(
+        days=",".join(sorted(constraints.days, key=DAY_NAMES.index)) if constraints.days else None,
+        shifts=",".join(sorted(constraints.shifts)) if constraints.shifts else None,
+    )
+    columns = dict(zip(COLUMNS, values))
+    columns["notes_parser_version"] = PARSER_VERSION
+    return columns
+
+def from_employee(employee):
+    """Stored constraints of an Employee (or a row with the same columns); parses stale rows."""
+    if getattr(employee, "notes_parser_version", None) != PARSER_VERSION:
+        return parse_notes(employee.notes)
+    no_plaza, no_overtime, days, shifts, after_hour, after_label = (getattr(employee, c) for c in COLUMNS)
+    return NoteConstraints(
+        bool(no_plaza), bool(no_overtime),
+        frozenset(days.split(",")) if days else None,
+        frozenset(shifts.split(",")) if shifts else None,
+        after_hour, after_label,
+    )
+
+def apply(employee):
+    """Parses employee.notes into its note_* columns."""
+    for column, value in to_columns(parse_notes(employee.notes)).items():
+        setattr(employee, column, value)
+
+@event.listens_for(Session, "before_flush")
+def _parse_flushed_notes(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Employee):
+            if obj in session.new or inspect(obj).attrs.notes.history.has_changes() or obj.notes_parser_version != PARSER_VERSION:
+                apply(obj)
+
+# --- Backfill ---
+def backfill(session, reparse_all=False):
+    """Parses notes of employees stored by an older parser (all employees with reparse_all).
+    Returns the number of employees updated."""
+    query = select(Employee)
+    if not reparse_all:
+        query = query.where(or_(Employee.notes_parser_version == None, Employee.notes_parser_version != PARSER_VERSION))
+    employees = session.exec(query).all()
+    for employee in employees:
+        apply(employee)
+        session.add(employee)
+    session.commit()
+    return len(employees)
+
+if __name__ == "__main__":
+    import sys
+    from sqlmodel import SQLModel, Session as SQLModelSession
+    from database import make_engine, ensure_columns
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db_path = args[0] if args else "schedule.db"
+    engine = make_engine(f"sqlite:///{db_path}", echo=False)
+    SQLModel.metadata.create_all(engine)
+    ensure_columns(engine)
+    with SQLModelSession(engine) as session:
+        print(f"Parsed notes for {backfill(session, reparse_all='--all' in sys.argv)} employees (parser v{PARSER_VERSION})")
@@ -0,0 +1,525 @@
+"""
+OCR of uploaded schedules (POST /import/ocr/) in a pool of worker processes.
+
+Rendering PDFs, OpenCV and EasyOCR take seconds of CPU per page; run in the
+server process they block the event loop and every other request with it. The
+pipeline (render -> orientation -> EasyOCR -> text lines) runs instead in
+OCR_WORKERS processes (SCHEDULER_OCR_WORKERS, default 2), so concurrent uploads
+use several cores. Each process loads its own EasyOCR reader on first use.
+
+Pages are tasks of their own: orient_page decides the orientation on the first
+page (and reads it when that took the fallback), then read_page runs for every
+other page at once with that angle, rendering only its own page. A multi-page
+scan takes about its orientation pass plus its slowest page, given as many
+workers as pages. read() and read_document() merge the results in page order
+as {"pages": [[(bbox, text), ...] per line] per page, "orientation": ...},
+bbox being four [x, y] points; read_pages() does the same in-process, one page
+after another. Matching the lines to employees (with the column dates carried
+from page to page) and writing the shifts stay in the server
+(main.import_ocr_pages).
+
+Workers get the path of the spooled upload (uploads.py), never its bytes, and
+keep one page in memory at a time. Each upload has a memory budget of
+OCR_MEMORY_MB (SCHEDULER_OCR_MEMORY_MB, default 1024), shared by its pages
+being read at the same time. Pages are rendered at OCR_DPI (SCHEDULER_OCR_DPI,
+default 200), lowered as needed to fit the budget, and images larger than it
+are scaled down. Each task samples its worker's RSS (rss.py); the peak per page
+comes back as "memory" with the lines. A page whose task grew its worker by more
+than the page budget fails with MemoryError, and the upload with it (the sampler
+cannot stop EasyOCR midway, so the check runs when the page is done). The
+EasyOCR model is loaded before sampling starts and does not count.
+
+Nothing heavy is loaded until OCR is needed: OpenCV, Tesseract, pdf2image and
+HEIF support are imported inside the functions using them, and the EasyOCR
+model (seconds and hundreds of MB) is built by the first page a worker reads.
+warm_up() loads it ahead in the background (at server startup unless
+SCHEDULER_OCR_WARMUP=0); status() backs GET /ocr/status.
+"""
+import asyncio
+import gc
+import io
+import os
+import re
+import math
+import threading
+from collections import Counter
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import orientation
+import rss
+
+OCR_WORKERS = int(os.environ.get("SCHEDULER_OCR_WORKERS", 2))
+OCR_WARMUP = os.environ.get("SCHEDULER_OCR_WARMUP", "1") != "0"
+OCR_DPI = int(os.environ.get("SCHEDULER_OCR_DPI", 200))
+MIN_DPI = 100
+# Memory an upload's pages may add to the workers reading them at the same time
+OCR_MEMORY_MB = int(os.environ.get("SCHEDULER_OCR_MEMORY_MB", 1024))
+# Working memory per page pixel: the RGB page, its upright copy, the NumPy
+# copies and EasyOCR's buffers
+BYTES_PER_PIXEL = 24
+
+_reader = None  # EasyOCR reader of this worker process
+_pool = None
+
+# Server side: what warm-up and finished reads tell about the workers
+_lock = threading.Lock()
+_status = {"state": "cold", "warm_workers": set(), "load_seconds": None, "error": None, "started": None}
+_orientation = Counter()  # Documents read per orientation method, and fallback passes
+
+def get_reader():
+    global _reader
+    if _reader is None:
+        import easyocr
+        # gpu=False to be safe, or True if available. False is safer for general compatibility.
+        _reader = easyocr.Reader(['en'], gpu=False)
+    return _reader
+
+def load_reader():
+    """Builds this worker's reader. Returns (pid, seconds spent loading)."""
+    t0 = time.perf_counter()
+    get_reader()
+    return os.getpid(), time.perf_counter() - t0
+
+def _loaded(future):
+    with _lock:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if _status["state"] == "loading":
+                _status.update(state="failed", error=str(error) or type(error).__name__)
+                print(f"OCR warm-up failed: {_status['error']}")
+            return
+        pid, seconds = future.result()
+        _status["warm_workers"].add(pid)
+        if seconds > 0.01:
+            _status["load_seconds"] = round(seconds, 2)
+        if _status["state"] != "ready":
+            _status["state"] = "ready"
+            print(f"OCR engine ready after {time.perf_counter() - _status['started']:.1f}s")
+
+def warm_up():
+    """Loads the reader in the worker processes in the background. Returns immediately."""
+    with _lock:
+        if _status["state"] in ("loading", "ready"):
+            return
+        _status.update(state="loading", error=None, started=time.perf_counter())
+    print(f"OCR warm-up started ({OCR_WORKERS} workers)")
+    # One load per worker: while a load runs, the next task goes to a newly started process
+    for _ in range(OCR_WORKERS):
+        pool().submit(load_reader).add_done_callback(_loaded)
+
+def status():
+    with _lock:
+        return {
+            "ready": _status["state"] == "ready",
+            "state": _status["state"],  # cold, loading, ready or failed
+            "workers": OCR_WORKERS,
+            "warm_workers": len(_status["warm_workers"]),  # Workers that loaded the reader during warm-up
+            "load_seconds": _status["load_seconds"],
+            "error": _status["error"],
+            "orientation": {
+                "documents": _orientation["documents"],
+                "osd": _orientation["osd"],
+                "fallback": _orientation["fallback"],
+                "fallback_passes": _orientation["fallback_passes"],
+                "fallback_rate": round(_orientation["fallback"] / _orientation["documents"], 3) if _orientation["documents"] else None,
+            },
+        }
+
+def pool():
+    global _pool
+    if _pool is None:
+        # spawn: the server has threads (jobs, database pool) that must not be forked
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _oriented(future):
+    if not future.cancelled() and future.exception() is None:
+        first = future.result()
+        found = first["orientation"]
+        with _lock:
+            if first["lines"] is not None and _status["state"] != "ready":
+                _status.update(state="ready", error=None)
+            if found:
+                _orientation["documents"] += 1
+                _orientation[found["method"]] += 1
+                _orientation["fallback_passes"] += found["passes"]
+
+def _page_read(future):
+    # A page read means that worker has its reader now
+    if not future.cancelled() and future.exception() is None:
+        with _lock:
+            if _status["state"] != "ready":
+                _status.update(state="ready", error=None)
+
+def _orient(path, filename):
+    future = pool().submit(orient_page, path, filename)
+    future.add_done_callback(_oriented)
+    return future
+
+def _submit_pages(path, filename, first):
+    # Every page the orientation pass did not read, all at once
+    start = 1 if first["lines"] is not None else 0
+    futures = [pool().submit(read_page, path, filename, index, first["angle"], first["budget_mb"])
+               for index in range(start, first["page_count"])]
+    for future in futures:
+        future.add_done_callback(_page_read)
+    return futures
+
+def _merge(filename, first, pages):
+    # Page order, whatever order the workers finished in: the parser carries
+    # column dates over from one page to the next
+    tasks = [first["memory"]] + [page["memory"] for page in pages] if first["memory"] else []
+    memory = {
+        "budget_mb": first["budget_mb"],
+        "peak_rss_mb": max((t["peak_rss_mb"] for t in tasks), default=None),
+        "max_growth_mb": max((t["growth_mb"] for t in tasks), default=None),
+        "pages": tasks,
+    }
+    if tasks:
+        print(f"OCR {filename}: {first['page_count']} pages, peak worker RSS {memory['peak_rss_mb']} MB, "
+              f"largest page +{memory['max_growth_mb']} MB (budget {first['budget_mb']} MB per page)")
+    return {
+        "pages": ([first["lines"]] if first["lines"] is not None else []) + [page["lines"] for page in pages],
+        "orientation": first["orientation"],
+        "memory": memory,
+    }
+
+def read_document(path, filename, progress=None):
+    """read_pages across the worker processes: the first page decides the orientation,
+    then the remaining pages are read in parallel. Blocks (background jobs);
+    progress(fraction, message) is called as pages finish."""
+    first = _orient(path, filename).result()
+    futures = _submit_pages(path, filename, first)
+    total = first["page_count"]
+    done = total - len(futures)
+    try:
+        if progress:
+            progress(0.9 * done / total if total else 0.9, f"Read page {done} of {total}")
+            for _ in as_completed(futures):
+                done += 1
+                progress(0.9 * done / total, f"Read page {done} of {total}")
+        pages = [future.result() for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return _merge(filename, first, pages)
+
+async def read(path, filename):
+    """read_document awaited without blocking the event loop."""
+    first = await asyncio.wrap_future(_orient(path, filename))
+    futures = _submit_pages(path, filename, first)
+    try:
+        pages = await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return _merge(filename, first, pages)
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def readtext(image):
+    import numpy as np
+    # Use x_ths=0.5 to prevent merging of close words (like headers)
+    return get_reader().readtext(np.array(image), detail=1, paragraph=False, x_ths=0.5)
+
+def score_schedule(image):
+    """Orientation fallback: reads the rotated page and scores it by time ranges and day names."""
+    results = readtext(image)
+    text_content = " ".join([r[1] for r in results])
+
+    # Check for time patterns (e.g. 9:00, 9-5)
+    time_matches = re.findall(r'\d{1,2}[:\.]?\d{0,2}\s*-\s*\d{1,2}[:\.]?\d{0,2}', text_content)
+    # Check for day names
+    days = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+    day_matches = [d for d in text_content.lower().split() if any(day in d for day in days)]
+    score = len(time_matches) * 2 + len(day_matches)
+
+    with open("ocr_debug.log", "a") as f:
+        f.write(f"Score {score} (Times: {len(time_matches)}, Days: {len(day_matches)})\n")
+    return score, results
+
+def text_boxes(image):
+    """(width, height) of the text boxes EasyOCR's detector finds, without recognizing them."""
+    import numpy as np
+    horizontal, free = get_reader().detect(np.array(image))
+    sizes = [(x_max - x_min, y_max - y_min) for x_min, x_max, y_min, y_max in horizontal[0]]
+    for points in free[0]:
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        sizes.append((max(xs) - min(xs), max(ys) - min(ys)))
+    return sizes
+
+def deskew_image(image):
+    import cv2
+    import numpy as np
+    from PIL import Image
+    # Convert PIL to OpenCV
+    img_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    
+    # Grayscale
+    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    
+    # Invert (text is usually black on white, we want white on black for contours)
+    gray = cv2.bitwise_not(gray)
+    
+    # Threshold to get text
+    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    
+    # Find all coordinates of non-zero pixels
+    coords = np.column_stack(np.where(thresh > 0))
+    
+    # Find minimum area rectangle
+    angle = cv2.minAreaRect(coords)[-1]
+    
+    # Correct angle
+    if angle < -45:
+        angle = -(90 + angle)
+    else:
+        angle = -angle
+        
+    # Rotate
+    (h, w) = img_cv.shape[:2]
+    center = (w // 2, h // 2)
+    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    rotated = cv2.warpAffine(img_cv, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    
+    # Convert back to PIL
+    return Image.fromarray(cv2.cvtColor(rotated, cv2.COLOR_BGR2RGB))
+
+def preprocess_image(image):
+    import cv2
+    import numpy as np
+    from PIL import Image
+    # Convert to grayscale
+    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+    
+    # Check dimensions
+    height, width = gray.shape
+    
+    # Only rescale if image is small (e.g. < 2000px width)
+    # If it's huge (e.g. 4000px+), downscale or keep as is
+    if width < 2000:
+        gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    elif width > 4000:
+        # Downscale slightly to speed up processing without losing much detail for OCR
+        gray = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+    
+    # Apply Otsu's thresholding to binarize
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    
+    # Denoise - reduce strength for speed on large images
+    denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
+    
+    return Image.fromarray(denoised)
+
+
+def _pdf_has_text(path):
+    # PDFs with a text layer are not OCRed
+    try:
+        from pypdf import PdfReader
+        pdf_reader = PdfReader(path)
+        raw_text = ""
+        for page in pdf_reader.pages:
+            text = page.extract_text()
+            if text:
+                raw_text += text + "\n"
+
+        if len(raw_text.strip()) > 50:
+            print("Direct PDF text extraction successful. Skipping OCR.")
+            return True
+        print("PDF has insufficient text (likely scanned). Falling back to OCR.")
+    except Exception as e:
+        print(f"Direct text extraction skipped: {e}")
+    return False
+
+def _pypdf_images(path):
+    # Without poppler: the images embedded in the PDF stand for its pages (decoded one at a time)
+    from PIL import Image
+    try:
+        from pypdf import PdfReader
+        pdf_reader = PdfReader(path)
+        found = False
+        for page in pdf_reader.pages:
+            for image_file_object in page.images:
+                found = True
+                yield Image.open(io.BytesIO(image_file_object.data))
+
+        if not found:
+            raise Exception("No images found in PDF (and poppler is missing for rendering text PDFs).")
+    except Exception as pypdf_error:
+        print(f"pypdf fallback failed: {pypdf_error}")
+        raise Exception("PDF processing failed. Please install 'poppler' (brew install poppler) or upload an image.")
+
+def page_count(path, filename):
+    """Pages to OCR: 1 for an image, 0 for a PDF with a text layer."""
+    if not filename.lower().endswith('.pdf'):
+        return 1
+    if _pdf_has_text(path):
+        return 0
+    from pdf2image import pdfinfo_from_path
+    try:
+        return pdfinfo_from_path(path)["Pages"]
+    except Exception as e:
+        print(f"pdf2image failed (likely missing poppler): {e}")
+        count = sum(1 for _ in _pypdf_images(path))
+        print(f"Successfully extracted {count} images via pypdf fallback.")
+        return count
+
+def page_budget_mb(count):
+    """Memory budget of one page: the upload's, shared by the pages read at the same time."""
+    return OCR_MEMORY_MB // max(1, min(count, OCR_WORKERS))
+
+def max_pixels(budget_mb):
+    return budget_mb * 2**20 // BYTES_PER_PIXEL
+
+def pdf_dpi(path, pixels):
+    """OCR_DPI, or less when a page would not fit in pixels (never below MIN_DPI)."""
+    from pdf2image import pdfinfo_from_path
+    # "612 x 792 pts (letter)": the first page's size in points
+    width, _, height = pdfinfo_from_path(path)["Page size"].split()[:3]
+    square_inches = float(width) / 72 * float(height) / 72
+    return max(MIN_DPI, min(OCR_DPI, int(math.sqrt(pixels / square_inches))))
+
+def fit(image, pixels):
+    """image scaled down to at most pixels (JPEG photos are decoded at the smaller size)."""
+    width, height = image.size
+    if width * height <= pixels:
+        return image
+    scale = math.sqrt(pixels / (width * height))
+    size = (int(width * scale), int(height * scale))
+    print(f"Page of {width}x{height} scaled to {size[0]}x{size[1]} for the memory budget")
+    image.draft("RGB", size)
+    image.thumbnail(size)
+    return image
+
+def load_page(path, filename, index, pixels):
+    """Page index of the upload as an RGB image of at most pixels. Returns (image, dpi).
+
+    PDFs render only that page, at pdf_dpi; images are scaled down when larger."""
+    import pillow_heif
+    from PIL import Image
+    from pdf2image import convert_from_path
+
+    # Register HEIF opener
+    pillow_heif.register_heif_opener()
+
+    dpi = None
+    if not filename.lower().endswith('.pdf'):
+        image = Image.open(path)
+    else:
+        try:
+            dpi = pdf_dpi(path, pixels)
+            image = convert_from_path(path, dpi=dpi, first_page=index + 1, last_page=index + 1)[0]
+        except Exception:
+            dpi = None
+            for number, image in enumerate(_pypdf_images(path)):
+                if number == index:
+                    break
+    # Ensure RGB for OpenCV/EasyOCR compatibility
+    return fit(image, pixels).convert('RGB'), dpi
+
+def _task_memory(task, index, sampler, image_size, dpi, budget_mb):
+    memory = {
+        "task": task,
+        "page": index,
+        "size": list(image_size),
+        "dpi": dpi,
+        "peak_rss_mb": round(sampler.peak_mb, 1),
+        "growth_mb": round(sampler.growth_mb, 1),
+    }
+    if sampler.growth_mb > budget_mb:
+        raise MemoryError(f"Page {index + 1} used {sampler.growth_mb:.0f} MB, over its {budget_mb} MB budget")
+    return memory
+
+def group_lines(results):
+    """EasyOCR results -> lines of (bbox, text), top to bottom, each left to right."""
+    # Sort by Y
+    results = sorted(results, key=lambda x: x[0][0][1])
+
+    # Group into lines
+    lines_data = [] # List of lists of (bbox, text)
+    current_line = []
+    last_y = -1
+
+    for (bbox, text, prob) in results:
+        y = bbox[0][1]
+        if last_y == -1:
+            current_line.append((bbox, text))
+            last_y = y
+            continue
+
+        if abs(y - last_y) < 35:
+            current_line.append((bbox, text))
+        else:
+            current_line.sort(key=lambda x: x[0][0][0])
+            lines_data.append(current_line)
+            current_line = [(bbox, text)]
+            last_y = y
+    if current_line:
+        current_line.sort(key=lambda x: x[0][0][0])
+        lines_data.append(current_line)
+
+    # Plain floats: the lines are pickled back to the server
+    return [[([[float(x), float(y)] for x, y in bbox], text) for bbox, text in line] for line in lines_data]
+
+def orient_page(path, filename):
+    """Orientation of the document, decided on its first page (see orientation.py).
+
+    Returns page_count, angle, how it was found, the page memory budget and,
+    when the fallback already read the first page, that page's lines (None otherwise)."""
+    count = page_count(path, filename)
+    budget_mb = page_budget_mb(count)
+    if count == 0:
+        return {"page_count": 0, "angle": 0, "orientation": None, "lines": None, "budget_mb": budget_mb, "memory": None}
+    get_reader()  # Outside the page's memory
+    with rss.PeakSampler() as sampler:
+        img, dpi = load_page(path, filename, 0, max_pixels(budget_mb))
+        size = img.size
+        found = orientation.detect(img, score_schedule, text_boxes)
+        del img
+        lines = group_lines(found.result) if found.result is not None else None
+        found = found._replace(result=None)
+        gc.collect()
+    with open("ocr_debug.log", "a") as f:
+        f.write(f"Determined Document Angle: {found.angle} by {found.method} ({found.confidence})\n")
+    return {
+        "page_count": count,
+        "angle": found.angle,
+        "orientation": {"angle": found.angle, "method": found.method, "passes": found.passes},
+        "lines": lines,
+        "budget_mb": budget_mb,
+        "memory": _task_memory("orient", 0, sampler, size, dpi, budget_mb),
+    }
+
+def read_page(path, filename, index, angle, budget_mb):
+    """Text lines of page index, turned upright by angle, and the memory it took.
+
+    Raises MemoryError when the page took more than budget_mb."""
+    get_reader()  # Outside the page's memory
+    with rss.PeakSampler() as sampler:
+        img, dpi = load_page(path, filename, index, max_pixels(budget_mb))
+        size = img.size
+        img = orientation.upright(img, angle)
+        results = readtext(img)
+
+        # --- Memory Cleanup per Page ---
+        del img
+        lines = group_lines(results)
+        del results
+        gc.collect()
+    return {"lines": lines, "memory": _task_memory("read", index, sampler, size, dpi, budget_mb)}
+
+def read_pages(path, filename):
+    """Text lines of each page, read one after another in this process (scripts, tests)."""
+    first = orient_page(path, filename)
+    start = 1 if first["lines"] is not None else 0
+    pages = [read_page(path, filename, index, first["angle"], first["budget_mb"]) for index in range(start, first["page_count"])]
+    return _merge(filename, first, pages)
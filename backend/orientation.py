@@ -0,0 +1,115 @@
+"""
+Page orientation for the OCR paths (ocr_worker.read_pages, smart_ocr.py,
+scrape_and_update.py).
+
+Running the full OCR at 0, 90, 180 and 270 degrees and keeping the best scoring
+text costs four recognitions per page. detect() decides from cheap signals on a
+thumbnail (longest side THUMB_SIZE) first:
+
+  1. Tesseract OSD: the rotation and its confidence; used when the confidence
+     reaches OSD_MIN_CONFIDENCE
+  2. text boxes (detection only, e.g. EasyOCR's detector): mostly wide boxes
+     mean upright or upside down, mostly tall ones a quarter turn, which leaves
+     two of the four angles to try
+
+Only when OSD is not confident (or not installed) does it fall back to the
+caller's score over the remaining angles, on the full image, and hand back the
+winning pass so the caller does not read the page again. stats() counts how
+often each path ran in this process.
+
+Angles are clockwise degrees to turn the page upright: upright(image, angle).
+"""
+import os
+from collections import Counter, namedtuple
+from PIL import Image
+
+ANGLES = (0, 90, 180, 270)
+THUMB_SIZE = 1024
+OSD_MIN_CONFIDENCE = float(os.environ.get("SCHEDULER_OSD_MIN_CONFIDENCE", 2.0))
+# Elongated boxes (one side ELONGATED times the other) needed, and the share of
+# them running one way, to trust the text axis. Single characters are about
+# square and say nothing.
+ELONGATED = 2.0
+DETECTION_MIN_BOXES = 8
+DETECTION_MIN_SHARE = 0.8
+
+# angle: clockwise degrees; method: "osd" or "fallback"; passes: score() calls;
+# result: the fallback's winning pass (None for osd)
+Orientation = namedtuple("Orientation", ["angle", "method", "confidence", "passes", "result"])
+
+_stats = Counter()
+
+def upright(image, angle):
+    return image.rotate(-angle, expand=True) if angle else image
+
+def thumbnail(image):
+    thumb = image.copy()
+    thumb.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.Resampling.LANCZOS)
+    return thumb
+
+def osd(image):
+    """(angle, confidence) from Tesseract OSD; confidence 0 when it cannot tell."""
+    try:
+        import pytesseract
+        info = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        return int(info["rotate"]) % 360, float(info["orientation_conf"])
+    except Exception as e:
+        # Not installed, or too little text on the page
+        print(f"OSD unavailable: {e}")
+        return 0, 0.0
+
+def axis_candidates(sizes):
+    """Angles left given the (width, height) of detected text boxes; all four when unclear."""
+    wide = sum(1 for w, h in sizes if w >= ELONGATED * h > 0)
+    tall = sum(1 for w, h in sizes if h >= ELONGATED * w > 0)
+    if wide + tall < DETECTION_MIN_BOXES:
+        return ANGLES
+    if wide >= DETECTION_MIN_SHARE * (wide + tall):
+        return (0, 180)
+    if tall >= DETECTION_MIN_SHARE * (wide + tall):
+        return (90, 270)
+    return ANGLES
+
+def detect(image, score, boxes=None):
+    """Orientation of image.
+
+    score(rotated_image) -> (score, result) is the expensive pass, run per angle
+    only on fallback. boxes(thumbnail) -> [(width, height)], optional, is a
+    detection-only signal narrowing the angles the fallback tries.
+    """
+    _stats["pages"] += 1
+    thumb = thumbnail(image)
+    angle, confidence = osd(thumb)
+    if confidence >= OSD_MIN_CONFIDENCE:
+        _stats["osd"] += 1
+        return Orientation(angle, "osd", confidence, 0, None)
+
+    candidates = ANGLES
+    if boxes:
+        try:
+            candidates = axis_candidates(boxes(thumb))
+        except Exception as e:
+            print(f"Text box detection failed: {e}")
+    if len(candidates) < len(ANGLES):
+        _stats["detection"] += 1
+    _stats["fallback"] += 1
+    _stats["fallback_passes"] += len(candidates)
+    best = None
+    for angle in candidates:
+        value, result = score(upright(image, angle))
+        if best is None or value > best[1]:
+            best = (angle, value, result)
+    angle, value, result = best
+    return Orientation(angle, "fallback", value, len(candidates), result)
+
+def stats():
+    """How often each path ran (in this process)."""
+    pages = _stats["pages"]
+    return {
+        "pages": pages,
+        "osd": _stats["osd"],
+        "detection_narrowed": _stats["detection"],
+        "fallback": _stats["fallback"],
+        "fallback_passes": _stats["fallback_passes"],
+        "fallback_rate": round(_stats["fallback"] / pages, 3) if pages else None,
+    }
@@ -1,8 +1,18 @@
-from sqlmodel import Session, create_engine, select
-from models import Shift
+"""
+Turns the repeating shifts of a base week into weekly shift series.
+
+Instead of copying each repeating shift into the next weeks, every is_repeating
+shift of the base week becomes a ShiftSeries (rule 'weekly', no end) that GET
+/shifts/ expands for whatever range is shown. The base shift and the copies an
+earlier run of this script made are kept and recorded as materialized
+occurrences, so nothing shows up twice. Shifts already in a series are skipped.
+"""
+from sqlmodel import Session, SQLModel, create_engine, select
+from models import Shift, ShiftSeries, ShiftSeriesException
 from datetime import timedelta, datetime
 
 engine = create_engine("sqlite:///schedule.db")
+SQLModel.metadata.create_all(engine)
 session = Session(engine)
 
 # Define current week (or base week)
@@ -18,37 +28,42 @@ base_shifts = session.exec(select(Shift).where(
 
 print(f"Found {len(base_shifts)} repeating shifts in base week.")
 
-added_count = 0
-
-for i in range(1, 5): # Project 4 weeks
-    week_offset = timedelta(weeks=i)
-    print(f"Projecting Week +{i}...")
-    
-    for s in base_shifts:
-        new_start = s.start_time + week_offset
-        new_end = s.end_time + week_offset
-        
-        # Check if exists
-        existing = session.exec(select(Shift).where(
-            Shift.employee_id == s.employee_id,
-            Shift.start_time == new_start,
-            Shift.end_time == new_end
-        )).first()
-        
-        if not existing:
-            new_shift = Shift(
-                employee_id=s.employee_id,
-                role_id=s.role_id,
-                start_time=new_start,
-                end_time=new_end,
-                location=s.location,
-                booth_number=s.booth_number,
-                is_repeating=True,
-                is_vacation=s.is_vacation,
-                notes=s.notes
-            )
-            session.add(new_shift)
-            added_count += 1
+in_series = set(session.exec(select(ShiftSeriesException.shift_id).where(ShiftSeriesException.shift_id != None)).all())
+series_count = 0
+kept_count = 0
+
+for s in base_shifts:
+    if s.id in in_series:
+        continue
+    series = ShiftSeries(
+        employee_id=s.employee_id,
+        role_id=s.role_id,
+        start_time=s.start_time,
+        end_time=s.end_time,
+        rule="weekly",
+        notes=s.notes,
+        location=s.location,
+        booth_number=s.booth_number,
+        is_vacation=s.is_vacation
+    )
+    session.add(series)
+    session.flush()
+    series_count += 1
+
+    # The base shift and its existing weekly copies stay as stored occurrences
+    copies = session.exec(select(Shift).where(
+        Shift.employee_id == s.employee_id,
+        Shift.role_id == s.role_id,
+        Shift.start_time >= s.start_time,
+        Shift.is_repeating == True
+    )).all()
+    for c in copies:
+        if c.id in in_series or c.end_time - c.start_time != s.end_time - s.start_time:
+            continue
+        if (c.start_time - s.start_time) % timedelta(weeks=1) == timedelta(0):
+            session.add(ShiftSeriesException(series_id=series.id, occurrence_start=c.start_time, shift_id=c.id))
+            in_series.add(c.id)
+            kept_count += 1
 
 session.commit()
-print(f"Successfully generated {added_count} new shifts for the next 4 weeks.")
+print(f"Created {series_count} weekly series ({kept_count} existing shifts kept as their occurrences).")
@@ -0,0 +1,232 @@
+"""
+Projection of templates and locked shifts into future weeks
+(POST /shifts/apply-schedule/ and POST /shifts/project-locked/).
+
+Both endpoints run one pipeline over the whole horizon instead of a query per
+template, day or base shift:
+
+  1. targets: every shift to write, computed arithmetically from the templates
+     (or the base week's locked shifts) and the week starts
+  2. existing: the shifts starting inside the horizon, read in one query
+  3. plan: targets diffed against existing in memory -> inserts, deletes and
+     skipped targets, counted per week
+  4. apply: deletes and inserts through shift_bulk in the caller's transaction
+     (nothing is written on a dry run)
+
+Rules of each endpoint:
+  apply-schedule  creates a locked shift per template occurrence unless a
+                  locked shift already starts then for the employee
+  project-locked  copies the base week's locked shifts (unlocked) into the
+                  following weeks; per employee and day, a locked shift there
+                  keeps the day as it is, otherwise its unlocked shifts are
+                  replaced by the projected ones
+
+Templates may belong to a TemplateCycle (2-week, 4-week... rotations): the
+template then applies only in its cycle_week, counted in whole weeks from the
+cycle's anchor_date. Occurrences are only computed for the window asked for
+(template_occurrences), which also backs GET /shifts/?include_templates=true
+and the locked shift sync of POST /templates/.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sqlmodel import select
+from models import Shift, ShiftTemplate, TemplateCycle
+import shift_bulk
+
+class Plan:
+    def __init__(self, week_starts):
+        self.week_starts = week_starts
+        self.creates = []  # shift_bulk rows, each with its "week" index
+        self.deletes = []  # ids of existing shifts to delete
+        self.counts = [{"created": 0, "deleted": 0, "skipped": 0} for _ in week_starts]
+
+    def create(self, row):
+        self.creates.append(row)
+        self.counts[row["week"]]["created"] += 1
+
+    def delete(self, shift_id, week):
+        self.deletes.append(shift_id)
+        self.counts[week]["deleted"] += 1
+
+    def skip(self, row):
+        self.counts[row["week"]]["skipped"] += 1
+
+    def weeks(self):
+        return [{"week_start": week_start, **counts} for week_start, counts in zip(self.week_starts, self.counts)]
+
+    def preview(self):
+        """Planned shifts and deletions, for dry runs."""
+        return {
+            "shifts": [{k: v for k, v in row.items() if k != "week"} for row in self.creates],
+            "deleted_ids": sorted(self.deletes),
+        }
+
+def _parse_hhmm(value):
+    hours, minutes = map(int, value.split(':'))
+    return time(hours, minutes)
+
+# Weeks POST /templates/ with sync_to_locked writes ahead
+SYNC_WEEKS = 8
+
+# --- Targets ---
+def load_templates(session):
+    """All templates and {cycle id: TemplateCycle}."""
+    templates = session.exec(select(ShiftTemplate)).all()
+    cycles = {cycle.id: cycle for cycle in session.exec(select(TemplateCycle)).all()}
+    return templates, cycles
+
+def in_cycle(tmpl, cycle, day):
+    """True when day (a date on the template's weekday) is in the template's week of its cycle."""
+    if cycle is None:
+        return True
+    week = ((day - cycle.anchor_date.date()).days // 7) % cycle.length_weeks
+    return week == (tmpl.cycle_week or 0)
+
+def template_occurrences(tmpl, cycle, first_day, days):
+    """(start, end) of the template on each day in [first_day, first_day + days) it applies to."""
+    start_clock, end_clock = _parse_hhmm(tmpl.start_time), _parse_hhmm(tmpl.end_time)
+    last_day = first_day + timedelta(days=days)
+    # Template day_of_week is 0=Monday; the window may start on any day
+    day = first_day + timedelta(days=(tmpl.day_of_week - first_day.weekday()) % 7)
+    occurrences = []
+    while day < last_day:
+        if in_cycle(tmpl, cycle, day):
+            start = datetime.combine(day, start_clock)
+            end = datetime.combine(day, end_clock)
+            # Overnight shifts (end <= start) finish the next day
+            if end <= start:
+                end += timedelta(days=1)
+            occurrences.append((start, end))
+        day += timedelta(days=7)
+    return occurrences
+
+def template_targets(templates, cycles, start_date, num_weeks):
+    """Shift rows for each template occurrence in num_weeks weeks from start_date (locked, as templates are)."""
+    week_starts = [start_date + timedelta(weeks=i) for i in range(num_weeks)]
+    first_day = start_date.date()
+    rows = []
+    for tmpl in templates:
+        fields = {
+            "employee_id": tmpl.employee_id,
+            "role_id": tmpl.role_id,
+            "location": tmpl.location,
+            "booth_number": tmpl.booth_number,
+            "is_locked": True,
+        }
+        for start, end in template_occurrences(tmpl, cycles.get(tmpl.cycle_id), first_day, 7 * num_weeks):
+            rows.append({**fields, "start_time": start, "end_time": end, "week": (start.date() - first_day).days // 7})
+    rows.sort(key=lambda r: (r["week"], r["start_time"]))
+    return week_starts, rows
+
+def locked_targets(base_shifts, base_week_start, num_weeks):
+    """Unlocked copies of the base week's shifts for each of the num_weeks following weeks."""
+    week_starts = [base_week_start + timedelta(weeks=i) for i in range(1, num_weeks + 1)]
+    rows = []
+    bases = [({
+        "employee_id": base.employee_id,
+        "role_id": base.role_id,
+        "notes": base.notes,
+        "location": base.location,
+        "booth_number": base.booth_number,
+        "is_vacation": base.is_vacation,
+        "is_locked": False,  # Projected shifts are not locked
+    }, base.start_time, base.end_time) for base in base_shifts]
+    for week in range(num_weeks):
+        offset = timedelta(weeks=week + 1)
+        for fields, start, end in bases:
+            rows.append({**fields, "start_time": start + offset, "end_time": end + offset, "week": week})
+    return week_starts, rows
+
+# --- Existing shifts ---
+def existing_shifts(session, rows):
+    """(id, employee_id, start_time, is_locked) of every shift starting on the targets' days, one query."""
+    if not rows:
+        return []
+    first = min(r["start_time"] for r in rows).replace(hour=0, minute=0, second=0, microsecond=0)
+    last = max(r["start_time"] for r in rows).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return session.exec(select(Shift.id, Shift.employee_id, Shift.start_time, Shift.is_locked).where(
+        Shift.start_time >= first,
+        Shift.start_time < last
+    )).all()
+
+# --- Plans ---
+def plan_templates(week_starts, rows, existing):
+    plan = Plan(week_starts)
+    taken = {(emp_id, start) for _, emp_id, start, is_locked in existing if is_locked}
+    for row in rows:
+        key = (row["employee_id"], row["start_time"])
+        if key in taken:
+            plan.skip(row)
+        else:
+            plan.create(row)
+            taken.add(key)
+    return plan
+
+def plan_locked(week_starts, rows, existing):
+    plan = Plan(week_starts)
+    by_day = defaultdict(list)  # (employee_id, date) -> [(id, is_locked)]
+    for shift_id, emp_id, start, is_locked in existing:
+        by_day[(emp_id, start.date())].append((shift_id, is_locked))
+    targets = defaultdict(list)  # (employee_id, date) -> rows, in order
+    for row in rows:
+        targets[(row["employee_id"], row["start_time"].date())].append(row)
+    for key, day_rows in targets.items():
+        current = by_day.get(key, [])
+        if any(is_locked for _, is_locked in current):
+            # Respect the future lock
+            for row in day_rows:
+                plan.skip(row)
+            continue
+        for shift_id, _ in current:
+            plan.delete(shift_id, day_rows[0]["week"])
+        for row in day_rows:
+            plan.create(row)
+    plan.creates.sort(key=lambda r: (r["week"], r["start_time"]))
+    return plan
+
+def template_preview(session, start_date, end_date):
+    """Unsaved shifts for the template occurrences overlapping [start_date, end_date) not applied yet."""
+    templates, cycles = load_templates(session)
+    if not templates:
+        return []
+    # From the day before, for overnight shifts running into the window
+    first = datetime.combine(start_date.date() - timedelta(days=1), time(0, 0))
+    weeks = (end_date - first).days // 7 + 1
+    week_starts, rows = template_targets(templates, cycles, first, weeks)
+    rows = [r for r in rows if r["start_time"] < end_date and r["end_time"] > start_date]
+    plan = plan_templates(week_starts, rows, existing_shifts(session, rows))
+    return [Shift(**{k: v for k, v in row.items() if k != "week"}) for row in plan.creates]
+
+def sync_locked(session, tmpl, cycle, today):
+    """Locks the template into the employee's next SYNC_WEEKS weeks: the first shift of each
+    occurrence day is moved onto the template, days without one get a new locked shift.
+    One query and two batched writes (not committed). Returns (updated, created)."""
+    occurrences = template_occurrences(tmpl, cycle, today, 7 * SYNC_WEEKS)
+    if not occurrences:
+        return 0, 0
+    first_day = datetime.combine(occurrences[0][0].date(), time(0, 0))
+    last_day = datetime.combine(occurrences[-1][0].date(), time(0, 0)) + timedelta(days=1)
+    first_shift = {}  # date -> id of the day's first shift
+    for shift_id, start in session.exec(select(Shift.id, Shift.start_time).where(
+        Shift.employee_id == tmpl.employee_id,
+        Shift.start_time >= first_day,
+        Shift.start_time < last_day
+    ).order_by(Shift.start_time, Shift.id)).all():
+        first_shift.setdefault(start.date(), shift_id)
+
+    fields = {"role_id": tmpl.role_id, "location": tmpl.location, "booth_number": tmpl.booth_number, "is_locked": True}
+    updates, creates = [], []
+    for start, end in occurrences:
+        if start.date() in first_shift:
+            updates.append({"id": first_shift[start.date()], "start_time": start, "end_time": end, **fields})
+        else:
+            creates.append({"employee_id": tmpl.employee_id, "start_time": start, "end_time": end, **fields})
+    shift_bulk.update_rows(session, updates)
+    shift_bulk.insert_shifts(session, creates)
+    return len(updates), len(creates)
+
+def apply(session, plan):
+    """Writes the plan (not committed). Returns the created shift rows."""
+    if plan.deletes:
+        shift_bulk.delete_shifts(session, plan.deletes, skip_locked=False)
+    return shift_bulk.insert_shifts(session, plan.creates)
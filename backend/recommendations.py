@@ -0,0 +1,155 @@
+"""
+Ranked employee recommendations for one or many shift slots.
+
+All data for the slots' weeks is prefetched in a constant number of queries
+(active employees, role links, the employees' shifts and series occurrences in
+the window, weekly hours from the ledger; availability comes from the compiled
+masks), then every (slot, employee) pair is scored with NumPy arithmetic. Rules:
+
+1. Vacation this week: full-time never, part-time only if willing
+2. Role match (default or secondary role) when the slot has a role
+3. No conflicting shift
+4. Availability rows allow the slot (availability_mask work mask)
+5. Weekly hours stay within max_weekly_hours (scheduling_rules)
+6. no_plaza employees are not recommended for Plaza slots (scheduling_rules)
+7. Projected daily hours over daily_hours_preferred cost its penalty (scheduling_rules)
+
+Results are sorted by score, then seniority (hire date).
+"""
+from datetime import datetime, timedelta
+import numpy as np
+from sqlmodel import select
+from models import Employee, EmployeeRole, Shift
+from autofill_engine import to_minutes, employee_conflicts
+import availability_mask
+from week_hours import week_start_of, shift_hours, get_weeks_hours
+import shift_series
+from scheduling_rules import RULES, RuleContext
+
+DAILY_HOURS_PREFERRED = RULES.param("daily_hours_preferred", "hours")
+LONG_DAY_PENALTY = RULES.param("daily_hours_preferred", "penalty")
+RECOMMENDATION_RULES = RULES.compile(["max_weekly_hours", "no_plaza", "daily_hours_preferred"])
+
+class Slot:
+    """A time slot to staff: an existing open shift or an ad-hoc (start, end, role, location)."""
+
+    def __init__(self, start_time, end_time, role_id=None, shift_id=None, location=None):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.role_id = role_id
+        self.shift_id = shift_id
+        self.location = location
+
+    @classmethod
+    def from_shift(cls, shift):
+        return cls(shift.start_time, shift.end_time, shift.role_id, shift.id, shift.location)
+
+def recommend(session, slots):
+    """Returns (employees by id, [[{"employee_id", "score", "reasons"}] per slot])."""
+    employees = session.exec(select(Employee).where(Employee.is_active == True).order_by(Employee.id)).all()
+    if not slots or not employees:
+        return {e.id: e for e in employees}, [[] for _ in slots]
+    n, k = len(slots), len(employees)
+    emp_ids = [e.id for e in employees]
+    emp_index = {e.id: j for j, e in enumerate(employees)}
+
+    # --- Prefetch (constant number of queries) ---
+    links = session.exec(select(EmployeeRole.employee_id, EmployeeRole.role_id).where(EmployeeRole.employee_id.in_(emp_ids))).all()
+    compiled = availability_mask.get_compiled(session, employees)
+    weeks = sorted({week_start_of(s.start_time) for s in slots})
+    window_start, window_end = weeks[0], weeks[-1] + timedelta(days=7)
+    window_end = max(window_end, max(s.end_time for s in slots))
+    existing = session.exec(select(Shift).where(
+        Shift.employee_id.in_(emp_ids),
+        Shift.start_time < window_end,
+        Shift.end_time > window_start
+    )).all() + shift_series.expand(session, window_start, window_end, emp_ids)
+    hours_map = get_weeks_hours(session, emp_ids, weeks)
+
+    # --- Slot arrays ---
+    week_index = {w: i for i, w in enumerate(weeks)}
+    slot_week = np.array([week_index[week_start_of(s.start_time)] for s in slots])
+    slot_start = np.array([to_minutes(s.start_time) for s in slots], dtype=np.int64)
+    slot_end = np.array([to_minutes(s.end_time) for s in slots], dtype=np.int64)
+    duration = np.array([shift_hours(s.start_time, s.end_time) for s in slots])
+
+    # --- Role ---
+    role_ok = np.ones((n, k), dtype=bool)
+    roles = {s.role_id for s in slots if s.role_id is not None}
+    if roles:
+        has_role = {r: np.array([e.default_role_id == r for e in employees]) for r in roles}
+        for emp_id, role_id in links:
+            if role_id in has_role:
+                has_role[role_id][emp_index[emp_id]] = True
+        for i, s in enumerate(slots):
+            if s.role_id is not None:
+                role_ok[i] = has_role[s.role_id]
+
+    # --- Vacation in the slot's week ---
+    vacation = np.zeros((len(weeks), k), dtype=bool)
+    for s in existing:
+        if s.is_vacation:
+            w = week_index.get(week_start_of(s.start_time))
+            if w is not None and s.end_time <= weeks[w] + timedelta(days=7):
+                vacation[w, emp_index[s.employee_id]] = True
+    is_ft = np.array([bool(e.is_full_time) for e in employees])
+    willing = np.array([bool(e.willing_to_work_vacation_week) for e in employees])
+    on_vacation = vacation[slot_week]
+    vacation_ok = ~on_vacation | (~is_ft & willing)[None, :]
+
+    # --- Conflicts and availability ---
+    conflict = employee_conflicts(slot_start, slot_end, emp_index,
+                                  [s.employee_id for s in existing],
+                                  [to_minutes(s.start_time) for s in existing],
+                                  [to_minutes(s.end_time) for s in existing], k)
+    avail_ok = availability_mask.work_matrix(slots, compiled)
+
+    # --- Weekly hours ---
+    weekly = np.zeros((len(weeks), k))
+    for (emp_id, week), hours in hours_map.items():
+        weekly[week_index[week], emp_index[emp_id]] = hours
+    projected_weekly = weekly[slot_week] + duration[:, None]
+    max_hours = np.array([e.max_weekly_hours if e.max_weekly_hours else np.inf for e in employees])
+
+    # --- Daily hours (shifts starting and ending within the slot's day) ---
+    days = sorted({s.start_time.date() for s in slots})
+    day_index = {d: i for i, d in enumerate(days)}
+    daily = np.zeros((len(days), k))
+    for s in existing:
+        d = day_index.get(s.start_time.date())
+        if d is not None and s.end_time < datetime.combine(days[d], datetime.min.time()) + timedelta(days=1):
+            daily[d, emp_index[s.employee_id]] += shift_hours(s.start_time, s.end_time)
+    slot_daily = daily[[day_index[s.start_time.date()] for s in slots]]
+    projected_daily = slot_daily + duration[:, None]
+
+    # --- Scheduling rules: weekly cap, no_plaza, long days ---
+    no_plaza = np.array([bool(e.no_plaza) or c.notes.no_plaza for e, c in zip(employees, compiled)], dtype=bool)
+    checks = RECOMMENDATION_RULES(RuleContext(
+        weekly=weekly[slot_week], daily=slot_daily, duration=duration[:, None], cap=max_hours[None, :],
+        location=np.array([s.location for s in slots], dtype=object)[:, None], no_plaza=no_plaza[None, :],
+    ))
+    long_day = ~checks["daily_hours_preferred"]
+
+    valid = role_ok & vacation_ok & ~conflict & avail_ok & checks["max_weekly_hours"] & checks["no_plaza"]
+    score = np.where(long_day, 100 - LONG_DAY_PENALTY, 100)
+
+    # --- Rank ---
+    seniority = sorted(range(k), key=lambda j: employees[j].hire_date or datetime.max)
+    seniority_pos = np.empty(k, dtype=np.int64)
+    seniority_pos[seniority] = np.arange(k)
+
+    results = []
+    for i in range(n):
+        cols = np.flatnonzero(valid[i])
+        cols = cols[np.lexsort((seniority_pos[cols], -score[i, cols]))]
+        ranked = []
+        for j in cols:
+            reasons = []
+            if on_vacation[i, j]:
+                reasons.append("Willing to work during vacation week")
+            reasons.append(f"Weekly: {projected_weekly[i, j]:.1f} hrs")
+            if long_day[i, j]:
+                reasons.append(f"Long Day: {projected_daily[i, j]:.1f} hrs")
+            ranked.append({"employee_id": employees[j].id, "score": int(score[i, j]), "reasons": reasons})
+        results.append(ranked)
+    return {e.id: e for e in employees}, results
@@ -0,0 +1,160 @@
+"""
+Call rotation for the full-time list of GET /callsheet/rotation/.
+
+Full-time employees (optionally of one default role) are called in seniority
+order, starting after the last one called. The order is persisted as a ring of
+RotationMember rows per context ("rotation_ft" or "rotation_ft:<role_id>"):
+each member points at the next one, so next_employee_id() is a primary key
+lookup from the context's RotationState.last_employee_id.
+
+mark_called() moves RotationState along with last_call_time. Contexts without a
+RotationState yet (databases from before the ring) start from the most recent
+last_call_time, found through ix_employee_last_call.
+
+Rings are rebuilt on the write path: any write changing who is full time, a
+default role or a hire date marks the session, and its commit rebuilds every
+ring (rebuild()) in the same transaction, so readers never write. Startup runs
+rebuild() as well, since scripts may edit employees behind the ORM's back.
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, inspect, func, insert
+from sqlalchemy.orm import Session
+from sqlmodel import select, delete
+from models import Employee, EmployeeWeekHours, RotationMember, RotationState
+from scheduling_rules import RULES
+
+CONTEXT_PREFIX = "rotation_ft"
+DEFAULT_MAX_HOURS = RULES.param("weekly_overtime", "hours")
+# Employee fields that decide ring membership and order
+RING_FIELDS = ("is_full_time", "default_role_id", "hire_date")
+
+def context_key(role_id=None):
+    return f"{CONTEXT_PREFIX}:{role_id}" if role_id else CONTEXT_PREFIX
+
+def seniority_order(query):
+    # Oldest hire first, no hire date last
+    return query.order_by(Employee.hire_date.is_(None), Employee.hire_date, Employee.id)
+
+def load_employees(session, role_id, week_start):
+    """[(employee row mapping, raw hours this week)] in seniority order.
+
+    One aggregate query against the weekly hours ledger. Rows are plain column
+    mappings (what the endpoint serializes), skipping ORM instance loading."""
+    table = Employee.__table__
+    hours = func.coalesce(func.sum(EmployeeWeekHours.raw_hours), 0.0).label("week_hours")
+    query = select(table, hours).outerjoin(
+        EmployeeWeekHours,
+        (EmployeeWeekHours.employee_id == table.c.id) & (EmployeeWeekHours.week_start == week_start)
+    )
+    if role_id:
+        query = query.where(table.c.default_role_id == role_id)
+    query = query.group_by(table.c.id).order_by(table.c.hire_date.is_(None), table.c.hire_date, table.c.id)
+    rows = []
+    for row in session.connection().execute(query).mappings():
+        emp = dict(row)
+        rows.append((emp, round(emp.pop("week_hours"), 6)))
+    return rows
+
+# --- Ring ---
+def rebuild(session):
+    """Rebuilds every context's ring: the global one and one per default role of the full-time employees.
+
+    Core statements on the session's connection, so it also runs from the commit
+    hook; not committed. Returns {context key: ids in ring order}."""
+    connection = session.connection()
+    rows = connection.execute(seniority_order(
+        select(Employee.id, Employee.default_role_id).where(Employee.is_full_time == True)
+    )).all()
+    rings = defaultdict(list)
+    for emp_id, role_id in rows:
+        rings[context_key()].append(emp_id)
+        if role_id:
+            rings[context_key(role_id)].append(emp_id)
+    connection.execute(delete(RotationMember))
+    members = [
+        {"context_key": key, "employee_id": emp_id, "position": i, "next_employee_id": ids[(i + 1) % len(ids)]}
+        for key, ids in rings.items() for i, emp_id in enumerate(ids)
+    ]
+    if members:
+        connection.execute(insert(RotationMember.__table__), members)
+    return dict(rings)
+
+def last_called(session, role_id=None):
+    """Last called ring member of the context: RotationState, else the latest last_call_time."""
+    key = context_key(role_id)
+    state = session.get(RotationState, key)
+    if state and session.get(RotationMember, (key, state.last_employee_id)):
+        return state.last_employee_id
+    query = select(Employee.id).where(Employee.is_full_time == True, Employee.last_call_time != None)
+    if role_id:
+        query = query.where(Employee.default_role_id == role_id)
+    return session.exec(query.order_by(Employee.last_call_time.desc()).limit(1)).first()
+
+def next_employee_id(session, role_id=None):
+    """Full-time employee to call next, or None when the context has no full-time employees."""
+    key = context_key(role_id)
+    last_id = last_called(session, role_id)
+    member = session.get(RotationMember, (key, last_id)) if last_id is not None else None
+    if member:
+        return member.next_employee_id
+    return session.exec(select(RotationMember.employee_id).where(RotationMember.context_key == key, RotationMember.position == 0)).first()
+
+def rotate(employees, next_id):
+    """employees (seniority order, rows from load_employees) starting at next_id."""
+    for i, emp in enumerate(employees):
+        if emp["id"] == next_id:
+            return employees[i:] + employees[:i]
+    return employees
+
+def mark_called(session, employee, when=None):
+    """Records a call: last_call_time plus the RotationState of the employee's contexts (not committed)."""
+    employee.last_call_time = when or datetime.now()
+    session.add(employee)
+    if not employee.is_full_time:
+        return
+    for key in {context_key(), context_key(employee.default_role_id)}:
+        state = session.get(RotationState, key)
+        if state:
+            state.last_employee_id = employee.id
+            state.updated_at = datetime.utcnow()
+        else:
+            state = RotationState(context_key=key, last_employee_id=employee.id)
+        session.add(state)
+
+# --- Rebuild on employee writes ---
+STALE = "rotation_rings_stale"  # session.info flag set by employee writes in the transaction
+
+def _mark_stale(session):
+    session.info[STALE] = True
+
+@event.listens_for(Session, "after_flush")
+def _mark_stale_on_employee_change(session, flush_context):
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Employee):
+            _mark_stale(session)
+            return
+    for obj in session.dirty:
+        if isinstance(obj, Employee):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in RING_FIELDS):
+                _mark_stale(session)
+                return
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_stale_on_bulk_employee_change(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is Employee:
+            _mark_stale(orm_execute_state.session)
+
+@event.listens_for(Session, "before_commit")
+def _rebuild_stale_rings(session):
+    # Flush first: pending employee changes mark the session too
+    session.flush()
+    if session.info.pop(STALE, False):
+        rebuild(session)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_stale_rings(session, previous_transaction):
+    session.info.pop(STALE, None)
@@ -0,0 +1,49 @@
+"""
+Resident set size of this process, sampled while OCR works on a page
+(ocr_worker.read_page) to report the peak memory of each upload.
+"""
+import os
+import resource
+import sys
+import threading
+
+SAMPLE_SECONDS = 0.02
+
+def current_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # No /proc (macOS): the peak so far is the best there is
+        return peak_so_far_mb()
+
+def peak_so_far_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+class PeakSampler:
+    """with PeakSampler() as rss: ... then rss.start_mb and rss.peak_mb."""
+
+    def __init__(self):
+        self.start_mb = self.peak_mb = current_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_SECONDS):
+            self.peak_mb = max(self.peak_mb, current_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_mb())
+        return False
+
+    @property
+    def growth_mb(self):
+        return self.peak_mb - self.start_mb
@@ -0,0 +1,144 @@
+"""
+Scheduling rules, declared once.
+
+Every rule the endpoints apply (weekly cap and overtime, daily limits, the
+maintenance lunch, probation, call sheet page thresholds, no_plaza, rest
+between shifts) is a Rule below with its parameters. Rules with a check are
+evaluated over a RuleContext: NumPy arrays for a schedule window that broadcast
+to (slots, employees), e.g. weekly (n, k), duration (n, 1), cap (1, k). A check
+returns True where the (slot, employee) pair passes.
+
+Consumers compile the rules they apply once (RULES.compile([...])) and call the
+result with their context:
+
+    recommendations.py      max_weekly_hours, no_plaza, daily_hours_preferred
+    autofill_engine.py      max_weekly_hours, no_plaza (+ overtime / daily limit in the optimizer)
+    shift_validation.py     max_weekly_hours, min_rest
+    callsheet.py            weekly_overtime, part_time_hours, probation, daily_safety_limit, no_plaza
+
+Each evaluation is timed per rule; RULES.report() (GET /rules/) returns the
+declarations with call counts, pairs checked and time spent.
+"""
+import threading
+import time as _time
+from contextlib import contextmanager
+import numpy as np
+
+HARD = "hard"  # Rules a pairing out
+WARNING = "warning"  # Flags the pairing (overtime, long days)
+CLASSIFICATION = "classification"  # Sorts candidates (call sheet pages, probation)
+ADJUSTMENT = "adjustment"  # Changes how hours are counted
+
+class Rule:
+    def __init__(self, name, kind, description, params, check=None):
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self.params = params
+        self.check = check  # (context, params) -> bool array; None for rules applied elsewhere (sweeps, hour counting)
+
+class RuleContext:
+    """Arrays the checks read. Only the fields of the evaluated rules need to be set."""
+
+    def __init__(self, **arrays):
+        self.__dict__.update(arrays)
+
+def _projected(c):
+    return c.weekly + c.duration
+
+RULE_LIST = [
+    Rule("max_weekly_hours", HARD, "Projected weekly hours stay within the employee's max_weekly_hours (no cap = inf)",
+         {"tolerance": 1e-9},
+         lambda c, p: _projected(c) <= c.cap + p["tolerance"]),
+    Rule("weekly_overtime", WARNING, "Projected weekly hours over this are overtime",
+         {"hours": 40.0},
+         lambda c, p: _projected(c) <= p["hours"]),
+    Rule("part_time_hours", CLASSIFICATION, "Full-time employees scheduled at or under this are called with part-timers (call sheet page 1/3)",
+         {"hours": 32.0},
+         lambda c, p: c.weekly <= p["hours"]),
+    Rule("daily_hours_preferred", WARNING, "Projected daily hours over this are a long day (recommendation penalty)",
+         {"hours": 8.0, "penalty": 20},
+         lambda c, p: c.daily + c.duration <= p["hours"]),
+    Rule("daily_safety_limit", WARNING, "Projected daily hours over this are unsafe (call sheet warning, optimizer ceiling)",
+         {"hours": 16.0},
+         lambda c, p: c.daily + c.duration <= p["hours"]),
+    Rule("no_plaza", HARD, "Employees flagged no_plaza (column or notes) do not work this location",
+         {"location": "Plaza"},
+         lambda c, p: ~((c.location == p["location"]) & c.no_plaza)),
+    Rule("probation", CLASSIFICATION, "Employees hired within this many days are probationary (passes when past probation)",
+         {"days": 90},
+         lambda c, p: ~(c.employed_days <= p["days"])),
+    Rule("min_rest", WARNING, "Hours off between two worked shifts (checked by the shift_validation sweep)",
+         {"hours": 8}),
+    Rule("maintenance_lunch", ADJUSTMENT, "Maintenance shifts this long or longer are paid minus an unpaid lunch (week_hours)",
+         {"min_shift_hours": 7.5, "deduction_hours": 0.5}),
+]
+
+class CompiledRules:
+    """A fixed list of rules bound to a RuleSet; calling it evaluates them in order."""
+
+    def __init__(self, rule_set, names):
+        self.rule_set = rule_set
+        self.rules = [rule_set[name] for name in names]
+        for rule in self.rules:
+            if rule.check is None:
+                raise ValueError(f"Rule {rule.name} has no vectorized check")
+
+    def __call__(self, context):
+        """{rule name: bool array} (True = pass)."""
+        return {rule.name: self.rule_set.run(rule, context) for rule in self.rules}
+
+class RuleSet:
+    def __init__(self, rules):
+        self._rules = {rule.name: rule for rule in rules}
+        self._lock = threading.Lock()
+        self.reset_timings()
+
+    def __getitem__(self, name):
+        return self._rules[name]
+
+    def param(self, name, key):
+        return self._rules[name].params[key]
+
+    def compile(self, names):
+        return CompiledRules(self, names)
+
+    def run(self, rule, context):
+        with self.timed(rule.name) as record:
+            result = np.asarray(rule.check(context, rule.params), dtype=bool)
+            record(result.size)
+        return result
+
+    @contextmanager
+    def timed(self, name, pairs=0):
+        """Times a block as an evaluation of rule `name`; the block may report the pairs it checked."""
+        counted = [pairs]
+        start = _time.perf_counter()
+        try:
+            yield lambda n: counted.__setitem__(0, n)
+        finally:
+            elapsed = _time.perf_counter() - start
+            with self._lock:
+                stats = self._timings[name]
+                stats["calls"] += 1
+                stats["pairs"] += counted[0]
+                stats["seconds"] += elapsed
+
+    def reset_timings(self):
+        with self._lock:
+            self._timings = {name: {"calls": 0, "pairs": 0, "seconds": 0.0} for name in self._rules}
+
+    def report(self):
+        with self._lock:
+            return [{
+                "name": rule.name,
+                "kind": rule.kind,
+                "description": rule.description,
+                "params": rule.params,
+                "vectorized": rule.check is not None,
+                "calls": self._timings[rule.name]["calls"],
+                "pairs": self._timings[rule.name]["pairs"],
+                "total_ms": round(self._timings[rule.name]["seconds"] * 1000, 3),
+            } for rule in self._rules.values()]
+
+RULES = RuleSet(RULE_LIST)
@@ -5,6 +5,7 @@ import re
 from datetime import datetime
 from sqlmodel import Session, create_engine, select
 from models import Employee
+import orientation
 import sys
 
 # Setup DB
@@ -61,14 +62,21 @@ nicknames = {
     "chris": "christopher", "christopher": "chris"
 }
 
+def score_rows(img):
+    # Orientation fallback: read the rotated page, score it by employee rows found
+    text = pytesseract.image_to_string(img)
+    return sum(1 for line in text.split('\n') if pattern.search(line)), text
+
 images = sorted(glob.glob("extracted_page_*.tiff"))
 updates = 0
 created = 0
 
 for img_path in images:
     print(f"Processing {img_path}...")
-    img = Image.open(img_path).rotate(180, expand=True)
-    text = pytesseract.image_to_string(img)
+    img = Image.open(img_path)
+    found = orientation.detect(img, score_rows)
+    print(f"  Orientation: {found.angle} clockwise (by {found.method})")
+    text = found.result if found.result is not None else pytesseract.image_to_string(orientation.upright(img, found.angle))
     lines = text.split('\n')
     
     # Determine Page Type
@@ -154,3 +162,4 @@ for img_path in images:
 session.commit()
 print(f"Total Updates: {updates}")
 print(f"Total Created: {created}")
+print(f"Orientation: {orientation.stats()}")
@@ -0,0 +1,150 @@
+"""
+Bulk shift writes: creation for POST /shifts/ and POST /shifts/bulk/, set-based
+update and delete for POST /shifts/bulk-update/ and /shifts/bulk-delete/.
+
+Rows are built in memory and written with one batched INSERT ... RETURNING id
+inside the caller's transaction, instead of an add/commit/refresh per shift
+(each commit is an fsync on SQLite). A row may name another row of the batch as
+its parent ("parent": index); parent ids are filled in by one UPDATE after the
+insert, still before the caller commits.
+
+update_shifts() and delete_shifts() are one UPDATE/DELETE ... RETURNING per
+chunk of ids (or a single statement when only filters are given: date range,
+location, role), skipping locked shifts unless told otherwise. update_rows()
+writes different values per shift with one executemany.
+
+These statements bypass the ORM unit of work, so the changed shifts are
+reported to shift_events for the hours ledger, the interval index and the call
+sheet cache.
+"""
+from sqlalchemy import insert, update, delete, select, bindparam
+from models import Shift
+import shift_events
+
+COLUMNS = [column.name for column in Shift.__table__.columns if column.name != "id"]
+DEFAULTS = {"is_repeating": False, "is_vacation": False, "is_locked": False}
+
+def insert_shifts(session, rows):
+    """Inserts rows (dicts of Shift columns, optional "parent" index) and returns them with id and parent_id set.
+
+    Runs inside the session's transaction; the caller commits."""
+    if not rows:
+        return []
+    table = Shift.__table__
+    params = [{column: row.get(column, DEFAULTS.get(column)) for column in COLUMNS} for row in rows]
+    connection = session.connection()
+    # Ids come back per row, in the order of params (batched multi-row INSERT ... RETURNING)
+    ids = connection.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), params).scalars().all()
+    if len(ids) != len(params):
+        raise RuntimeError(f"Inserted {len(params)} shifts but got {len(ids)} ids back")
+    created = [{"id": shift_id, **values} for shift_id, values in zip(ids, params)]
+
+    links = []
+    for row, shift in zip(rows, created):
+        if row.get("parent") is not None:
+            shift["parent_id"] = created[row["parent"]]["id"]
+            links.append({"shift_id": shift["id"], "parent": shift["parent_id"]})
+    if links:
+        connection.execute(update(table).where(table.c.id == bindparam("shift_id")).values(parent_id=bindparam("parent")), links)
+
+    shift_events.record(session, [
+        shift_events.ShiftChange(shift["id"], None, shift_events.ShiftSpan(*(shift[f] for f in shift_events.SPAN_FIELDS)))
+        for shift in created
+    ])
+    return created
+
+# --- Set-based update / delete ---
+# Ids per statement, under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+def _where(table, ids, filters):
+    """WHERE clauses per statement: one set for filters only, else one per chunk of ids."""
+    conditions = []
+    filters = filters or {}
+    if filters.get("start_date") is not None:
+        conditions.append(table.c.start_time >= filters["start_date"])
+    if filters.get("end_date") is not None:
+        conditions.append(table.c.start_time < filters["end_date"])
+    if filters.get("location") is not None:
+        conditions.append(table.c.location == filters["location"])
+    if filters.get("role_id") is not None:
+        conditions.append(table.c.role_id == filters["role_id"])
+    if ids is None:
+        return [conditions]
+    ids = sorted(set(ids))
+    return [conditions + [table.c.id.in_(ids[i:i + CHUNK_SIZE])] for i in range(0, len(ids), CHUNK_SIZE)]
+
+def _locked_ids(connection, table, where):
+    return [row[0] for row in connection.execute(select(table.c.id).where(*where, table.c.is_locked == True))]
+
+def skips_locked(values, force=False):
+    """Whether an update of values leaves locked shifts alone: unless forced, they only take lock changes."""
+    return not force and set(values) != {"is_locked"}
+
+def update_shifts(session, values, ids=None, filters=None, skip_locked=True):
+    """UPDATE of the shifts matching ids and/or filters (start_date, end_date, location, role_id).
+
+    Locked shifts are left out when skip_locked. Returns (updated ids, skipped locked ids);
+    runs inside the session's transaction, the caller commits."""
+    table = Shift.__table__
+    connection = session.connection()
+    span_columns = [table.c[f] for f in shift_events.SPAN_FIELDS]
+    updated, skipped, changes = [], [], []
+    for where in _where(table, ids, filters):
+        if skip_locked:
+            skipped += _locked_ids(connection, table, where)
+            where = where + [table.c.is_locked.is_not(True)]
+        before = {}
+        if any(f in values for f in shift_events.SPAN_FIELDS):
+            before = {row[0]: shift_events.ShiftSpan(*row[1:]) for row in connection.execute(select(table.c.id, *span_columns).where(*where))}
+        for row in connection.execute(update(table).where(*where).values(**values).returning(table.c.id, *span_columns)):
+            updated.append(row[0])
+            after = shift_events.ShiftSpan(*row[1:])
+            if row[0] in before and before[row[0]] != after:
+                changes.append(shift_events.ShiftChange(row[0], before[row[0]], after))
+    shift_events.record(session, changes)
+    return sorted(updated), sorted(skipped)
+
+def delete_shifts(session, ids=None, filters=None, skip_locked=True):
+    """DELETE of the shifts matching ids and/or filters, leaving locked shifts unless skip_locked is False.
+
+    Returns (deleted ids, skipped locked ids); the caller commits."""
+    table = Shift.__table__
+    connection = session.connection()
+    span_columns = [table.c[f] for f in shift_events.SPAN_FIELDS]
+    deleted, skipped, changes = [], [], []
+    for where in _where(table, ids, filters):
+        if skip_locked:
+            skipped += _locked_ids(connection, table, where)
+            where = where + [table.c.is_locked.is_not(True)]
+        for row in connection.execute(delete(table).where(*where).returning(table.c.id, *span_columns)):
+            deleted.append(row[0])
+            changes.append(shift_events.ShiftChange(row[0], shift_events.ShiftSpan(*row[1:]), None))
+    shift_events.record(session, changes)
+    return sorted(deleted), sorted(skipped)
+
+def update_rows(session, rows):
+    """Per-row UPDATE by id in one executemany. rows: dicts with "id" and the same other columns (caller commits)."""
+    if not rows:
+        return
+    table = Shift.__table__
+    connection = session.connection()
+    columns = [column for column in rows[0] if column != "id"]
+    ids = [row["id"] for row in rows]
+    span_columns = [table.c[f] for f in shift_events.SPAN_FIELDS]
+    before = {}
+    for i in range(0, len(ids), CHUNK_SIZE):
+        for row in connection.execute(select(table.c.id, *span_columns).where(table.c.id.in_(ids[i:i + CHUNK_SIZE]))):
+            before[row[0]] = shift_events.ShiftSpan(*row[1:])
+    # Bind names must differ from the column names being set
+    statement = update(table).where(table.c.id == bindparam("row_id")).values({column: bindparam(f"new_{column}") for column in columns})
+    connection.execute(statement, [{"row_id": row["id"], **{f"new_{column}": row[column] for column in columns}} for row in rows])
+
+    changes = []
+    for row in rows:
+        if row["id"] not in before:
+            continue
+        after = before[row["id"]]._replace(**{f: row[f] for f in shift_events.SPAN_FIELDS if f in row})
+        if after != before[row["id"]]:
+            changes.append(shift_events.ShiftChange(row["id"], before[row["id"]], after))
+    shift_events.record(session, changes)
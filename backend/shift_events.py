@@ -0,0 +1,114 @@
+"""
+Shift change notifications.
+
+Modules that keep derived state about shifts (the interval index, the weekly
+hours ledger, the call sheet cache) subscribe here instead of being called from
+every endpoint that writes a shift.
+
+ORM writes are picked up automatically when the session flushes. Set-based
+statements (UPDATE/DELETE/INSERT executed directly) bypass the unit of work, so
+code issuing them reports the affected rows with record().
+"""
+from collections import namedtuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from models import Shift
+
+# Only the columns derived state cares about. before/after are None for inserts/deletes.
+ShiftSpan = namedtuple("ShiftSpan", "employee_id role_id start_time end_time is_vacation")
+ShiftChange = namedtuple("ShiftChange", "shift_id before after")
+
+SPAN_FIELDS = ShiftSpan._fields
+
+_flush_listeners = []  # fn(session, changes) - runs inside the transaction
+_commit_listeners = []  # fn(changes) - runs once the transaction has committed
+
+def on_flush(fn):
+    """Registers fn(session, changes), called inside the writing transaction."""
+    _flush_listeners.append(fn)
+    return fn
+
+def on_commit(fn):
+    """Registers fn(changes), called after the writing transaction committed."""
+    _commit_listeners.append(fn)
+    return fn
+
+def span_of(shift):
+    """Current ShiftSpan of a Shift object (or any object/row with the same fields)."""
+    return ShiftSpan(*(getattr(shift, f) for f in SPAN_FIELDS))
+
+def _previous_span(shift, previous):
+    # Rows snapshotted before the flush; objects edited after a commit have expired
+    # attributes, so their history does not know the old values
+    shift_id = inspect(shift).identity[0] if inspect(shift).identity else None
+    if shift_id in previous:
+        return previous[shift_id]
+    state = shift._sa_instance_state
+    values = []
+    for f in SPAN_FIELDS:
+        history = state.attrs[f].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            values.append(getattr(shift, f))
+    return ShiftSpan(*values)
+
+def record(session, changes):
+    """Reports changes made outside the ORM unit of work (Core statements)."""
+    changes = list(changes)
+    if not changes:
+        return
+    for fn in _flush_listeners:
+        fn(session, changes)
+    session.info.setdefault("shift_changes", []).extend(changes)
+
+@event.listens_for(Session, "before_flush")
+def _snapshot_previous_shifts(session, flush_context, instances):
+    ids = [
+        inspect(obj).identity[0]
+        for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Shift) and inspect(obj).identity is not None
+    ]
+    previous = {}
+    table = Shift.__table__
+    columns = [table.c.id] + [table.c[f] for f in SPAN_FIELDS]
+    for i in range(0, len(ids), 500):
+        rows = session.connection().execute(select(*columns).where(table.c.id.in_(ids[i:i + 500])))
+        for row in rows:
+            previous[row[0]] = ShiftSpan(*row[1:])
+    session.info["shift_previous"] = previous
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_shifts(session, flush_context):
+    previous = session.info.pop("shift_previous", {})
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Shift):
+            changes.append(ShiftChange(obj.id, None, span_of(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Shift) and session.is_modified(obj):
+            before, after = _previous_span(obj, previous), span_of(obj)
+            if before != after:
+                changes.append(ShiftChange(obj.id, before, after))
+    for obj in session.deleted:
+        if isinstance(obj, Shift):
+            changes.append(ShiftChange(inspect(obj).identity[0], _previous_span(obj, previous), None))
+    record(session, changes)
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_shifts(session):
+    changes = session.info.pop("shift_changes", None)
+    if not changes:
+        return
+    for fn in _commit_listeners:
+        try:
+            fn(changes)
+        except Exception as e:
+            # Derived state has its own consistency checks; never fail a committed write
+            print(f"Shift change listener {fn.__name__} failed: {e}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_shifts(session):
+    session.info.pop("shift_changes", None)
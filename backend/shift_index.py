@@ -0,0 +1,135 @@
+"""
+In-memory per-employee interval index of shifts.
+
+Each employee has a list of (start_time, end_time, shift_id) sorted by start.
+Together with the longest shift duration seen for that employee, an overlap
+query only has to bisect to the window [start - longest, end) and scan the few
+entries in it, instead of a database round trip per candidate.
+
+The index is loaded once and kept in sync through shift_events. Writes made
+outside this process (scripts editing schedule.db) are not seen, so
+check_consistency() compares it against the database and can reload it.
+"""
+import threading
+from bisect import bisect_left, insort
+from datetime import timedelta
+from sqlmodel import select
+from models import Shift
+import shift_events
+
+class ShiftIntervalIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}  # employee_id -> sorted [(start, end, shift_id)]
+        self._longest = {}  # employee_id -> longest shift duration seen
+        self._owner = {}  # shift_id -> (employee_id, start, end)
+        self._pending = None  # Changes committed while a load is running
+        self.loaded = False
+
+    # --- Loading ---
+    def load(self, session):
+        """(Re)builds the index from the database."""
+        with self._lock:
+            self._pending = []
+        rows = session.exec(select(Shift.id, Shift.employee_id, Shift.start_time, Shift.end_time)).all()
+        with self._lock:
+            self._entries, self._longest, self._owner = {}, {}, {}
+            for shift_id, employee_id, start, end in rows:
+                self._add(shift_id, employee_id, start, end)
+            # Replay anything committed between the SELECT and now (apply is idempotent)
+            pending, self._pending = self._pending, None
+            self._apply(pending)
+            self.loaded = True
+        return len(rows)
+
+    def ensure_loaded(self, session):
+        if not self.loaded:
+            self.load(session)
+        return self
+
+    # --- Maintenance ---
+    def _add(self, shift_id, employee_id, start, end):
+        if start is None or end is None:
+            return
+        insort(self._entries.setdefault(employee_id, []), (start, end, shift_id))
+        duration = end - start
+        if duration > self._longest.get(employee_id, timedelta(0)):
+            self._longest[employee_id] = duration
+        self._owner[shift_id] = (employee_id, start, end)
+
+    def _remove(self, shift_id):
+        owner = self._owner.pop(shift_id, None)
+        if owner is None:
+            return
+        employee_id, start, end = owner
+        entries = self._entries.get(employee_id, [])
+        i = bisect_left(entries, (start, end, shift_id))
+        if i < len(entries) and entries[i][2] == shift_id:
+            entries.pop(i)
+
+    def _apply(self, changes):
+        for change in changes:
+            self._remove(change.shift_id)
+            if change.after is not None:
+                self._add(change.shift_id, change.after.employee_id, change.after.start_time, change.after.end_time)
+
+    def apply(self, changes):
+        """Applies committed ShiftChanges."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(changes)
+            if self.loaded:
+                self._apply(changes)
+
+    # --- Queries ---
+    def overlapping(self, employee_id, start, end, exclude_id=None):
+        """Returns ids of the employee's shifts with shift.start < end and shift.end > start."""
+        with self._lock:
+            entries = self._entries.get(employee_id)
+            if not entries:
+                return []
+            lo = bisect_left(entries, (start - self._longest[employee_id],))
+            hi = bisect_left(entries, (end,))
+            return [sid for (s, e, sid) in entries[lo:hi] if e > start and sid != exclude_id]
+
+    def has_conflict(self, employee_id, start, end, exclude_id=None):
+        return bool(self.overlapping(employee_id, start, end, exclude_id))
+
+    def shifts_starting(self, employee_id, start, end):
+        """Returns (start, end, shift_id) of the employee's shifts starting in [start, end)."""
+        with self._lock:
+            entries = self._entries.get(employee_id, [])
+            return entries[bisect_left(entries, (start,)):bisect_left(entries, (end,))]
+
+    def __len__(self):
+        return len(self._owner)
+
+    # --- Consistency ---
+    def check_consistency(self, session, repair=False):
+        """Compares the index with the shift table. With repair=True, reloads it on mismatch."""
+        rows = session.exec(select(Shift.id, Shift.employee_id, Shift.start_time, Shift.end_time)).all()
+        db = {shift_id: (employee_id, start, end) for shift_id, employee_id, start, end in rows}
+        with self._lock:
+            indexed = dict(self._owner)
+        missing = sorted(sid for sid in db if sid not in indexed)
+        stale = sorted(sid for sid in indexed if sid not in db)
+        mismatched = sorted(sid for sid in db if sid in indexed and db[sid] != indexed[sid])
+        consistent = not (missing or stale or mismatched)
+        if repair and not consistent:
+            self.load(session)
+        return {
+            "consistent": consistent,
+            "indexed": len(indexed),
+            "in_database": len(db),
+            "missing": missing,
+            "stale": stale,
+            "mismatched": mismatched,
+            "repaired": repair and not consistent,
+        }
+
+shift_index = ShiftIntervalIndex()
+shift_events.on_commit(shift_index.apply)
+
+def get_shift_index(session):
+    """Returns the process-wide index, loading it on first use."""
+    return shift_index.ensure_loaded(session)
@@ -0,0 +1,179 @@
+"""
+Recurring shifts stored as series (shift_series) instead of copied rows.
+
+A ShiftSeries holds the first occurrence, a rule and an optional end:
+
+    daily      every day
+    weekly     the first occurrence's weekday
+    mon-fri    weekdays (the first occurrence always counts, as before)
+    FREQ=...   any RRULE, expanded with dateutil
+
+Occurrences are only generated for the window a read asks for (expand). They
+come back as unsaved Shift objects with a negative id that encodes the series
+and the minutes since its first occurrence, so GET/PUT/DELETE /shifts/{id}
+take them like any other shift:
+
+  - editing one materializes it: a real Shift row is written and a
+    ShiftSeriesException (series, occurrence start, shift id) stops the
+    series from generating it again
+  - deleting one only writes the exception (shift_id None)
+
+Nothing is stored ahead, so every reader that looks at an employee's time asks
+for the generated occurrences of its own window as well: the hours readers in
+week_hours, overlap checks (overlapping), validation, recommendations,
+autofill, the call sheet, the agenda and the export.
+"""
+import math
+from datetime import timedelta
+from dateutil.rrule import rrulestr, rruleset
+from sqlmodel import select
+from models import Shift, ShiftSeries, ShiftSeriesException
+
+NAMED_RULES = {"daily": 1, "weekly": 7, "mon-fri": 1}  # rule -> step in days
+# Occurrence ids: -(series_id * OCCURRENCE_ID_SPAN + minutes since the first occurrence)
+OCCURRENCE_ID_SPAN = 2 ** 32
+
+def check_rule(rule, start_time):
+    """Raises ValueError when rule is neither a named rule nor a parseable RRULE."""
+    if rule in NAMED_RULES:
+        return
+    if not rule or "FREQ=" not in rule.upper():
+        raise ValueError(f"Unknown repeat rule '{rule}' (use daily, weekly, mon-fri or an RRULE)")
+    try:
+        rrulestr(rule, dtstart=start_time)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid RRULE '{rule}': {e}")
+
+def occurrence_id(series, start):
+    minutes = int((start - series.start_time).total_seconds() // 60)
+    return -(series.id * OCCURRENCE_ID_SPAN + minutes)
+
+def _decode(shift_id):
+    series_id, minutes = divmod(-shift_id, OCCURRENCE_ID_SPAN)
+    return series_id, minutes
+
+def starts(series, after, before):
+    """Occurrence starts of the series in [after, before), in order."""
+    if series.until is not None:
+        before = min(before, series.until)
+    first = series.start_time
+    if before <= first or before <= after:
+        return []
+    step_days = NAMED_RULES.get(series.rule)
+    if step_days is None:
+        rules = rruleset()
+        rules.rrule(rrulestr(series.rule, dtstart=first))
+        rules.rdate(first)
+        return [dt for dt in rules.between(after, before, inc=True) if dt < before]
+    step = timedelta(days=step_days)
+    k = max(0, math.ceil((after - first) / step))
+    result = []
+    current = first + k * step
+    while current < before:
+        if series.rule != "mon-fri" or current.weekday() < 5 or current == first:
+            result.append(current)
+        current += step
+    return result
+
+def occurrence(series, start):
+    """Unsaved Shift for the occurrence of series starting at start."""
+    return Shift(
+        id=occurrence_id(series, start),
+        employee_id=series.employee_id,
+        role_id=series.role_id,
+        start_time=start,
+        end_time=start + (series.end_time - series.start_time),
+        notes=series.notes,
+        location=series.location,
+        booth_number=series.booth_number,
+        is_vacation=series.is_vacation,
+        is_repeating=True,
+    )
+
+def expand(session, start_date, end_date, employee_ids=None):
+    """Generated occurrences overlapping [start_date, end_date), skipping exceptions.
+
+    employee_ids limits them to those employees' series (assigned occurrences only)."""
+    # Series still running a day before the window (shifts are shorter than a day); starts() clamps exactly
+    query = select(ShiftSeries).where(
+        ShiftSeries.start_time < end_date,
+        (ShiftSeries.until == None) | (ShiftSeries.until > start_date - timedelta(days=1))
+    )
+    if employee_ids is not None:
+        query = query.where(ShiftSeries.employee_id.in_(list(employee_ids)))
+    candidates = session.exec(query).all()
+    if not candidates:
+        return []
+    windows = {series.id: start_date - (series.end_time - series.start_time) for series in candidates}
+    exceptions = set(session.exec(select(ShiftSeriesException.series_id, ShiftSeriesException.occurrence_start).where(
+        ShiftSeriesException.series_id.in_(list(windows)),
+        ShiftSeriesException.occurrence_start >= min(windows.values()),
+        ShiftSeriesException.occurrence_start < end_date
+    )).all())
+    shifts = []
+    for series in candidates:
+        # Starts after (window start - duration) still overlap the window
+        after = windows[series.id] + timedelta(microseconds=1)
+        for start in starts(series, after, end_date):
+            if (series.id, start) not in exceptions:
+                shifts.append(occurrence(series, start))
+    return shifts
+
+def overlapping(session, employee_id, start, end, exclude_id=None):
+    """Ids of the employee's generated occurrences overlapping [start, end) (the interval index has stored shifts only)."""
+    return [s.id for s in expand(session, start, end, [employee_id]) if s.id != exclude_id]
+
+def _lookup(session, shift_id):
+    """(series, occurrence start) for a generated occurrence id that is still generated, else (None, None)."""
+    series_id, minutes = _decode(shift_id)
+    series = session.get(ShiftSeries, series_id)
+    if not series:
+        return None, None
+    start = series.start_time + timedelta(minutes=minutes)
+    if start not in starts(series, start, start + timedelta(minutes=1)):
+        return None, None
+    if session.get(ShiftSeriesException, (series_id, start)):
+        return None, None
+    return series, start
+
+def get(session, shift_id):
+    """Shift by id: a stored shift, or a generated occurrence for negative ids (None when missing)."""
+    if shift_id >= 0:
+        return session.get(Shift, shift_id)
+    series, start = _lookup(session, shift_id)
+    return occurrence(series, start) if series else None
+
+def materialize(session, shift_id):
+    """Writes a generated occurrence as a real shift (flushed, not committed). None when missing."""
+    series, start = _lookup(session, shift_id)
+    if not series:
+        return None
+    generated = occurrence(series, start)
+    shift = Shift(**generated.model_dump(exclude={"id"}))
+    session.add(shift)
+    session.flush()
+    session.add(ShiftSeriesException(series_id=series.id, occurrence_start=start, shift_id=shift.id))
+    return shift
+
+def resolve(session, shift_ids):
+    """Shift ids with generated occurrences (negative) materialized, for bulk writes by id.
+
+    Returns (ids, {occurrence id: shift id}); occurrences that no longer exist are dropped."""
+    ids, materialized = [], {}
+    for shift_id in shift_ids:
+        if shift_id >= 0:
+            ids.append(shift_id)
+            continue
+        shift = materialize(session, shift_id)
+        if shift:
+            ids.append(shift.id)
+            materialized[shift_id] = shift.id
+    return ids, materialized
+
+def skip(session, shift_id):
+    """Stops generating an occurrence (not committed). False when it is not a generated occurrence."""
+    series, start = _lookup(session, shift_id)
+    if not series:
+        return False
+    session.add(ShiftSeriesException(series_id=series.id, occurrence_start=start))
+    return True
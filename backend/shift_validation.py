@@ -0,0 +1,144 @@
+"""
+Validation of a proposed batch of shifts (POST /shifts/validate/).
+
+Existing shifts of the batch's employees are read for the batch's time window
+in one query (plus their generated series occurrences) and weekly hours come
+from the employee_week_hours ledger. Then
+each employee's proposed and existing shifts are sorted by start and swept
+once, keeping the shifts still running in a heap ordered by end:
+
+  - overlaps: a shift overlaps every shift still running when it starts
+  - rest periods: a gap shorter than MIN_REST_HOURS after the latest end
+    (back-to-back shifts and vacation are not rest issues)
+  - overtime: proposed hours added to the ledger per (employee, week), checked
+    with the max_weekly_hours rule (employees without a cap: weekly_overtime hours)
+
+Proposed shifts that carry the id of an existing shift replace it: the stored
+version is left out of the sweep and its hours out of the week.
+"""
+import heapq
+import numpy as np
+from collections import defaultdict
+from datetime import timedelta
+from dateutil import parser
+from sqlmodel import select
+from models import Employee, Shift
+from week_hours import week_start_of, shift_hours, get_weeks_hours
+import shift_series
+from scheduling_rules import RULES, RuleContext
+
+MIN_REST_HOURS = RULES.param("min_rest", "hours")
+DEFAULT_MAX_HOURS = RULES.param("weekly_overtime", "hours")
+CAP_RULE = RULES.compile(["max_weekly_hours"])
+
+def _as_datetime(value):
+    return parser.parse(value) if isinstance(value, str) else value
+
+def _label(item):
+    kind, ref = item
+    return f"proposed shift {ref + 1}" if kind == "proposed" else f"existing shift ID {ref}"
+
+def _sweep(emp_ids, timeline):
+    """Overlaps and short rest periods from each employee's timeline, in one pass per employee."""
+    existing_overlaps = defaultdict(list)  # proposed idx -> existing ids
+    proposed_overlaps = defaultdict(list)  # proposed idx -> other proposed idx
+    rest_warnings = []
+    for emp_id in emp_ids:
+        items = sorted(timeline[emp_id], key=lambda t: (t[0], t[1]))
+        running = []  # heap of (end, n, item)
+        last_work = None  # (end, item) of the latest ending worked (non-vacation) shift so far
+        for n, (start, end, is_vacation, item) in enumerate(items):
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+            for _, _, other in running:
+                if item[0] == "proposed" and other[0] == "proposed":
+                    proposed_overlaps[item[1]].append(other[1])
+                    proposed_overlaps[other[1]].append(item[1])
+                elif item[0] == "proposed":
+                    existing_overlaps[item[1]].append(other[1])
+                elif other[0] == "proposed":
+                    existing_overlaps[other[1]].append(item[1])
+            if not is_vacation:
+                if not running and last_work is not None and "proposed" in (item[0], last_work[1][0]):
+                    gap = shift_hours(last_work[0], start)
+                    if 0 < gap < MIN_REST_HOURS:
+                        rest_warnings.append((start, f"{_label(item).capitalize()} starts {gap:.1f}h after {_label(last_work[1])} ends (minimum rest {MIN_REST_HOURS}h)"))
+                if last_work is None or end > last_work[0]:
+                    last_work = (end, item)
+            heapq.heappush(running, (end, n, item))
+    return existing_overlaps, proposed_overlaps, rest_warnings
+
+def validate(session, shifts):
+    """Returns {"valid", "conflicts", "rest_warnings", "overtime_warnings"} for the proposed shifts."""
+    report = {
+        "valid": True,
+        "conflicts": [],
+        "rest_warnings": [],
+        "overtime_warnings": []
+    }
+    # (idx, id, employee_id, start, end, is_vacation, week) of assigned shifts, read once
+    proposed = []
+    for idx, shift in enumerate(shifts):
+        if not shift.employee_id:
+            continue
+        start, end = _as_datetime(shift.start_time), _as_datetime(shift.end_time)
+        proposed.append((idx, shift.id, shift.employee_id, start, end, bool(shift.is_vacation), week_start_of(start)))
+    if not proposed:
+        return report
+
+    # --- Prefetch: existing shifts in the window, replaced shifts, employees, weekly hours ---
+    emp_ids = sorted({p[2] for p in proposed})
+    rest = timedelta(hours=MIN_REST_HOURS)
+    window_start = min(p[3] for p in proposed) - rest
+    window_end = max(p[4] for p in proposed) + rest
+    replaced_ids = {p[1] for p in proposed if p[1] is not None}
+    existing = session.exec(select(Shift.id, Shift.employee_id, Shift.start_time, Shift.end_time, Shift.is_vacation).where(
+        Shift.employee_id.in_(emp_ids),
+        Shift.start_time < window_end,
+        Shift.end_time > window_start
+    )).all()
+    existing += [(s.id, s.employee_id, s.start_time, s.end_time, s.is_vacation) for s in shift_series.expand(session, window_start, window_end, emp_ids)]
+    replaced = session.exec(select(Shift.employee_id, Shift.start_time, Shift.end_time).where(Shift.id.in_(replaced_ids))).all() if replaced_ids else []
+    employees = {row[0]: row for row in session.exec(select(Employee.id, Employee.first_name, Employee.last_name, Employee.max_weekly_hours).where(Employee.id.in_(emp_ids))).all()}
+    weeks = sorted({p[6] for p in proposed})
+    ledger = get_weeks_hours(session, emp_ids, weeks)
+
+    # --- Sweep per employee ---
+    timeline = defaultdict(list)  # employee_id -> [(start, end, is_vacation, (kind, ref))]
+    for idx, _, emp_id, start, end, is_vacation, _ in proposed:
+        timeline[emp_id].append((start, end, is_vacation, ("proposed", idx)))
+    for shift_id, emp_id, start, end, is_vacation in existing:
+        if shift_id not in replaced_ids:
+            timeline[emp_id].append((start, end, bool(is_vacation), ("existing", shift_id)))
+
+    with RULES.timed("min_rest", len(proposed)):
+        existing_overlaps, proposed_overlaps, rest_warnings = _sweep(emp_ids, timeline)
+
+    for idx, *_ in proposed:
+        if existing_overlaps[idx]:
+            report["valid"] = False
+            report["conflicts"].append(f"Shift {idx+1} overlaps with existing shift ID {sorted(existing_overlaps[idx])}")
+        for other_idx in sorted(proposed_overlaps[idx]):
+            report["valid"] = False
+            report["conflicts"].append(f"Shift {idx+1} overlaps with proposed shift {other_idx+1}")
+    report["rest_warnings"] = [message for _, message in sorted(rest_warnings, key=lambda w: w[0])]
+
+    # --- Overtime per (employee, week) ---
+    totals = defaultdict(float)
+    for emp_id, start, end in replaced:
+        totals[(emp_id, week_start_of(start))] -= shift_hours(start, end)
+    for _, _, emp_id, start, end, _, week in proposed:
+        totals[(emp_id, week)] += shift_hours(start, end)
+    keys = [k for k in sorted(totals) if k[1] in weeks and k[0] in employees]
+    if keys:
+        existing_hours = np.array([ledger.get(k, 0.0) for k in keys])
+        added = np.array([totals[k] for k in keys])
+        caps = np.array([employees[emp_id][3] or DEFAULT_MAX_HOURS for emp_id, _ in keys], dtype=float)
+        within = CAP_RULE(RuleContext(weekly=existing_hours, duration=added, cap=caps))["max_weekly_hours"]
+        for (emp_id, week), total, ok in zip(keys, existing_hours + added, within):
+            if not ok:
+                _, first_name, last_name, max_weekly_hours = employees[emp_id]
+                report["overtime_warnings"].append(
+                    f"Employee {first_name} {last_name} is projected to work {total:.1f} hours (Limit: {max_weekly_hours or DEFAULT_MAX_HOURS}) in the week of {week:%m/%d/%Y}"
+                )
+    return report
@@ -2,6 +2,7 @@ import pytesseract
 from PIL import Image
 import glob
 import re
+import orientation
 
 KEYWORDS = ["Name", "Phone", "Date", "Hire", "Maintenance", "Senior", "Cashier", "Shift", "Availability", "Notes"]
 
@@ -12,33 +13,26 @@ def count_keywords(text):
             count += 1
     return count
 
+def score_keywords(img):
+    # Orientation fallback: read the rotated page, score it by keywords
+    text = pytesseract.image_to_string(img)
+    return count_keywords(text), text
+
 images = sorted(glob.glob("extracted_page_*.tiff"))
 
 for img_path in images:
     print(f"\nProcessing {img_path}...")
-    best_text = ""
-    best_score = -1
-    best_angle = 0
-    
     original_img = Image.open(img_path)
     
-    for angle in [0, 90, 180, 270]:
-        # Rotate
-        if angle == 0:
-            img = original_img
-        else:
-            img = original_img.rotate(angle, expand=True)
+    found = orientation.detect(original_img, score_keywords)
+    if found.result is not None:
+        best_text = found.result
+    else:
+        best_text = pytesseract.image_to_string(orientation.upright(original_img, found.angle))
             
-        text = pytesseract.image_to_string(img)
-        score = count_keywords(text)
-        print(f"  Angle {angle}: Score {score}")
-        
-        if score > best_score:
-            best_score = score
-            best_text = text
-            best_angle = angle
-            
-    print(f"Best Angle: {best_angle} (Score: {best_score})")
+    print(f"Best Angle: {found.angle} clockwise (by {found.method}, confidence {found.confidence})")
     print("--- Extracted Text ---")
     print(best_text)
     print("======================")
+
+print(f"Orientation: {orientation.stats()}")
@@ -12,7 +12,7 @@ def test_autofill():
         print(f"Error: {response.text}")
         return
     
-    filled_shifts = response.json()
+    filled_shifts = response.json()["shifts"]
     print(f"Filled {len(filled_shifts)} shifts.")
     
     # 2. Verify Result
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from models import Employee, Role, Shift, Availability
+from autofill_engine import plan_autofill, apply_plan, preview_plan
+from conftest import make_engine
+
+def test_autofill_rules():
+    print("Testing autofill engine rules...")
+    engine = make_engine()
+    wed = datetime(2025, 1, 8)
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Server", color_hex="#fff"))
+        session.add(Role(id=2, name="Cook", color_hex="#000"))
+        session.add(Employee(id=2, first_name="Bob", last_name="B", default_role_id=1))
+        session.add(Employee(id=4, first_name="David", last_name="D", default_role_id=1))
+        session.add(Employee(id=5, first_name="Eve", last_name="E", default_role_id=1))
+        session.add(Employee(id=6, first_name="Carl", last_name="C", default_role_id=2))
+        session.add(Employee(id=7, first_name="Ina", last_name="I", default_role_id=1, is_active=False))
+        # Bob is unavailable after 23:00 on Wednesdays, David works 17-22
+        session.add(Availability(employee_id=2, day_of_week=2, start_time="23:00", end_time="23:59", is_available=False))
+        session.add(Shift(employee_id=4, role_id=1, start_time=wed.replace(hour=17), end_time=wed.replace(hour=22)))
+        session.add(Shift(employee_id=None, role_id=1, start_time=wed.replace(hour=20), end_time=wed.replace(hour=23, minute=30), notes="Open Shift - Needs Server"))
+        session.commit()
+
+        preview = preview_plan(plan_autofill(session))
+        assert [(s.notes, s.employee_id) for s in preview] == [("Open Shift - Needs Server", 5)]
+        assert session.exec(select(Shift).where(Shift.employee_id == None)).first() is not None  # Dry run saved nothing
+
+        filled = apply_plan(session, plan_autofill(session))
+        assert [s.employee_id for s in filled] == [5]
+        assert session.exec(select(Shift).where(Shift.employee_id == None)).first() is None
+    print("SUCCESS: Open shift assigned to Eve.")
+
+def test_autofill_balances_hours():
+    print("Testing autofill hour balancing and caps...")
+    engine = make_engine()
+    sat = datetime(2025, 1, 4)
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        session.add(Employee(id=1, first_name="A", last_name="A", default_role_id=1, max_weekly_hours=16))
+        session.add(Employee(id=2, first_name="B", last_name="B", default_role_id=1, max_weekly_hours=40))
+        session.add(Shift(employee_id=2, role_id=1, start_time=sat.replace(hour=6), end_time=sat.replace(hour=14)))
+        for day in range(1, 6):
+            start = sat + timedelta(days=day, hours=9)
+            session.add(Shift(employee_id=None, role_id=1, start_time=start, end_time=start + timedelta(hours=8)))
+        session.commit()
+
+        plan = plan_autofill(session)
+        counts = {}
+        for shift, emp in plan.assignments:
+            counts[emp.id] = counts.get(emp.id, 0) + 1
+        print(f"Assignments: {counts} stats={plan.stats()}")
+        assert counts == {1: 2, 2: 3}  # A capped at 16h, B gets the rest (8h existing + 24h)
+    print("SUCCESS: Hours balanced within caps.")
+
+def test_autofill_performance():
+    print("Testing autofill performance (500 open shifts x 150 employees)...")
+    engine = make_engine()
+    sat = datetime(2025, 1, 4)
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        session.add(Role(id=4, name="Maintenance", color_hex="#000"))
+        for emp_id in range(1, 151):
+            session.add(Employee(id=emp_id, first_name=f"E{emp_id}", last_name="X", default_role_id=1 if emp_id % 3 else 4, max_weekly_hours=40))
+            session.add(Availability(employee_id=emp_id, day_of_week=emp_id % 7, start_time="00:00", end_time="06:00", is_available=False))
+            for day in range(0, 7, 3):
+                start = sat + timedelta(days=day, hours=6 + 8 * (emp_id % 3))
+                session.add(Shift(employee_id=emp_id, role_id=1, start_time=start, end_time=start + timedelta(hours=8)))
+        for i in range(500):
+            start = sat + timedelta(days=i % 7, hours=(i * 5) % 18)
+            session.add(Shift(employee_id=None, role_id=1 if i % 4 else 4, start_time=start, end_time=start + timedelta(hours=8)))
+        session.commit()
+
+        t0 = time.perf_counter()
+        plan = plan_autofill(session)
+        elapsed = time.perf_counter() - t0
+        print(f"Planned in {elapsed * 1000:.0f} ms: {plan.stats()}")
+        assert elapsed < 1.0
+
+        # Every assignment respects conflicts and the cap
+        per_emp = {}
+        for shift, emp in plan.assignments:
+            per_emp.setdefault(emp.id, []).append((shift.start_time, shift.end_time))
+        for emp_id, spans in per_emp.items():
+            spans.sort()
+            assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:])), f"Overlap for {emp_id}"
+    print("SUCCESS: 500 x 150 autofill planned in under a second.")
+
+if __name__ == "__main__":
+    test_autofill_rules()
+    test_autofill_balances_hours()
+    test_autofill_performance()
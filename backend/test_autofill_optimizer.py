@@ -0,0 +1,77 @@
+import time
+from datetime import datetime, timedelta
+from sqlmodel import Session
+from models import Employee, Role, Shift
+from autofill_optimizer import optimize_autofill
+from conftest import make_engine
+
+def add_hours(session, emp_id, day, hours):
+    start = day.replace(hour=0)
+    while hours > 0:
+        chunk = min(hours, 8)
+        session.add(Shift(employee_id=emp_id, role_id=3, start_time=start, end_time=start + timedelta(hours=chunk)))
+        start += timedelta(days=1)
+        hours -= chunk
+
+def test_optimizer_rules():
+    print("Testing optimize mode constraints...")
+    engine = make_engine()
+    sat = datetime(2025, 1, 4)
+    mon = sat + timedelta(days=2)
+    with Session(engine) as session:
+        session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+        # 1: senior but no_overtime and already at 36h; 2: junior, 38h (would go into OT)
+        # 3: middle seniority, 0h but unavailable for 2nd shift on Monday; 4: no plaza, 12h on Monday already
+        session.add(Employee(id=1, first_name="A", last_name="A", default_role_id=3, max_weekly_hours=60, no_overtime=True, hire_date=datetime(2001, 1, 1)))
+        session.add(Employee(id=2, first_name="B", last_name="B", default_role_id=3, max_weekly_hours=60, hire_date=datetime(2020, 1, 1)))
+        session.add(Employee(id=3, first_name="C", last_name="C", default_role_id=3, max_weekly_hours=60, hire_date=datetime(2010, 1, 1),
+                             availability_grid='{"mon": {"1st": true, "2nd": false, "3rd": true}}'))
+        session.add(Employee(id=4, first_name="D", last_name="D", default_role_id=3, max_weekly_hours=60, no_plaza=True, hire_date=datetime(2005, 1, 1)))
+        add_hours(session, 1, sat, 36)
+        add_hours(session, 2, sat, 38)
+        session.add(Shift(employee_id=4, role_id=3, start_time=mon.replace(hour=0), end_time=mon.replace(hour=12)))
+        # Open: Monday 2nd shift at Plaza (16:00-24:00)
+        session.add(Shift(employee_id=None, role_id=3, start_time=mon.replace(hour=16), end_time=mon.replace(hour=16) + timedelta(hours=8), location="Plaza"))
+        session.commit()
+
+        plan = optimize_autofill(session, sat, sat + timedelta(days=7), time_limit=5)
+        print(f"Stats: {plan.stats()}")
+        # 1 no_overtime, 3 grid, 4 no plaza + 16h ceiling -> only 2 remains, with overtime
+        assert [(s.id, e.id) for s, e in plan.assignments] == [(plan.problem.shifts[0].id, 2)]
+        assert plan.solver["status"] == "optimal"
+        assert plan.solver["overtime_hours"] == 6.0
+
+        # Open a Tuesday 1st shift at Lot 1: D (no plaza irrelevant, 0h Tuesday) is senior to C
+        tue = mon + timedelta(days=1)
+        session.add(Shift(employee_id=None, role_id=3, start_time=tue.replace(hour=6), end_time=tue.replace(hour=14), location="Lot 1"))
+        session.commit()
+        plan = optimize_autofill(session, sat, sat + timedelta(days=7), time_limit=5)
+        assert sorted(e.id for _, e in plan.assignments) == [2, 4]
+    print("SUCCESS: Optimizer honours restrictions and prefers seniority without overtime.")
+
+def test_optimizer_time_budget():
+    print("Testing optimize mode on a full week...")
+    engine = make_engine()
+    sat = datetime(2025, 1, 4)
+    with Session(engine) as session:
+        session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+        for emp_id in range(1, 61):
+            session.add(Employee(id=emp_id, first_name=f"E{emp_id}", last_name="X", default_role_id=3, max_weekly_hours=40,
+                                 hire_date=datetime(2000, 1, 1) + timedelta(days=emp_id * 30)))
+        for i in range(200):
+            start = sat + timedelta(days=i % 7, hours=(i * 3) % 20)
+            session.add(Shift(employee_id=None, role_id=3, start_time=start, end_time=start + timedelta(hours=8)))
+        session.commit()
+
+        t0 = time.perf_counter()
+        plan = optimize_autofill(session, sat, sat + timedelta(days=7), time_limit=3)
+        elapsed = time.perf_counter() - t0
+        print(f"{elapsed:.2f}s: {plan.stats()}")
+        assert elapsed < 3 + 2
+        assert plan.solver["status"] in ("optimal", "time_limit")
+        assert len(plan.assignments) == 200
+    print("SUCCESS: Week solved within the time budget.")
+
+if __name__ == "__main__":
+    test_optimizer_rules()
+    test_optimizer_time_budget()
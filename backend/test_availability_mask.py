@@ -0,0 +1,169 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlmodel import Session, create_engine, select
+from models import Employee, Availability
+import availability_mask
+import note_constraints
+from conftest import make_engine
+
+MON = datetime(2025, 1, 6)
+
+def test_compile_sources():
+    print("Testing mask compilation from rows, grid and notes...")
+    rows = [
+        Availability(employee_id=1, day_of_week=0, start_time="09:00", end_time="17:00", is_available=True),
+        Availability(employee_id=1, day_of_week=2, start_time="12:00", end_time="13:00", is_available=False),
+        Availability(employee_id=1, day_of_week=4, start_time="00:00", end_time="23:59", is_available=True),
+    ]
+    grid = '{"tue": {"1st": true, "2nd": false, "3rd": true}}'
+    c = availability_mask.compile_employee(note_constraints.parse_notes("AVAIL 1ST & 2ND AFTER 8AM"), grid, rows)
+    allows = lambda start, hours: availability_mask.allows(c, start, start + timedelta(hours=hours))
+
+    assert allows(MON.replace(hour=9), 8)  # Inside the Monday positive row
+    assert not allows(MON.replace(hour=8, minute=50), 8)  # Starts before it
+    assert not allows(MON.replace(hour=10), 8)  # Ends after it
+    assert not allows(MON.replace(hour=7), 4)  # Notes: only after 8am
+    assert allows(MON.replace(day=8, hour=8), 4)  # Wednesday morning
+    assert not allows(MON.replace(day=8, hour=10), 4)  # Overlaps the Wednesday block
+    assert not allows(MON.replace(day=7, hour=15), 4)  # Grid: no Tuesday 2nd
+    assert allows(MON.replace(day=9, hour=14), 8)  # Thursday 2nd, not restricted
+    assert allows(MON.replace(day=10, hour=16), 8)  # Friday "00:00-23:59" runs to midnight
+    assert not allows(MON.replace(day=12, hour=4), 4)  # Notes: no 3rd shift
+    print("SUCCESS: Masks match the row, grid and notes rules.")
+
+def test_matrices_match_single_checks():
+    print("Testing vectorized matrices against single checks...")
+    compiled = [
+        availability_mask.compile_employee(note_constraints.parse_notes("2ND ONLY"), None, []),
+        availability_mask.compile_employee(note_constraints.parse_notes(None), None, [Availability(employee_id=2, day_of_week=6, start_time="20:00", end_time="23:59", is_available=True)]),
+        availability_mask.compile_employee(note_constraints.parse_notes("AVAIL SAT SUN"), '{"sun": {"3rd": false}}', [Availability(employee_id=3, day_of_week=0, start_time="00:00", end_time="04:00", is_available=False)]),
+    ]
+
+    class S:
+        def __init__(self, start, hours):
+            self.start_time, self.end_time = start, start + timedelta(hours=hours)
+
+    shifts = [S(MON + timedelta(hours=h), d) for h in range(0, 7 * 24, 5) for d in (4, 8)]
+    matrix = availability_mask.work_matrix(shifts, compiled) & availability_mask.start_matrix(shifts, compiled)
+    for i, s in enumerate(shifts):
+        for j, c in enumerate(compiled):
+            assert matrix[i, j] == availability_mask.allows(c, s.start_time, s.end_time), (s.start_time, j)
+    # Sunday 22:00 - Monday 02:00 wraps into Monday's block
+    assert not availability_mask.allows(compiled[2], MON.replace(day=12, hour=22), MON.replace(day=13, hour=2))
+    print("SUCCESS: Matrices agree with single checks.")
+
+def test_masks_compiled_on_write():
+    print("Testing masks compiled at write time...")
+    engine = make_engine()
+    availability_mask.clear_cache()
+    with Session(engine) as session:
+        emp = Employee(first_name="A", last_name="A", notes="1ST SHIFT ONLY")
+        session.add(emp)
+        session.commit()
+        session.refresh(emp)
+        assert emp.start_mask is not None and emp.availability_mask is not None
+        c, = availability_mask.get_compiled(session, [emp])
+        assert availability_mask.allows(c, MON.replace(hour=6), MON.replace(hour=14))
+        assert not availability_mask.allows(c, MON.replace(hour=14), MON.replace(hour=22))
+
+        # Editing notes drops the cached entry and recompiles the column
+        emp.notes = "2ND ONLY"
+        session.add(emp)
+        session.commit()
+        c, = availability_mask.get_compiled(session, [emp])
+        assert availability_mask.allows(c, MON.replace(hour=14), MON.replace(hour=22))
+
+        # Availability rows recompile their employee
+        block = Availability(employee_id=emp.id, day_of_week=0, start_time="13:00", end_time="18:00", is_available=False)
+        session.add(block)
+        session.commit()
+        c, = availability_mask.get_compiled(session, [emp])
+        assert not availability_mask.allows(c, MON.replace(hour=14), MON.replace(hour=22))
+        session.delete(block)
+        session.commit()
+        c, = availability_mask.get_compiled(session, [emp])
+        assert availability_mask.allows(c, MON.replace(hour=14), MON.replace(hour=22))
+
+        # Rollback leaves the cache alone
+        emp.notes = "1ST ONLY"
+        session.add(emp)
+        session.flush()
+        session.rollback()
+        c, = availability_mask.get_compiled(session, [emp])
+        assert availability_mask.allows(c, MON.replace(hour=14), MON.replace(hour=22))
+
+        # Rows written behind the ORM's back are picked up by ensure_built
+        session.connection().exec_driver_sql("INSERT INTO employee (first_name, last_name, max_weekly_hours, is_full_time, willing_to_work_vacation_week, no_overtime, no_plaza, is_active, notes) VALUES ('B', 'B', 40, 0, 1, 0, 0, 1, '3RD ONLY')")
+        session.commit()
+        assert availability_mask.ensure_built(session) == 1
+        b = session.exec(select(Employee).where(Employee.first_name == "B")).one()
+        c, = availability_mask.get_compiled(session, [b])
+        assert availability_mask.allows(c, MON.replace(hour=0), MON.replace(hour=6))
+        assert not availability_mask.allows(c, MON.replace(hour=6), MON.replace(hour=14))
+    print("SUCCESS: Masks follow employee and availability writes.")
+
+def test_notes_reasons():
+    print("Testing note restriction reasons...")
+    tue = MON.replace(day=7)
+    cases = [
+        ("NO PLAZA", tue.replace(hour=9), "Plaza", "Restricted: No Plaza"),
+        ("NO PLAZA", tue.replace(hour=9), "Lot A", None),
+        ("DO NOT CALL FOR EXTRA SHIFTS", tue.replace(hour=9), None, "Restricted: No Overtime"),
+        ("AVAIL TUE THUR FRI SAT ANYTIME", MON.replace(hour=9), None, "Unavailable: Not avail MON"),
+        ("AVAIL TUE THUR FRI SAT ANYTIME", tue.replace(hour=9), None, None),
+        ("AVAIL 2ND & 3RD", tue.replace(hour=9), None, "Unavailable: Not avail 1ST Shift"),
+        ("FRI AFTER 4PM SAT ONLY", tue.replace(hour=9), None, "Unavailable: Only after 4pm"),
+        ("1ST SHIFT ONLY", tue.replace(hour=15), None, "Unavailable: Not avail 2ND Shift"),
+    ]
+    for notes, start, location, expected in cases:
+        assert note_constraints.restriction_reason(note_constraints.parse_notes(notes), start, location) == expected, notes
+    print("SUCCESS: Reasons match the call sheet wording.")
+
+def test_upgrade_existing_database():
+    print("Testing upgrade of a database without mask columns...")
+    import shutil
+    from database import ensure_columns
+    path = os.path.join(tempfile.mkdtemp(), "schedule.db")
+    shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "schedule.db"), path)
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(employee)")]
+    if "availability_mask" in columns:
+        print("SKIPPED: schedule.db already upgraded")
+        return
+    assert set(ensure_columns(engine)) >= {"employee.availability_mask", "employee.start_mask"}
+    assert ensure_columns(engine) == []
+    availability_mask.clear_cache()
+    with Session(engine) as session:
+        total = len(session.exec(select(Employee.id)).all())
+        assert availability_mask.ensure_built(session) == total
+        assert availability_mask.ensure_built(session) == 0
+    print(f"SUCCESS: Added mask columns and compiled {total} employees.")
+
+def test_matrix_performance():
+    print("Testing availability matrices (2000 shifts x 300 employees)...")
+    compiled = [availability_mask.compile_employee(note_constraints.parse_notes("AVAIL 2ND & 3RD" if j % 3 else None), None,
+                [Availability(employee_id=j, day_of_week=j % 7, start_time="08:00", end_time="12:00", is_available=False)])
+                for j in range(300)]
+
+    class S:
+        def __init__(self, start, hours):
+            self.start_time, self.end_time = start, start + timedelta(hours=hours)
+
+    shifts = [S(MON + timedelta(minutes=37 * i), 8) for i in range(2000)]
+    t0 = time.perf_counter()
+    matrix = availability_mask.work_matrix(shifts, compiled) & availability_mask.start_matrix(shifts, compiled)
+    elapsed = time.perf_counter() - t0
+    print(f"{matrix.size} checks in {elapsed * 1000:.1f}ms")
+    assert elapsed < 2
+    print("SUCCESS: Matrices built.")
+
+if __name__ == "__main__":
+    test_compile_sources()
+    test_matrices_match_single_checks()
+    test_masks_compiled_on_write()
+    test_notes_reasons()
+    test_upgrade_existing_database()
+    test_matrix_performance()
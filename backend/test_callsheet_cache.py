@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, delete
+from models import Employee, EmployeeRole, Role, Shift
+from callsheet_cache import CallSheetCache, callsheet_cache, load_group
+from conftest import make_engine, SAT
+
+def setup(session):
+    for role_id, name in ((3, "Cashier"), (4, "Maintenance"), (5, "Supervisor")):
+        session.add(Role(id=role_id, name=name, color_hex="#fff"))
+    session.add(Employee(id=1, first_name="Old", last_name="M", default_role_id=4, is_full_time=True, hire_date=datetime(2001, 1, 1)))
+    session.add(Employee(id=2, first_name="New", last_name="M", default_role_id=4, hire_date=datetime(2020, 1, 1)))
+    session.add(Employee(id=3, first_name="Boss", last_name="M", default_role_id=4, hire_date=datetime(1990, 1, 1)))
+    session.add(Employee(id=4, first_name="Cash", last_name="C", default_role_id=3))
+    session.add(Employee(id=5, first_name="Gone", last_name="C", default_role_id=3, is_active=False))
+    session.add(EmployeeRole(employee_id=3, role_id=5))
+    session.add(Shift(employee_id=1, role_id=4, start_time=SAT.replace(hour=6), end_time=SAT.replace(hour=14)))
+    session.add(Shift(employee_id=4, role_id=3, start_time=SAT.replace(hour=14), end_time=SAT.replace(hour=22)))
+    session.commit()
+
+def test_group_contents():
+    print("Testing call sheet group loading...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        maint = load_group(session, "maintenance", SAT)
+        assert [e.id for e in maint.employees] == [1, 2]  # Supervisor left out, hire date order
+        assert maint.raw_hours == {1: 8.0, 2: 0.0}
+        assert maint.paid_hours == {1: 7.5, 2: 0.0}  # Maintenance lunch
+        assert [(s.start_time.hour, s.end_time.hour) for s in maint.shifts[1]] == [(6, 14)]
+        cashiers = load_group(session, "cashier", SAT)
+        assert [e.id for e in cashiers.employees] == [4]  # Inactive left out
+    print("SUCCESS: Groups hold the call sheet candidates.")
+
+def test_cache_invalidation():
+    print("Testing call sheet cache hits and invalidation...")
+    engine = make_engine()
+    callsheet_cache.clear()
+    with Session(engine) as session:
+        setup(session)
+        base = callsheet_cache.report()["groups"]
+
+        def counts(group):
+            now = callsheet_cache.report()["groups"][group]
+            return tuple(now[k] - base[group][k] for k in ("hits", "misses", "invalidations"))
+
+        first = callsheet_cache.get(session, "maintenance", SAT)
+        assert callsheet_cache.get(session, "maintenance", SAT) is first
+        callsheet_cache.get(session, "maintenance", SAT + timedelta(days=7))
+        callsheet_cache.get(session, "cashier", SAT)
+        assert counts("maintenance") == (1, 2, 0)
+
+        # Cashier shift this week: maintenance entries survive
+        session.add(Shift(employee_id=4, role_id=3, start_time=SAT.replace(hour=6), end_time=SAT.replace(hour=10)))
+        session.commit()
+        assert callsheet_cache.get(session, "maintenance", SAT) is first
+        assert counts("cashier") == (0, 1, 1)
+
+        # Maintenance shift next week: this week's entry survives, next week's is rebuilt
+        session.add(Shift(employee_id=2, role_id=4, start_time=SAT + timedelta(days=8, hours=6), end_time=SAT + timedelta(days=8, hours=14)))
+        session.commit()
+        assert callsheet_cache.get(session, "maintenance", SAT) is first
+        assert callsheet_cache.get(session, "maintenance", SAT + timedelta(days=7)).raw_hours[2] == 8.0
+
+        # Moving a shift into this week
+        shift = session.get(Shift, 1)
+        shift.end_time = SAT.replace(hour=16)
+        session.add(shift)
+        session.commit()
+        entry = callsheet_cache.get(session, "maintenance", SAT)
+        assert entry is not first and entry.raw_hours[1] == 10.0
+
+        # Employee edits drop the whole group
+        emp = session.get(Employee, 2)
+        emp.phone = "555-0100"
+        session.add(emp)
+        session.commit()
+        entry = callsheet_cache.get(session, "maintenance", SAT)
+        assert [e.phone for e in entry.employees if e.id == 2] == ["555-0100"]
+
+        # Set-based role link changes (update_employee replacing role_ids)
+        session.exec(delete(EmployeeRole).where(EmployeeRole.employee_id == 3))
+        session.commit()
+        assert [e.id for e in callsheet_cache.get(session, "maintenance", SAT).employees] == [3, 1, 2]
+
+        # Rolled back writes keep entries
+        entry = callsheet_cache.get(session, "maintenance", SAT)
+        emp.phone = "555-0199"
+        session.add(emp)
+        session.flush()
+        session.rollback()
+        assert callsheet_cache.get(session, "maintenance", SAT) is entry
+    print(f"SUCCESS: Cache stats {callsheet_cache.report()}")
+
+def test_stale_load_not_stored():
+    print("Testing loads racing with a commit...")
+    engine = make_engine()
+    cache = CallSheetCache()
+    with Session(engine) as session:
+        setup(session)
+        import callsheet_cache as module
+        original = module.load_group
+
+        def racing_load(session, group, week_start):
+            entry = original(session, group, week_start)
+            cache.invalidate_groups([group])  # A commit lands while we were reading
+            return entry
+
+        module.load_group = racing_load
+        try:
+            cache.get(session, "maintenance", SAT)
+        finally:
+            module.load_group = original
+        assert cache.report()["entries"] == 0
+    print("SUCCESS: Stale load was not cached.")
+
+if __name__ == "__main__":
+    test_group_contents()
+    test_cache_invalidation()
+    test_stale_load_not_stored()
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session
+from models import Employee, EmployeeRole, Role, Shift, RotationState
+from callsheet_cache import callsheet_cache
+import callsheet
+from conftest import make_engine, SAT
+
+NOW = datetime(2025, 1, 1)
+
+def setup(session):
+    for role_id, name in ((3, "Cashier"), (4, "Maintenance"), (5, "Supervisor")):
+        session.add(Role(id=role_id, name=name, color_hex="#fff"))
+    session.add(Employee(id=1, first_name="Ann", last_name="M", default_role_id=4, is_full_time=True, hire_date=datetime(2001, 1, 1)))
+    session.add(Employee(id=2, first_name="Bob", last_name="M", default_role_id=4, is_full_time=True, hire_date=datetime(2005, 1, 1)))
+    session.add(Employee(id=3, first_name="Cy", last_name="M", default_role_id=4, hire_date=datetime(2010, 1, 1)))
+    session.add(Employee(id=4, first_name="Dee", last_name="C", default_role_id=3, hire_date=datetime(2015, 1, 1), notes="NO PLAZA"))
+    session.add(Employee(id=5, first_name="Eve", last_name="C", default_role_id=3, is_full_time=True, hire_date=datetime(2012, 1, 1)))
+    session.add(Employee(id=6, first_name="Fay", last_name="C", default_role_id=3, hire_date=datetime(2024, 12, 1)))
+    session.add(RotationState(context_key="maint_ft", last_employee_id=1))
+    # Eve already works 40h this week
+    for day in range(5):
+        start = SAT + timedelta(days=day, hours=6)
+        session.add(Shift(employee_id=5, role_id=3, start_time=start, end_time=start + timedelta(hours=8)))
+    # Open shifts: two cashier, one maintenance, one next week, plus an assigned one
+    session.add(Shift(id=100, role_id=3, location="Plaza", start_time=SAT + timedelta(days=1, hours=14), end_time=SAT + timedelta(days=1, hours=22)))
+    session.add(Shift(id=101, role_id=4, start_time=SAT + timedelta(days=2, hours=6), end_time=SAT + timedelta(days=2, hours=14)))
+    session.add(Shift(id=102, role_id=7, start_time=SAT + timedelta(days=3, hours=6), end_time=SAT + timedelta(days=3, hours=14)))
+    session.add(Shift(id=103, role_id=3, start_time=SAT + timedelta(days=8, hours=6), end_time=SAT + timedelta(days=8, hours=14)))
+    session.add(Shift(id=104, employee_id=4, role_id=3, start_time=SAT + timedelta(days=4, hours=6), end_time=SAT + timedelta(days=4, hours=14)))
+    session.commit()
+
+def test_week_sheets():
+    print("Testing week call sheets...")
+    engine = make_engine()
+    callsheet_cache.clear()
+    with Session(engine) as session:
+        setup(session)
+        sheets = callsheet.build_week(session, SAT, now=NOW)
+        assert [s["shift"].id for s in sheets] == [100, 101, 102]
+
+        plaza = sheets[0]["candidates"]
+        assert [(c["id"], c["section"]) for c in plaza] == [
+            (4, "Page 1"), (6, "Page 1 (Probationary)"), (5, "Page 2"), (4, "Page 3"), (6, "Page 3 (Probationary)")
+        ]
+        assert plaza[0]["status"] == "Unavailable" and plaza[0]["answer"] == "No"
+        assert plaza[1]["details"] == "Probationary (59 days left)"
+        assert plaza[2]["status"] == "OT"
+
+        # FT maintenance rotation starts after the last called employee
+        maint = sheets[1]["candidates"]
+        assert [(c["id"], c["section"]) for c in maint] == [
+            (3, "Part Time Maintenance"), (2, "Full Time / Probationary Maintenance"), (1, "Full Time / Probationary Maintenance")
+        ]
+
+        # Same result as building each sheet on its own
+        for sheet in sheets:
+            assert callsheet.build_call_sheet(session, sheet["shift"], now=NOW) == sheet["candidates"]
+
+        assert [s["shift"].id for s in callsheet.build_week(session, SAT, role_id=4, now=NOW)] == [101]
+    print("SUCCESS: Week call sheets match the single sheets.")
+
+def test_week_html():
+    print("Testing printable week call sheets...")
+    engine = make_engine()
+    callsheet_cache.clear()
+    with Session(engine) as session:
+        setup(session)
+        sheets = callsheet.build_week(session, SAT, now=NOW)
+        html = callsheet.render_week_html(SAT, sheets)
+        # Three cashier pages per cashier shift, one maintenance page
+        assert html.count("class=\"sheet-section\"") == 7
+        assert html.count("Maintenance Call Sheet") == 1
+        assert "Active Maintenance Staff" in html and "PT for OT" in html
+        assert "Note: NO PLAZA" in html
+        assert "Call Sheets - Week of 01/04/2025" in html
+        assert "No open shifts" in callsheet.render_week_html(SAT, [])
+    print("SUCCESS: Printable week renders a page per sheet section.")
+
+if __name__ == "__main__":
+    test_week_sheets()
+    test_week_html()
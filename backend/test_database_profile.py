@@ -0,0 +1,31 @@
+import os
+import tempfile
+from sqlmodel import text
+from database import make_engine, SQLITE_PRAGMAS
+
+def test_database_profile():
+    print("Testing SQLite engine profile...")
+    path = os.path.join(tempfile.mkdtemp(), "schedule.db")
+    engine = make_engine(f"sqlite:///{path}")
+
+    if not os.environ.get("SCHEDULER_SQL_ECHO"):
+        assert not engine.echo
+
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+        synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+        busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+        temp_store = conn.execute(text("PRAGMA temp_store")).scalar()
+        cache_size = conn.execute(text("PRAGMA cache_size")).scalar()
+
+    print(f"journal_mode={journal_mode} synchronous={synchronous} busy_timeout={busy_timeout} temp_store={temp_store} cache_size={cache_size}")
+    assert journal_mode.lower() == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == SQLITE_PRAGMAS["busy_timeout"]
+    assert temp_store == 2  # MEMORY
+    assert cache_size == SQLITE_PRAGMAS["cache_size"]
+    assert engine.pool.size() >= 20
+    print("SUCCESS: Every connection gets the WAL pragma profile.")
+
+if __name__ == "__main__":
+    test_database_profile()
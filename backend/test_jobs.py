@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from sqlmodel import Session
+from models import Job
+import jobs
+from conftest import make_engine
+
+def wait_for(engine, job_id, statuses=jobs.FINISHED, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with Session(engine) as session:
+            job = session.get(Job, job_id)
+            if job.status in statuses:
+                return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} still {job.status}")
+
+release = threading.Event()
+
+@jobs.handler("test_sum")
+def sum_job(job, params):
+    with open(job.upload_path) as f:
+        numbers = [int(n) for n in f.read().split()]
+    total = 0
+    for i, n in enumerate(numbers):
+        job.progress(i / len(numbers), f"Adding {n}")
+        total += n
+    job.save_file(str(total).encode(), "total.txt")
+    return {"total": total, "label": params["label"]}
+
+@jobs.handler("test_wait")
+def wait_job(job, params):
+    while True:
+        job.progress(0.5, "Waiting")
+        if release.wait(0.02):
+            return {"released": True}
+
+@jobs.handler("test_fail")
+def fail_job(job, params):
+    raise ValueError("bad input")
+
+def test_job_runner():
+    print("Testing persistent background jobs...")
+    engine = make_engine(check_same_thread=False)
+    runner = jobs.JobRunner()
+    job_dir = tempfile.mkdtemp()
+    runner.start(engine, workers=2, job_dir=job_dir)
+
+    job = runner.submit("test_sum", {"label": "sum"}, upload=b"1 2 3 4")
+    done = wait_for(engine, job.id)
+    assert done.status == "succeeded" and done.progress == 1.0 and done.attempts == 1
+    assert json.loads(done.result) == {"total": 10, "label": "sum"}
+    with open(done.result_file) as f:
+        assert f.read() == "10"
+    assert not os.path.exists(runner.path(job.id, "upload"))  # Upload removed once done
+
+    failed = wait_for(engine, runner.submit("test_fail", {}).id)
+    assert failed.status == "failed" and failed.error == "bad input"
+
+    # A running job stops at its next progress report
+    waiting = runner.submit("test_wait", {})
+    wait_for(engine, waiting.id, statuses=("running",))
+    assert runner.cancel(waiting.id).cancel_requested
+    assert wait_for(engine, waiting.id).status == "cancelled"
+    runner.shutdown()
+
+    # Jobs left running or queued by a stopped process are resumed at start
+    with Session(engine) as session:
+        stale = Job(kind="test_wait", status="running", attempts=1)
+        queued = Job(kind="test_fail")
+        session.add(stale)
+        session.add(queued)
+        session.commit()
+        stale_id, queued_id = stale.id, queued.id
+    release.set()
+    runner = jobs.JobRunner()
+    assert runner.start(engine, job_dir=job_dir) == 2
+    resumed = wait_for(engine, stale_id)
+    assert resumed.status == "succeeded" and resumed.attempts == 2
+    assert wait_for(engine, queued_id).status == "failed"
+    assert runner.cancel(stale_id).status == "succeeded"  # Finished jobs are left as they are
+    runner.shutdown()
+    print("SUCCESS: jobs run, report progress, cancel, fail and survive a restart")
+
+if __name__ == "__main__":
+    test_job_runner()
@@ -0,0 +1,72 @@
+from datetime import datetime
+from sqlmodel import Session, select
+from models import Employee
+import availability_mask
+import note_constraints
+from migrate_notes_to_grid import parse_notes_to_grid
+from conftest import make_engine
+
+def test_notes_parsed_on_write():
+    print("Testing notes parsed into columns on write...")
+    engine = make_engine()
+    with Session(engine) as session:
+        emp = Employee(first_name="A", last_name="A", notes="AVAIL TUE THUR 2ND & 3RD AFTER 4PM NO PLAZA")
+        session.add(emp)
+        session.commit()
+        session.refresh(emp)
+        assert emp.notes_parser_version == note_constraints.PARSER_VERSION
+        assert (emp.note_days, emp.note_shifts, emp.note_after_hour, emp.note_after_label) == ("TUE,THU", "2ND,3RD", 16, "4pm")
+        assert emp.note_no_plaza and not emp.note_no_overtime
+        assert note_constraints.from_employee(emp) == note_constraints.parse_notes(emp.notes)
+
+        emp.notes = "DO NOT CALL FOR OVERTIME"
+        session.add(emp)
+        session.commit()
+        session.refresh(emp)
+        assert emp.note_no_overtime and not emp.note_no_plaza
+        assert emp.note_days is None and emp.note_shifts is None and emp.note_after_hour is None
+
+        # Stored values are what readers get, without re-parsing the text
+        session.connection().exec_driver_sql("UPDATE employee SET note_days = 'MON' WHERE id = ?", (emp.id,))
+        session.commit()
+        session.refresh(emp)
+        assert note_constraints.from_employee(emp).days == frozenset({"MON"})
+    print("SUCCESS: Notes parsed and stored at write time.")
+
+def test_backfill():
+    print("Testing backfill of rows written before the parser...")
+    engine = make_engine()
+    availability_mask.clear_cache()
+    with Session(engine) as session:
+        for name, notes in (("A", "1ST SHIFT ONLY"), ("B", None), ("C", "AVAIL SUN,MON")):
+            session.connection().exec_driver_sql(
+                "INSERT INTO employee (first_name, last_name, max_weekly_hours, is_full_time, willing_to_work_vacation_week, no_overtime, no_plaza, is_active, notes) "
+                "VALUES (?, 'X', 40, 0, 1, 0, 0, 1, ?)", (name, notes))
+        session.commit()
+        assert note_constraints.backfill(session) == 3
+        assert note_constraints.backfill(session) == 0
+        assert note_constraints.backfill(session, reparse_all=True) == 3
+        rows = {e.first_name: e for e in session.exec(select(Employee)).all()}
+        assert rows["A"].note_shifts == "1ST" and rows["C"].note_days == "SUN,MON"
+        assert all(e.notes_parser_version == note_constraints.PARSER_VERSION for e in rows.values())
+
+        # Parsed constraints feed the compiled availability
+        c, = availability_mask.get_compiled(session, [rows["C"]])
+        assert availability_mask.allows(c, datetime(2025, 1, 5, 9), datetime(2025, 1, 5, 17))  # Sunday
+        assert not availability_mask.allows(c, datetime(2025, 1, 7, 9), datetime(2025, 1, 7, 17))  # Tuesday
+    print("SUCCESS: Backfill parsed every stale row.")
+
+def test_migration_uses_same_parser():
+    print("Testing migrate_notes_to_grid against the shared parser...")
+    grid, no_ot, no_plaza = parse_notes_to_grid("AVAIL 2ND & 3RD NO PLAZA", False, False)
+    assert no_plaza and not no_ot
+    assert grid["mon"] == {"1st": False, "2nd": True, "3rd": True}
+    grid, no_ot, no_plaza = parse_notes_to_grid("NO OVERTIME", False, False)
+    assert grid is None and no_ot
+    assert parse_notes_to_grid("860-555-0100 CELL", False, False) == (None, False, False)
+    print("SUCCESS: Migration grid matches the parser.")
+
+if __name__ == "__main__":
+    test_notes_parsed_on_write()
+    test_backfill()
+    test_migration_uses_same_parser()
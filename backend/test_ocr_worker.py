@@ -0,0 +1,121 @@
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import orientation
+import ocr_worker
+
+PAGE_SECONDS = [0.2, 0.2, 0.6, 0.2, 0.2, 0.2]  # Page 3 is the slow one
+
+class FakeReader:
+    # Page number is encoded in the longest side; each page has a header and a row
+    def readtext(self, img, **kwargs):
+        page = max(img.shape[:2]) - 1000
+        time.sleep(PAGE_SECONDS[page])
+        return [
+            ([[300, 400], [500, 400], [500, 420], [300, 420]], f"row p{page}", 0.9),
+            ([[10, 10], [90, 10], [90, 30], [10, 30]], f"header p{page}", 0.9),
+        ]
+
+    def detect(self, img, **kwargs):
+        return [[]], [[]]
+
+def fake_page(path, filename, index, pixels):
+    return Image.new("RGB", (1000 + index, 800), "white"), None
+
+def test_parallel_pages():
+    print("Testing per-page OCR in parallel with ordered merge...")
+    saved = (ocr_worker.get_reader, ocr_worker.load_page, ocr_worker.page_count, orientation.osd, ocr_worker._pool)
+    reader = FakeReader()
+    ocr_worker.get_reader = lambda: reader
+    ocr_worker.load_page = fake_page
+    ocr_worker.page_count = lambda contents, filename: len(PAGE_SECONDS)
+    ocr_worker._pool = ThreadPoolExecutor(max_workers=len(PAGE_SECONDS))  # Stands in for the processes
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())  # ocr_debug.log
+    try:
+        orientation.osd = lambda img: (0, 9.0)  # Confident: page 1 is read with the others
+        t0 = time.perf_counter()
+        sequential = ocr_worker.read_pages("call_sheet.pdf", "call_sheet.pdf")
+        sequential_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        progress = []
+        parallel = ocr_worker.read_document("call_sheet.pdf", "call_sheet.pdf", lambda f, m: progress.append(f))
+        parallel_time = time.perf_counter() - t0
+        assert parallel["pages"] == sequential["pages"] and parallel["orientation"] == sequential["orientation"]
+        memory = parallel["memory"]
+        # The orientation pass (which did not read page 1), then each page
+        assert [(t["task"], t["page"]) for t in memory["pages"]] == [("orient", 0)] + [("read", i) for i in range(len(PAGE_SECONDS))]
+        assert memory["peak_rss_mb"] > 0 and memory["budget_mb"] == ocr_worker.page_budget_mb(len(PAGE_SECONDS))
+        assert [[text for _, text in line] for line in parallel["pages"][2]] == [["header p2"], ["row p2"]]
+        assert parallel_time < 0.6 * sequential_time
+        assert progress == sorted(progress) and len(progress) == len(PAGE_SECONDS) + 1
+
+        # Fallback orientation: the first page comes from the scoring pass, in front
+        orientation.osd = lambda img: (0, 0.0)
+        merged = asyncio.run(ocr_worker.read("call_sheet.pdf", "call_sheet.pdf"))
+        assert merged["orientation"]["method"] == "fallback"
+        assert [page[0][0][1] for page in merged["pages"]] == [f"header p{i}" for i in range(len(PAGE_SECONDS))]
+        status = ocr_worker.status()["orientation"]
+        assert status["documents"] == 2 and status["fallback"] == 1
+    finally:
+        os.chdir(cwd)
+        ocr_worker._pool.shutdown()
+        ocr_worker.get_reader, ocr_worker.load_page, ocr_worker.page_count, orientation.osd, ocr_worker._pool = saved
+    print(f"SUCCESS: {len(PAGE_SECONDS)} pages in {parallel_time:.2f}s (one after another: {sequential_time:.2f}s)")
+
+def test_memory_budget():
+    print("Testing page size limits from the memory budget...")
+    # Pages read at the same time share the upload's budget
+    assert ocr_worker.page_budget_mb(1) == ocr_worker.OCR_MEMORY_MB
+    assert ocr_worker.page_budget_mb(20) == ocr_worker.OCR_MEMORY_MB // ocr_worker.OCR_WORKERS
+    pixels = ocr_worker.max_pixels(64)
+    assert pixels == 64 * 2**20 // ocr_worker.BYTES_PER_PIXEL
+
+    # A large photo is scaled down (decoded small for JPEG) to fit, keeping its shape
+    path = os.path.join(tempfile.mkdtemp(), "photo.jpg")
+    Image.new("RGB", (4032, 3024), "white").save(path)
+    image, dpi = ocr_worker.load_page(path, "photo.jpg", 0, pixels)
+    assert image.mode == "RGB" and dpi is None
+    assert image.width * image.height <= pixels and abs(image.width / image.height - 4032 / 3024) < 0.01
+    small, _ = ocr_worker.load_page(path, "photo.jpg", 0, 4032 * 3024)
+    assert small.size == (4032, 3024)
+    print(f"SUCCESS: 4032x3024 photo read as {image.width}x{image.height} for a 64 MB page budget")
+
+class HungryReader(FakeReader):
+    # Page 2 holds 64 MB while it is read
+    def readtext(self, img, **kwargs):
+        page = max(img.shape[:2]) - 1000
+        held = b"x" * (64 * 2**20) if page == 1 else b""
+        time.sleep(0.1)
+        del held
+        return super().readtext(img, **kwargs)
+
+def test_over_budget_page_fails():
+    print("Testing pages over the memory budget...")
+    saved = (ocr_worker.get_reader, ocr_worker.load_page, ocr_worker.page_count, ocr_worker.page_budget_mb, orientation.osd)
+    reader = HungryReader()
+    ocr_worker.get_reader = lambda: reader
+    ocr_worker.load_page = fake_page
+    ocr_worker.page_count = lambda contents, filename: 3
+    ocr_worker.page_budget_mb = lambda count: 32
+    orientation.osd = lambda img: (0, 9.0)
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())  # ocr_debug.log
+    try:
+        ocr_worker.read_pages("call_sheet.pdf", "call_sheet.pdf")
+        assert False, "Page 2 is over its budget"
+    except MemoryError as e:
+        assert str(e).startswith("Page 2 used") and str(e).endswith("over its 32 MB budget")
+    finally:
+        os.chdir(cwd)
+        ocr_worker.get_reader, ocr_worker.load_page, ocr_worker.page_count, ocr_worker.page_budget_mb, orientation.osd = saved
+    print("SUCCESS: A page over its budget fails the upload.")
+
+if __name__ == "__main__":
+    test_parallel_pages()
+    test_memory_budget()
+    test_over_budget_page_fails()
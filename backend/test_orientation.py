@@ -0,0 +1,55 @@
+from PIL import Image
+import orientation
+
+def marked_page():
+    # Landscape page, white, with a black block in the top-left corner when upright
+    page = Image.new("RGB", (1600, 1200), "white")
+    page.paste((0, 0, 0), (0, 0, 200, 100))
+    return page
+
+def upright_score(img):
+    # Stands in for a full OCR pass: 1 when the block is top-left, landscape
+    dark_top_left = img.getpixel((10, 10)) == (0, 0, 0)
+    return int(dark_top_left and img.width > img.height), img.size
+
+def test_orientation():
+    print("Testing thumbnail/OSD orientation with scored fallback...")
+    passes = []
+    def score(img):
+        passes.append(1)
+        return upright_score(img)
+
+    # Scanned a quarter turn counter-clockwise: 90 degrees clockwise to fix
+    turned = marked_page().rotate(90, expand=True)
+    real_osd = orientation.osd
+    try:
+        orientation.osd = lambda img: (0, 0.0)  # Tesseract not sure (or not installed)
+        found = orientation.detect(turned, score)
+        assert (found.angle, found.method, found.passes) == (90, "fallback", 4)
+        assert orientation.upright(turned, found.angle).size == (1600, 1200)
+        assert found.result == (1600, 1200)  # The winning pass is handed back
+
+        # Tall text boxes: only the two quarter turns are tried
+        passes.clear()
+        found = orientation.detect(turned, score, boxes=lambda thumb: [(20, 300)] * 10 + [(30, 30)] * 50)
+        assert (found.angle, found.passes, len(passes)) == (90, 2, 2)
+        # Too few elongated boxes say nothing
+        assert orientation.axis_candidates([(300, 20)] * 3 + [(30, 30)] * 50) == orientation.ANGLES
+        assert orientation.axis_candidates([(300, 20)] * 9 + [(20, 300)]) == (0, 180)
+
+        # Confident OSD: no scoring pass at all, on a thumbnail
+        passes.clear()
+        seen = []
+        orientation.osd = lambda img: (seen.append(img.size), (270, 8.5))[1]
+        found = orientation.detect(turned, score)
+        assert (found.angle, found.method, found.passes, found.result) == (270, "osd", 0, None)
+        assert passes == [] and max(seen[0]) == orientation.THUMB_SIZE
+    finally:
+        orientation.osd = real_osd
+
+    stats = orientation.stats()
+    assert stats["pages"] >= 3 and stats["osd"] >= 1 and stats["fallback"] >= 2 and stats["detection_narrowed"] >= 1
+    print("SUCCESS: fallback only when OSD is unsure, narrowed by text boxes, counted")
+
+if __name__ == "__main__":
+    test_orientation()
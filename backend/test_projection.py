@@ -0,0 +1,133 @@
+import time
+from datetime import timedelta
+from sqlmodel import Session, select, func
+from models import Employee, Role, Shift, ShiftTemplate, TemplateCycle
+import week_hours  # Registers the hours ledger hooks
+import projection
+from conftest import make_engine, SAT
+
+def setup(session, employees=2):
+    session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+    for emp_id in range(1, employees + 1):
+        session.add(Employee(id=emp_id, first_name=f"E{emp_id}", last_name="X", default_role_id=3))
+    session.commit()
+
+def run_templates(session, start, weeks, dry_run=False):
+    templates, cycles = projection.load_templates(session)
+    week_starts, rows = projection.template_targets(templates, cycles, start, weeks)
+    plan = projection.plan_templates(week_starts, rows, projection.existing_shifts(session, rows))
+    if not dry_run:
+        projection.apply(session, plan)
+        session.commit()
+    return plan
+
+def test_apply_templates():
+    print("Testing template projection...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        session.add(ShiftTemplate(employee_id=1, role_id=3, day_of_week=0, start_time="06:00", end_time="14:00"))  # Monday
+        session.add(ShiftTemplate(employee_id=2, role_id=3, day_of_week=5, start_time="22:00", end_time="06:00", location="Lot A"))  # Saturday overnight
+        # Manually locked shift already at the second Monday
+        session.add(Shift(employee_id=1, role_id=3, start_time=SAT + timedelta(days=9, hours=6), end_time=SAT + timedelta(days=9, hours=12), is_locked=True))
+        session.commit()
+
+        plan = run_templates(session, SAT, 3, dry_run=True)
+        assert [(w["created"], w["skipped"]) for w in plan.weeks()] == [(2, 0), (1, 1), (2, 0)]
+        assert session.exec(select(func.count(Shift.id))).one() == 1
+        overnight = [s for s in plan.preview()["shifts"] if s["employee_id"] == 2][0]
+        assert (overnight["start_time"], overnight["end_time"]) == (SAT + timedelta(hours=22), SAT + timedelta(days=1, hours=6))
+
+        run_templates(session, SAT, 3)
+        assert session.exec(select(func.count(Shift.id)).where(Shift.is_locked == True)).one() == 6
+        # Running it again adds nothing
+        assert sum(w["created"] for w in run_templates(session, SAT, 3).weeks()) == 0
+    print("SUCCESS: templates projected, manual locks respected, dry run writes nothing")
+
+def test_template_cycles():
+    print("Testing rotating template cycles, preview and locked sync...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        # 2-week rotation anchored a week before SAT: SAT's week is cycle week 1
+        cycle = TemplateCycle(name="Lot A", length_weeks=2, anchor_date=SAT - timedelta(days=7))
+        session.add(cycle)
+        session.commit()
+        session.add(ShiftTemplate(employee_id=1, role_id=3, day_of_week=0, start_time="06:00", end_time="14:00", cycle_id=cycle.id, cycle_week=0))
+        session.add(ShiftTemplate(employee_id=2, role_id=3, day_of_week=0, start_time="06:00", end_time="14:00", cycle_id=cycle.id, cycle_week=1))
+        session.commit()
+
+        plan = run_templates(session, SAT, 4, dry_run=True)
+        by_week = [sorted(s["employee_id"] for s in plan.preview()["shifts"] if (s["start_time"] - SAT).days // 7 == w) for w in range(4)]
+        assert by_week == [[2], [1], [2], [1]]
+
+        # Lazy preview: only the window, minus what is applied
+        preview = projection.template_preview(session, SAT + timedelta(days=7), SAT + timedelta(days=14))
+        assert [(s.id, s.employee_id, s.start_time) for s in preview] == [(None, 1, SAT + timedelta(days=9, hours=6))]
+        run_templates(session, SAT, 2)
+        assert projection.template_preview(session, SAT + timedelta(days=7), SAT + timedelta(days=14)) == []
+
+        # Sync: Employee 1's cycle-week-0 Mondays in the 8 weeks from SAT+7 (4 occurrences)
+        session.add(Shift(employee_id=1, role_id=3, start_time=SAT + timedelta(days=23, hours=10), end_time=SAT + timedelta(days=23, hours=18)))
+        session.commit()
+        tmpl = session.exec(select(ShiftTemplate).where(ShiftTemplate.employee_id == 1)).one()
+        updated, created = projection.sync_locked(session, tmpl, cycle, (SAT + timedelta(days=7)).date())
+        session.commit()
+        # SAT+9 was applied above, SAT+23 had an unlocked shift: both moved onto the template
+        assert (updated, created) == (2, 2)
+        mondays = session.exec(select(Shift).where(Shift.employee_id == 1).order_by(Shift.start_time)).all()
+        assert [((s.start_time - SAT).days, s.start_time.hour, s.is_locked) for s in mondays] == [(9, 6, True), (23, 6, True), (37, 6, True), (51, 6, True)]
+        assert week_hours.get_employee_week_hours(session, 1, SAT + timedelta(days=21)) == 8.0
+    print("SUCCESS: cycles pick their week, preview is lazy, sync is batched")
+
+def test_project_locked():
+    print("Testing locked shift projection...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        base = [
+            Shift(employee_id=1, role_id=3, start_time=SAT + timedelta(days=2, hours=6), end_time=SAT + timedelta(days=2, hours=10), is_locked=True),
+            Shift(employee_id=1, role_id=3, start_time=SAT + timedelta(days=2, hours=14), end_time=SAT + timedelta(days=2, hours=18), is_locked=True),
+            Shift(employee_id=2, role_id=3, start_time=SAT + timedelta(days=3, hours=6), end_time=SAT + timedelta(days=3, hours=14), is_locked=True),
+        ]
+        session.add_all(base)
+        # Week 1: an unlocked shift to replace; week 2: a locked day to keep
+        session.add(Shift(employee_id=1, role_id=3, start_time=SAT + timedelta(days=9, hours=8), end_time=SAT + timedelta(days=9, hours=16)))
+        session.add(Shift(employee_id=2, role_id=3, start_time=SAT + timedelta(days=17, hours=9), end_time=SAT + timedelta(days=17, hours=17), is_locked=True))
+        session.commit()
+
+        week_starts, rows = projection.locked_targets(base, SAT, 2)
+        plan = projection.plan_locked(week_starts, rows, projection.existing_shifts(session, rows))
+        assert [(w["created"], w["deleted"], w["skipped"]) for w in plan.weeks()] == [(3, 1, 0), (2, 0, 1)]
+        projection.apply(session, plan)
+        session.commit()
+
+        monday = session.exec(select(Shift).where(Shift.employee_id == 1, Shift.start_time >= SAT + timedelta(days=9), Shift.start_time < SAT + timedelta(days=10))).all()
+        assert sorted(s.start_time.hour for s in monday) == [6, 14] and not any(s.is_locked for s in monday)
+        assert week_hours.get_employee_week_hours(session, 1, SAT + timedelta(days=7)) == 8.0
+        assert week_hours.get_employee_week_hours(session, 2, SAT + timedelta(days=14)) == 8.0  # Locked day kept
+    print("SUCCESS: projected weeks replace unlocked days and keep locked ones")
+
+def test_year_projection_speed():
+    print("Testing 52 weeks of templates for 150 employees...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session, employees=150)
+        session.add_all([
+            ShiftTemplate(employee_id=emp_id, role_id=3, day_of_week=day, start_time="06:00", end_time="14:00")
+            for emp_id in range(1, 151) for day in range(5)
+        ])
+        session.commit()
+        t = time.perf_counter()
+        plan = run_templates(session, SAT, 52)
+        elapsed = time.perf_counter() - t
+        print(f"  {len(plan.creates)} shifts projected in {elapsed * 1000:.0f} ms")
+        assert session.exec(select(func.count(Shift.id))).one() == 150 * 5 * 52
+        assert elapsed < 10.0
+    print("SUCCESS: a year of templates projects in seconds")
+
+if __name__ == "__main__":
+    test_apply_templates()
+    test_template_cycles()
+    test_project_locked()
+    test_year_projection_speed()
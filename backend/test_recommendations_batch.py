@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timedelta
+from sqlmodel import Session
+from models import Employee, Role, Shift, Availability, EmployeeRole
+from recommendations import Slot, recommend
+from conftest import make_engine
+
+def test_recommendation_rules():
+    print("Testing recommendation rules...")
+    engine = make_engine()
+    sat = datetime(2025, 1, 4)
+    wed = datetime(2025, 1, 8)
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        session.add(Role(id=2, name="Stock", color_hex="#000"))
+        session.add(Employee(id=1, first_name="Senior", last_name="S", default_role_id=1, hire_date=datetime(2010, 1, 1)))
+        session.add(Employee(id=2, first_name="Junior", last_name="J", default_role_id=1, hire_date=datetime(2020, 1, 1)))
+        session.add(Employee(id=3, first_name="Busy", last_name="B", default_role_id=1))
+        session.add(Employee(id=4, first_name="Secondary", last_name="S", default_role_id=2, hire_date=datetime(2015, 1, 1)))
+        session.add(Employee(id=5, first_name="Vacation", last_name="FT", default_role_id=1, is_full_time=True))
+        session.add(Employee(id=6, first_name="Vacation", last_name="PT", default_role_id=1, willing_to_work_vacation_week=True))
+        session.add(Employee(id=7, first_name="Capped", last_name="C", default_role_id=1, max_weekly_hours=10))
+        session.add(Employee(id=8, first_name="Unavailable", last_name="U", default_role_id=1))
+        session.add(Employee(id=9, first_name="Stock", last_name="Only", default_role_id=2))
+        session.add(EmployeeRole(employee_id=4, role_id=1))
+        session.add(Availability(employee_id=8, day_of_week=2, start_time="06:00", end_time="12:00", is_available=True))
+        # Busy overlaps the slot, Senior already works the morning (long day), Capped has 8h this week
+        session.add(Shift(employee_id=3, role_id=1, start_time=wed.replace(hour=15), end_time=wed.replace(hour=19)))
+        session.add(Shift(employee_id=1, role_id=1, start_time=wed.replace(hour=6), end_time=wed.replace(hour=12)))
+        session.add(Shift(employee_id=7, role_id=1, start_time=sat.replace(hour=6), end_time=sat.replace(hour=14)))
+        session.add(Shift(employee_id=5, role_id=1, start_time=sat + timedelta(days=1, hours=8), end_time=sat + timedelta(days=1, hours=16), is_vacation=True))
+        session.add(Shift(employee_id=6, role_id=1, start_time=sat + timedelta(days=1, hours=8), end_time=sat + timedelta(days=1, hours=16), is_vacation=True))
+        session.commit()
+
+        employees, results = recommend(session, [Slot(wed.replace(hour=14), wed.replace(hour=18), 1)])
+        ranked = [(r["employee_id"], r["score"]) for r in results[0]]
+        print(f"Ranked: {ranked}")
+        assert ranked == [(4, 100), (2, 100), (6, 100), (1, 80)]
+        assert results[0][2]["reasons"] == ["Willing to work during vacation week", "Weekly: 12.0 hrs"]
+        assert results[0][3]["reasons"] == ["Weekly: 10.0 hrs", "Long Day: 10.0 hrs"]
+    print("SUCCESS: Recommendation rules applied.")
+
+def test_recommendations_batch_performance():
+    print("Testing batch recommendations (300 slots x 150 employees)...")
+    engine = make_engine()
+    sat = datetime(2025, 1, 4)
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        for emp_id in range(1, 151):
+            session.add(Employee(id=emp_id, first_name=f"E{emp_id}", last_name="X", default_role_id=1, max_weekly_hours=40))
+            session.add(Availability(employee_id=emp_id, day_of_week=emp_id % 7, start_time="00:00", end_time="06:00", is_available=False))
+            for day in range(0, 14, 3):
+                start = sat + timedelta(days=day, hours=6 + 8 * (emp_id % 3))
+                session.add(Shift(employee_id=emp_id, role_id=1, start_time=start, end_time=start + timedelta(hours=8)))
+        session.commit()
+
+        slots = [Slot(sat + timedelta(days=i % 14, hours=(i * 5) % 18), sat + timedelta(days=i % 14, hours=(i * 5) % 18 + 6), 1) for i in range(300)]
+        t0 = time.perf_counter()
+        employees, results = recommend(session, slots)
+        elapsed = time.perf_counter() - t0
+        print(f"Scored {len(slots) * len(employees)} pairs in {elapsed * 1000:.0f}ms")
+        assert len(results) == 300 and all(results)
+        assert elapsed < 5
+
+        # Same answer as scoring each slot on its own
+        for i in (0, 17, 299):
+            assert recommend(session, [slots[i]])[1][0] == results[i]
+    print("SUCCESS: Batch recommendations scored.")
+
+if __name__ == "__main__":
+    test_recommendation_rules()
+    test_recommendations_batch_performance()
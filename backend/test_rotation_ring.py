@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, select, update
+from models import Employee, Role, Shift, RotationMember, RotationState
+import rotation
+import week_hours  # Registers the hours ledger hooks
+from conftest import make_engine, SAT
+
+def setup(session):
+    for role_id in (3, 4):
+        session.add(Role(id=role_id, name=str(role_id), color_hex="#fff"))
+    # Seniority among full time: 2, 1, 4 (no hire date last); 3 is part time
+    session.add(Employee(id=1, first_name="A", last_name="X", default_role_id=3, is_full_time=True, hire_date=datetime(2010, 1, 1)))
+    session.add(Employee(id=2, first_name="B", last_name="X", default_role_id=3, is_full_time=True, hire_date=datetime(2005, 1, 1),
+                         last_call_time=datetime(2025, 1, 2)))
+    session.add(Employee(id=3, first_name="C", last_name="X", default_role_id=3, hire_date=datetime(2000, 1, 1)))
+    session.add(Employee(id=4, first_name="D", last_name="X", default_role_id=4, is_full_time=True))
+    session.add(Shift(employee_id=1, role_id=3, start_time=SAT.replace(hour=6), end_time=SAT.replace(hour=14)))
+    session.add(Shift(employee_id=1, role_id=3, start_time=SAT + timedelta(days=1, hours=6), end_time=SAT + timedelta(days=1, hours=12)))
+    session.commit()
+
+def members(session, role_id=None):
+    return [(m.employee_id, m.next_employee_id) for m in session.exec(
+        select(RotationMember).where(RotationMember.context_key == rotation.context_key(role_id)).order_by(RotationMember.position)
+    ).all()]
+
+def test_load_employees():
+    print("Testing rotation employee rows...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        rows = rotation.load_employees(session, None, SAT)
+        assert [(e["id"], h) for e, h in rows] == [(3, 0.0), (2, 0.0), (1, 14.0), (4, 0.0)]
+        assert [e["id"] for e, _ in rotation.load_employees(session, 4, SAT)] == [4]
+    print("SUCCESS: One query returns employees with their weekly hours in seniority order.")
+
+def test_ring():
+    print("Testing persisted rotation ring...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        # Built by the commit that added the employees
+        assert members(session) == [(2, 1), (1, 4), (4, 2)]
+        assert rotation.rebuild(session) == {"rotation_ft": [2, 1, 4], "rotation_ft:3": [2, 1], "rotation_ft:4": [4]}
+        session.commit()
+        assert members(session) == [(2, 1), (1, 4), (4, 2)]
+
+        # No RotationState yet: starts after the latest last_call_time
+        assert rotation.next_employee_id(session) == 1
+        rows = [e for e, _ in rotation.load_employees(session, None, SAT) if e["is_full_time"]]
+        assert [e["id"] for e in rotation.rotate(rows, 1)] == [1, 4, 2]
+
+        rotation.mark_called(session, session.get(Employee, 4))
+        session.commit()
+        assert session.get(RotationState, "rotation_ft").last_employee_id == 4
+        assert session.get(RotationState, "rotation_ft:4").last_employee_id == 4
+        assert rotation.next_employee_id(session) == 2
+
+        # Role context has its own ring
+        assert members(session, 3) == [(2, 1), (1, 2)]
+        assert rotation.next_employee_id(session, 3) == 1
+
+        # Calling a part timer does not move the ring
+        rotation.mark_called(session, session.get(Employee, 3))
+        session.commit()
+        assert rotation.next_employee_id(session) == 2
+    print("SUCCESS: Ring gives the next person to call from RotationState.")
+
+def test_ring_invalidation():
+    print("Testing rotation ring invalidation...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+
+        # Calls and unrelated edits keep the ring
+        emp = session.get(Employee, 1)
+        emp.phone = "555"
+        rotation.mark_called(session, emp)
+        session.commit()
+        assert members(session)
+
+        # Hire date change rebuilds it in the new order, in the same commit
+        emp.hire_date = datetime(2001, 1, 1)
+        session.add(emp)
+        session.commit()
+        assert members(session) == [(1, 2), (2, 4), (4, 1)]
+
+        # Rolled back changes keep it
+        emp.is_full_time = False
+        session.flush()
+        session.rollback()
+        assert members(session) == [(1, 2), (2, 4), (4, 1)]
+
+        # Bulk updates and new employees rebuild it too
+        session.exec(update(Employee).where(Employee.id == 4).values(is_full_time=False))
+        session.commit()
+        assert members(session) == [(1, 2), (2, 1)] and members(session, 4) == []
+        session.add(Employee(id=5, first_name="E", last_name="X", default_role_id=3, is_full_time=True))
+        session.commit()
+        assert members(session) == [(1, 2), (2, 5), (5, 1)]
+    print("SUCCESS: Rings are rebuilt on commit when full time, role or hire date change.")
+
+if __name__ == "__main__":
+    test_load_employees()
+    test_ring()
+    test_ring_invalidation()
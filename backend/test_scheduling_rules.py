@@ -0,0 +1,84 @@
+from datetime import datetime
+import numpy as np
+from sqlmodel import Session
+from models import Employee, Role, Shift
+from scheduling_rules import RULES, RuleContext, RuleSet, Rule, HARD
+from recommendations import Slot, recommend
+from autofill_engine import load_problem
+import week_hours
+from conftest import make_engine
+
+def test_rule_checks():
+    print("Testing vectorized rule checks...")
+    checks = RULES.compile(["max_weekly_hours", "weekly_overtime", "part_time_hours", "daily_safety_limit", "no_plaza", "probation"])(RuleContext(
+        weekly=np.array([[30.0, 36.0, 40.0]]),
+        daily=np.array([[0.0, 8.0, 9.0]]),
+        duration=np.array([[8.0]]),
+        cap=np.array([[38.0, np.inf, 48.0]]),
+        location=np.array([["Plaza"]], dtype=object),
+        no_plaza=np.array([[False, True, False]]),
+        employed_days=np.array([[10.0, 90.0, np.nan]]),
+    ))
+    assert checks["max_weekly_hours"].tolist() == [[True, True, True]]
+    assert checks["weekly_overtime"].tolist() == [[True, False, False]]
+    assert checks["part_time_hours"].tolist() == [[True, False, False]]
+    assert checks["daily_safety_limit"].tolist() == [[True, True, False]]
+    assert checks["no_plaza"].tolist() == [[True, False, True]]
+    assert checks["probation"].tolist() == [[False, False, True]]  # No hire date = not probationary
+
+    # Parameters are declared once and read by the consumers
+    assert week_hours.LUNCH_MIN_SHIFT_HOURS == RULES.param("maintenance_lunch", "min_shift_hours")
+    assert week_hours.paid_shift_hours(datetime(2025, 1, 4, 6), datetime(2025, 1, 4, 14), 4) == 7.5
+
+    try:
+        RULES.compile(["min_rest"])
+        assert False, "min_rest has no vectorized check"
+    except ValueError:
+        pass
+    print("SUCCESS: Rules evaluate over whole (slot, employee) matrices.")
+
+def test_rule_timings():
+    print("Testing per-rule timings...")
+    rules = RuleSet([Rule("always", HARD, "Always passes", {}, lambda c, p: np.ones_like(c.weekly, dtype=bool))])
+    compiled = rules.compile(["always"])
+    compiled(RuleContext(weekly=np.zeros((3, 4))))
+    compiled(RuleContext(weekly=np.zeros((2, 2))))
+    with rules.timed("always", 5):
+        pass
+    report = rules.report()[0]
+    assert (report["calls"], report["pairs"]) == (3, 21)
+    assert report["total_ms"] >= 0 and report["vectorized"] is True
+    rules.reset_timings()
+    assert rules.report()[0]["calls"] == 0
+    print("SUCCESS: Every evaluation is counted per rule.")
+
+def test_shared_no_plaza():
+    print("Testing no_plaza shared by recommendations and autofill...")
+    engine = make_engine()
+    start, end = datetime(2025, 1, 8, 14), datetime(2025, 1, 8, 18)
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        session.add(Employee(id=1, first_name="Any", last_name="A", default_role_id=1))
+        session.add(Employee(id=2, first_name="Column", last_name="C", default_role_id=1, no_plaza=True))
+        session.add(Employee(id=3, first_name="Notes", last_name="N", default_role_id=1, notes="NO PLAZA"))
+        session.add(Shift(id=10, role_id=1, location="Plaza", start_time=start, end_time=end))
+        session.add(Shift(id=11, role_id=1, location="Booth", start_time=start, end_time=end))
+        session.commit()
+        plaza, booth = session.get(Shift, 10), session.get(Shift, 11)
+
+        before = {r["name"]: r["calls"] for r in RULES.report()}
+        _, results = recommend(session, [Slot.from_shift(plaza), Slot.from_shift(booth)])
+        assert [r["employee_id"] for r in results[0]] == [1]
+        assert sorted(r["employee_id"] for r in results[1]) == [1, 2, 3]
+
+        problem = load_problem(session, [plaza, booth])
+        assert problem.eligibility().tolist() == [[True, False, False], [True, True, True]]
+        after = {r["name"]: r["calls"] for r in RULES.report()}
+        assert after["no_plaza"] - before["no_plaza"] == 2
+        assert after["max_weekly_hours"] > before["max_weekly_hours"]
+    print("SUCCESS: The same compiled no_plaza rule applies everywhere.")
+
+if __name__ == "__main__":
+    test_rule_checks()
+    test_rule_timings()
+    test_shared_no_plaza()
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from sqlalchemy import event
+from sqlmodel import Session, select
+from models import Employee, Role, Shift
+import week_hours  # Registers the hours ledger hooks
+import shift_bulk
+from conftest import make_engine, SAT
+
+def test_insert_shifts():
+    print("Testing single-transaction bulk shift insert...")
+    engine = make_engine()
+    commits = []
+    with Session(engine) as session:
+        session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+        session.add(Employee(id=1, first_name="Ann", last_name="X", default_role_id=3))
+        session.commit()
+        event.listen(session, "after_commit", lambda s: commits.append(1))
+
+        start = SAT + timedelta(hours=6)
+        rows = [
+            {"employee_id": 1, "role_id": 3, "start_time": start, "end_time": start + timedelta(hours=8), "is_vacation": True},
+            {"employee_id": None, "role_id": 3, "start_time": start, "end_time": start + timedelta(hours=8), "notes": "Cover for Vacation", "parent": 0},
+        ] + [
+            {"employee_id": 1, "role_id": 3, "start_time": start + timedelta(days=d), "end_time": start + timedelta(days=d, hours=6)}
+            for d in range(1, 5)
+        ]
+        created = shift_bulk.insert_shifts(session, rows)
+        session.commit()
+
+        assert len(commits) == 1
+        assert [c["start_time"] for c in created] == [r["start_time"] for r in rows]
+        stored = {s.id: s for s in session.exec(select(Shift)).all()}
+        assert sorted(stored) == sorted(c["id"] for c in created)
+        assert all(stored[c["id"]].start_time == c["start_time"] and stored[c["id"]].end_time == c["end_time"] for c in created)
+        vacation, cover = stored[created[0]["id"]], stored[created[1]["id"]]
+        assert vacation.is_vacation and vacation.parent_id is None and not vacation.is_locked
+        assert cover.employee_id is None and cover.parent_id == vacation.id == created[1]["parent_id"]
+        # Reported to shift_events like ORM writes
+        assert week_hours.get_employee_week_hours(session, 1, SAT) == 8.0 + 4 * 6.0
+        assert shift_bulk.insert_shifts(session, []) == []
+    print("SUCCESS: one insert, one commit, parent linked, ledger updated")
+
+def test_update_and_delete():
+    print("Testing set-based bulk update/delete with locked shifts and filters...")
+    engine = make_engine()
+    with Session(engine) as session:
+        session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+        session.add(Role(id=4, name="Maintenance", color_hex="#000"))
+        session.add(Employee(id=1, first_name="Ann", last_name="X", default_role_id=3))
+        session.commit()
+        # Two weeks of 8h shifts every half hour, more than one chunk of ids; every 10th locked
+        rows = []
+        for n in range(14 * 48 - 16):
+            start = SAT + timedelta(minutes=30 * n)
+            rows.append({"employee_id": 1 if n % 2 else None, "role_id": 3, "start_time": start, "end_time": start + timedelta(hours=8),
+                         "location": "Lot A" if n % 3 else "Plaza", "is_locked": n % 10 == 0})
+        created = shift_bulk.insert_shifts(session, rows)
+        session.commit()
+        ids = [c["id"] for c in created]
+        locked = {c["id"] for c in created if c["is_locked"]}
+        assert len(ids) > shift_bulk.CHUNK_SIZE
+
+        updated, skipped = shift_bulk.update_shifts(session, {"role_id": 4}, ids)
+        session.commit()
+        assert set(updated) == set(ids) - locked and set(skipped) == locked
+        assigned = [c for c in created if c["employee_id"] == 1 and c["start_time"] < SAT + timedelta(days=7)]
+        assert week_hours.get_employee_week_hours(session, 1, SAT, paid=True) == len(assigned) * 7.5  # Maintenance lunch applied
+
+        # Relock one week of Plaza shifts with filters only
+        week = {"start_date": SAT, "end_date": SAT + timedelta(days=7), "location": "Plaza"}
+        updated, skipped = shift_bulk.update_shifts(session, {"is_locked": True}, filters=week, skip_locked=False)
+        session.commit()
+        expected = {c["id"] for c in created if c["location"] == "Plaza" and c["start_time"] < SAT + timedelta(days=7)}
+        assert set(updated) == expected and skipped == []
+
+        # Unlocking alongside another change does not get past the lock without force
+        one = sorted(expected - locked)[:1]  # Relocked above, role 4
+        values = {"is_locked": False, "role_id": 3}
+        updated, skipped = shift_bulk.update_shifts(session, values, one, skip_locked=shift_bulk.skips_locked(values))
+        assert updated == [] and skipped == one
+        assert shift_bulk.skips_locked({"is_locked": True}) is False and shift_bulk.skips_locked(values, force=True) is False
+        assert session.exec(select(Shift.role_id).where(Shift.id == one[0])).one() == 4
+
+        deleted, skipped = shift_bulk.delete_shifts(session, ids)
+        session.commit()
+        still_locked = set(session.exec(select(Shift.id).where(Shift.is_locked == True)).all())
+        assert set(skipped) == still_locked and set(deleted) == set(ids) - still_locked
+        assert set(session.exec(select(Shift.id)).all()) == still_locked
+        # Ledger follows the deletes
+        remaining = session.exec(select(Shift).where(Shift.employee_id == 1, Shift.start_time < SAT + timedelta(days=7))).all()
+        assert week_hours.get_employee_week_hours(session, 1, SAT) == sum(8.0 for _ in remaining)
+
+        deleted, skipped = shift_bulk.delete_shifts(session, filters={"start_date": SAT}, skip_locked=False)
+        session.commit()
+        assert set(deleted) == still_locked and session.exec(select(Shift)).all() == []
+    print("SUCCESS: chunked statements skip locked shifts and keep the ledger in step")
+
+if __name__ == "__main__":
+    test_insert_shifts()
+    test_update_and_delete()
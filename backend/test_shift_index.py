@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, text
+from models import Employee, Role, Shift
+from shift_index import shift_index
+from conftest import make_engine
+
+def make_db():
+    engine = make_engine()
+    with Session(engine) as session:
+        session.add(Role(id=1, name="Cashier", color_hex="#fff"))
+        session.add(Employee(id=1, first_name="Eve", last_name="A", default_role_id=1))
+        session.add(Employee(id=2, first_name="Bob", last_name="B", default_role_id=1))
+        session.commit()
+    return engine
+
+def test_shift_index():
+    print("Testing shift interval index...")
+    engine = make_db()
+    day = datetime(2025, 1, 6)
+
+    with Session(engine) as session:
+        session.add(Shift(employee_id=1, role_id=1, start_time=day.replace(hour=9), end_time=day.replace(hour=17)))
+        session.add(Shift(employee_id=1, role_id=1, start_time=day.replace(hour=22), end_time=day.replace(hour=22) + timedelta(hours=10)))
+        session.commit()
+        shift_index.load(session)
+
+    assert shift_index.has_conflict(1, day.replace(hour=16), day.replace(hour=18))
+    assert not shift_index.has_conflict(1, day.replace(hour=17), day.replace(hour=22))  # Touching is not overlapping
+    assert shift_index.has_conflict(1, day + timedelta(days=1, hours=6), day + timedelta(days=1, hours=7))  # Overnight
+    assert not shift_index.has_conflict(2, day.replace(hour=9), day.replace(hour=17))
+
+    # Create / update / delete through the ORM keep the index in sync
+    with Session(engine) as session:
+        new = Shift(employee_id=2, role_id=1, start_time=day.replace(hour=9), end_time=day.replace(hour=13))
+        session.add(new)
+        session.commit()
+        assert shift_index.overlapping(2, day.replace(hour=12), day.replace(hour=14)) == [new.id]
+
+        new.start_time = day.replace(hour=14)
+        new.end_time = day.replace(hour=18)
+        session.add(new)
+        session.commit()
+        assert not shift_index.has_conflict(2, day.replace(hour=9), day.replace(hour=13))
+        assert shift_index.has_conflict(2, day.replace(hour=15), day.replace(hour=16))
+
+        session.delete(new)
+        session.commit()
+        assert not shift_index.has_conflict(2, day.replace(hour=15), day.replace(hour=16))
+
+        # Rolled back writes never reach the index
+        session.add(Shift(employee_id=2, role_id=1, start_time=day.replace(hour=1), end_time=day.replace(hour=2)))
+        session.flush()
+        session.rollback()
+        assert not shift_index.has_conflict(2, day.replace(hour=1), day.replace(hour=2))
+
+        report = shift_index.check_consistency(session)
+        print(f"Consistency: {report}")
+        assert report["consistent"]
+
+        # Writes made behind the app's back are detected and repaired
+        session.exec(text("INSERT INTO shift (employee_id, role_id, start_time, end_time, is_vacation, is_repeating, is_locked) VALUES (2, 1, '2025-01-07 09:00:00.000000', '2025-01-07 17:00:00.000000', 0, 0, 0)"))
+        session.commit()
+        report = shift_index.check_consistency(session, repair=True)
+        assert not report["consistent"] and len(report["missing"]) == 1
+        assert shift_index.check_consistency(session)["consistent"]
+        assert shift_index.has_conflict(2, datetime(2025, 1, 7, 10), datetime(2025, 1, 7, 11))
+
+    print("SUCCESS: Interval index matches the database.")
+
+if __name__ == "__main__":
+    test_shift_index()
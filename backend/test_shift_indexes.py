@@ -0,0 +1,29 @@
+from sqlmodel import text
+from database import ensure_indexes
+from add_shift_indexes import HOT_QUERIES, explain
+import models  # noqa: F401
+from conftest import make_engine
+
+def test_shift_indexes():
+    print("Testing shift index migration...")
+    engine = make_engine()
+
+    # Simulate a database created before the indexes were declared
+    with engine.begin() as conn:
+        for index in models.Shift.__table__.indexes:
+            conn.execute(text(f"DROP INDEX {index.name}"))
+
+    created = ensure_indexes(engine)
+    print(f"Created: {created}")
+    assert set(created) == {ix.name for ix in models.Shift.__table__.indexes}
+    assert ensure_indexes(engine) == []  # Idempotent
+
+    with engine.connect() as conn:
+        for name, sql in HOT_QUERIES.items():
+            plan = " ".join(explain(conn, sql))
+            print(f"  {name}: {plan}")
+            assert "INDEX ix_shift_" in plan, f"{name} does not use a shift index: {plan}"
+    print("SUCCESS: Hot shift queries use the new indexes.")
+
+if __name__ == "__main__":
+    test_shift_indexes()
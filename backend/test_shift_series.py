@@ -0,0 +1,124 @@
+from datetime import timedelta
+from sqlmodel import Session, select
+from models import Employee, Role, Shift, ShiftSeries, ShiftSeriesException
+import week_hours  # Registers the hours ledger hooks
+import shift_series
+import shift_validation
+from conftest import make_engine, SAT
+
+def setup(session):
+    session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+    session.add(Employee(id=1, first_name="Ann", last_name="X", default_role_id=3))
+    session.commit()
+
+def add_series(session, rule, start, hours=8, until=None, employee_id=1):
+    series = ShiftSeries(employee_id=employee_id, role_id=3, start_time=start, end_time=start + timedelta(hours=hours), rule=rule, until=until)
+    session.add(series)
+    session.commit()
+    session.refresh(series)
+    return series
+
+def test_rules():
+    print("Testing series expansion for named rules and RRULEs...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        first = SAT + timedelta(hours=6)  # Saturday
+        weekly = add_series(session, "weekly", first)
+        weekdays = add_series(session, "mon-fri", first)
+        rrule = add_series(session, "FREQ=WEEKLY;BYDAY=SA,SU", first, until=SAT + timedelta(days=8))
+
+        window_start, window_end = SAT, SAT + timedelta(days=14)
+        assert shift_series.starts(weekly, window_start, window_end) == [first, first + timedelta(days=7)]
+        # First occurrence counts even on a Saturday, then Monday-Friday
+        assert [d.weekday() for d in shift_series.starts(weekdays, window_start, window_end)] == [5, 0, 1, 2, 3, 4, 0, 1, 2, 3, 4]
+        assert shift_series.starts(rrule, window_start, window_end) == [first, first + timedelta(days=1), first + timedelta(days=7)]
+
+        # Years ahead costs the same as next week
+        far = SAT + timedelta(days=7 * 52 * 10)
+        assert shift_series.starts(weekly, far, far + timedelta(days=7)) == [first + timedelta(days=7 * 52 * 10)]
+
+        shifts = shift_series.expand(session, window_start, window_end)
+        assert len(shifts) == 2 + 11 + 3
+        assert all(s.id < 0 and s.is_repeating and s.end_time - s.start_time == timedelta(hours=8) for s in shifts)
+        assert session.exec(select(Shift)).all() == []
+
+        # Occurrences still running at the window start are included
+        assert len(shift_series.expand(session, first + timedelta(hours=7), first + timedelta(hours=9))) == 3
+
+        for bad in ("monthly", "FREQ=SOMETIMES"):
+            try:
+                shift_series.check_rule(bad, first)
+                assert False, bad
+            except ValueError:
+                pass
+    print("SUCCESS: series expand only the requested window")
+
+def test_edit_and_delete_occurrences():
+    print("Testing materialize-on-edit and skipped occurrences...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        first = SAT + timedelta(hours=6)
+        series = add_series(session, "daily", first)
+        window = (SAT, SAT + timedelta(days=7))
+        occurrences = shift_series.expand(session, *window)
+        assert len(occurrences) == 7
+
+        # Ids resolve back to the same occurrence
+        second = occurrences[1]
+        assert shift_series.get(session, second.id).start_time == second.start_time
+        assert shift_series.get(session, second.id + 1) is None  # Not an occurrence start
+
+        shift = shift_series.materialize(session, second.id)
+        shift.notes = "Moved"
+        session.commit()
+        assert shift.id > 0 and shift.start_time == second.start_time
+        assert week_hours.get_employee_week_hours(session, 1, SAT) == 7 * 8.0  # Stored and generated, once each
+
+        assert shift_series.skip(session, occurrences[2].id)
+        session.commit()
+        assert shift_series.materialize(session, occurrences[2].id) is None
+
+        # Bulk writes by id take occurrences too; skipped ones are dropped
+        ids, materialized = shift_series.resolve(session, [shift.id, occurrences[3].id, occurrences[2].id])
+        session.commit()
+        assert ids == [shift.id, materialized[occurrences[3].id]] and len(materialized) == 1
+
+        generated = shift_series.expand(session, *window)
+        assert len(generated) == 4
+        assert second.start_time not in [s.start_time for s in generated]
+        exceptions = session.exec(select(ShiftSeriesException).where(ShiftSeriesException.series_id == series.id)).all()
+        assert sorted((e.occurrence_start, e.shift_id) for e in exceptions) == [
+            (second.start_time, shift.id), (occurrences[2].start_time, None), (occurrences[3].start_time, materialized[occurrences[3].id])
+        ]
+    print("SUCCESS: edited occurrences become shifts, deleted ones stop")
+
+def test_readers_see_generated_occurrences():
+    print("Testing hours, overlap checks and validation with generated occurrences...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        first = SAT + timedelta(hours=6)
+        add_series(session, "weekly", first)  # No end: repeats forever
+        far_week = SAT + timedelta(weeks=40)
+        far = first + timedelta(weeks=40)
+
+        # Nothing is stored; reads generate the weeks they ask for
+        assert session.exec(select(Shift)).all() == []
+        assert week_hours.get_employee_week_hours(session, 1, far_week) == 8.0
+        assert week_hours.get_weeks_hours(session, [1], [SAT, far_week]) == {(1, SAT): 8.0, (1, far_week): 8.0}
+
+        overlap = (far + timedelta(hours=2), far + timedelta(hours=4))
+        assert shift_series.overlapping(session, 1, *overlap) == [shift_series.expand(session, *overlap)[0].id]
+        assert shift_series.overlapping(session, 1, far + timedelta(hours=8), far + timedelta(hours=9)) == []
+
+        proposed = Shift(employee_id=1, role_id=3, start_time=overlap[0], end_time=overlap[1])
+        report = shift_validation.validate(session, [proposed])
+        assert not report["valid"] and "overlaps with existing shift" in report["conflicts"][0]
+    print("SUCCESS: generated occurrences count as hours and conflicts")
+
+if __name__ == "__main__":
+    test_rules()
+    test_edit_and_delete_occurrences()
+    test_readers_see_generated_occurrences()
@@ -0,0 +1,90 @@
+import time
+import random
+from datetime import timedelta
+from sqlmodel import Session
+from models import Employee, Role, Shift
+import week_hours  # Registers the hours ledger hooks
+from shift_validation import validate
+from conftest import make_engine, SAT
+
+def at(day, hour):
+    return SAT + timedelta(days=day, hours=hour)
+
+def setup(session):
+    session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+    session.add(Employee(id=1, first_name="Ann", last_name="X", default_role_id=3, max_weekly_hours=40))
+    session.add(Employee(id=2, first_name="Bob", last_name="X", default_role_id=3, max_weekly_hours=20))
+    session.add(Shift(id=10, employee_id=1, role_id=3, start_time=at(0, 6), end_time=at(0, 14)))
+    session.add(Shift(id=11, employee_id=2, role_id=3, start_time=at(1, 6), end_time=at(1, 14)))
+    session.add(Shift(id=12, employee_id=2, role_id=3, start_time=at(2, 0), end_time=at(3, 0), is_vacation=True))
+    session.commit()
+
+def test_conflicts_and_rest():
+    print("Testing proposed shift validation...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        report = validate(session, [
+            Shift(employee_id=1, role_id=3, start_time=at(0, 12), end_time=at(0, 20)),  # Overlaps 10 and shift 2
+            Shift(employee_id=1, role_id=3, start_time=at(0, 18), end_time=at(0, 22)),
+            Shift(employee_id=2, role_id=3, start_time=at(1, 18).isoformat(), end_time=at(1, 22).isoformat()),  # 4h rest after 11
+            Shift(employee_id=2, role_id=3, start_time=at(2, 6), end_time=at(2, 14)),  # On vacation day: overlap
+            Shift(role_id=3, start_time=at(0, 12), end_time=at(0, 20)),  # Open shift, ignored
+        ])
+        assert report["valid"] is False
+        assert report["conflicts"] == [
+            "Shift 1 overlaps with existing shift ID [10]",
+            "Shift 1 overlaps with proposed shift 2",
+            "Shift 2 overlaps with proposed shift 1",
+            "Shift 4 overlaps with existing shift ID [12]",
+        ]
+        assert report["rest_warnings"] == ["Proposed shift 3 starts 4.0h after existing shift ID 11 ends (minimum rest 8h)"]
+
+        # Moving shift 10 (same id) does not conflict with its stored version
+        report = validate(session, [Shift(id=10, employee_id=1, role_id=3, start_time=at(0, 8), end_time=at(0, 16))])
+        assert report == {"valid": True, "conflicts": [], "rest_warnings": [], "overtime_warnings": []}
+    print("SUCCESS: Overlaps and short rest periods are reported.")
+
+def test_overtime():
+    print("Testing proposed shift overtime...")
+    engine = make_engine()
+    with Session(engine) as session:
+        setup(session)
+        report = validate(session, [
+            Shift(employee_id=2, role_id=3, start_time=at(3, 6), end_time=at(3, 14)),
+            Shift(employee_id=2, role_id=3, start_time=at(4, 6), end_time=at(4, 14)),
+            Shift(employee_id=2, role_id=3, start_time=at(8, 6), end_time=at(8, 14)),  # Next week
+            Shift(id=10, employee_id=1, role_id=3, start_time=at(0, 6), end_time=at(0, 16)),  # Replaces 8h with 10h
+        ])
+        # Bob: 8h + 24h vacation + 16h proposed this week; Ann: 10h
+        assert report["overtime_warnings"] == ["Employee Bob X is projected to work 48.0 hours (Limit: 20.0) in the week of 01/04/2025"]
+        assert report["valid"] is True
+    print("SUCCESS: Overtime is checked per employee and week.")
+
+def test_large_batch():
+    print("Testing validation of a 2,000 shift week...")
+    engine = make_engine()
+    random.seed(7)
+    with Session(engine) as session:
+        session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+        for emp_id in range(1, 401):
+            session.add(Employee(id=emp_id, first_name=f"E{emp_id}", last_name="X", default_role_id=3))
+        session.commit()
+        shifts = []
+        for emp_id in range(1, 401):
+            for day in range(5):
+                start = at(day, random.choice([6, 14, 20]))
+                shifts.append(Shift(employee_id=emp_id, role_id=3, start_time=start, end_time=start + timedelta(hours=8)))
+        t = time.perf_counter()
+        report = validate(session, shifts)
+        elapsed = time.perf_counter() - t
+        assert report["valid"] is True
+        assert report["rest_warnings"]
+        print(f"  {len(shifts)} shifts validated in {elapsed * 1000:.1f} ms")
+        assert elapsed < 1.0
+    print("SUCCESS: Large batches validate in one sweep.")
+
+if __name__ == "__main__":
+    test_conflicts_and_rest()
+    test_overtime()
+    test_large_batch()
@@ -0,0 +1,33 @@
+import asyncio
+import io
+import os
+from fastapi import HTTPException
+from starlette.datastructures import UploadFile
+import uploads
+
+def test_spool():
+    print("Testing chunked upload spooling...")
+    data = os.urandom(3 * uploads.CHUNK_SIZE + 17)
+    path = asyncio.run(uploads.spool(UploadFile(io.BytesIO(data), filename="scan.pdf")))
+    try:
+        assert path.endswith(".pdf")
+        with open(path, "rb") as f:
+            assert f.read() == data
+    finally:
+        uploads.discard(path)
+    assert not os.path.exists(path)
+
+    # Past the limit: 413 and nothing left behind
+    limit = uploads.MAX_UPLOAD_MB
+    uploads.MAX_UPLOAD_MB = 2
+    try:
+        asyncio.run(uploads.spool(UploadFile(io.BytesIO(data), filename="huge.pdf")))
+        assert False, "Oversized upload accepted"
+    except HTTPException as e:
+        assert e.status_code == 413
+    finally:
+        uploads.MAX_UPLOAD_MB = limit
+    print("SUCCESS: uploads copied to disk in chunks, oversized ones refused")
+
+if __name__ == "__main__":
+    test_spool()
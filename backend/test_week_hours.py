@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, select, delete
+from models import Employee, Role, Shift, EmployeeWeekHours
+import week_hours
+from week_hours import week_start_of, get_week_hours
+from conftest import make_engine
+
+def make_db():
+    engine = make_engine()
+    with Session(engine) as session:
+        session.add(Role(id=3, name="Cashier", color_hex="#fff"))
+        session.add(Role(id=4, name="Maintenance", color_hex="#000"))
+        session.add(Employee(id=1, first_name="Eve", last_name="A", default_role_id=3))
+        session.add(Employee(id=2, first_name="Max", last_name="M", default_role_id=4))
+        session.commit()
+    return engine
+
+def ledger(session):
+    rows = session.exec(select(EmployeeWeekHours)).all()
+    return {(r.employee_id, r.week_start): (round(r.raw_hours, 4), round(r.paid_hours, 4), r.shift_count) for r in rows if r.shift_count}
+
+def test_week_hours():
+    print("Testing weekly hours ledger...")
+    assert week_start_of(datetime(2025, 1, 6, 13)) == datetime(2025, 1, 4)  # Mon -> Sat
+    assert week_start_of(datetime(2025, 1, 4, 1)) == datetime(2025, 1, 4)  # Sat -> same day
+    assert week_start_of(datetime(2025, 1, 10, 23)) == datetime(2025, 1, 4)  # Fri -> previous Sat
+
+    engine = make_db()
+    week = datetime(2025, 1, 4)
+    with Session(engine) as session:
+        cashier = Shift(employee_id=1, role_id=3, start_time=datetime(2025, 1, 6, 9), end_time=datetime(2025, 1, 6, 17))
+        maint = Shift(employee_id=2, role_id=4, start_time=datetime(2025, 1, 6, 6), end_time=datetime(2025, 1, 6, 14))
+        session.add(cashier)
+        session.add(maint)
+        session.add(Shift(employee_id=None, role_id=3, start_time=datetime(2025, 1, 7, 9), end_time=datetime(2025, 1, 7, 17)))
+        session.commit()
+
+        assert get_week_hours(session, [1, 2], week) == {1: 8.0, 2: 8.0}
+        assert get_week_hours(session, [1, 2], week, paid=True) == {1: 8.0, 2: 7.5}  # Maintenance lunch
+
+        # Move the cashier shift into the next week and shorten it
+        cashier.start_time = datetime(2025, 1, 11, 9)
+        cashier.end_time = datetime(2025, 1, 11, 13)
+        session.add(cashier)
+        session.commit()
+        assert get_week_hours(session, [1], week) == {1: 0.0}
+        assert get_week_hours(session, [1], week + timedelta(days=7)) == {1: 4.0}
+
+        # Reassign the maintenance shift to the cashier, then delete it
+        maint.employee_id = 1
+        session.add(maint)
+        session.commit()
+        assert get_week_hours(session, [1, 2], week, paid=True) == {1: 7.5, 2: 0.0}
+        session.delete(maint)
+        session.commit()
+        assert get_week_hours(session, [1, 2], week) == {1: 0.0, 2: 0.0}
+
+        incremental = ledger(session)
+        week_hours.rebuild(session)
+        assert ledger(session) == incremental, (ledger(session), incremental)
+
+        # A Core write bypasses the ledger (clear_shifts.py); the check notices and rebuilds
+        assert week_hours.check_consistency(session)["consistent"]
+        session.add(Shift(employee_id=2, role_id=4, start_time=datetime(2025, 1, 8, 6), end_time=datetime(2025, 1, 8, 14)))
+        session.commit()
+        session.connection().execute(delete(Shift.__table__).where(Shift.__table__.c.employee_id == 2))
+        session.commit()
+        assert get_week_hours(session, [2], week) == {2: 8.0}  # Phantom hours
+        report = week_hours.check_consistency(session, repair=True)
+        assert not report["consistent"] and report["repaired"] and report["ledger_shifts"] == 2 and report["shifts"] == 1
+        assert get_week_hours(session, [2], week) == {2: 0.0}
+        assert week_hours.check_consistency(session)["consistent"]
+    print("SUCCESS: Ledger follows every shift write and matches a rebuild.")
+
+if __name__ == "__main__":
+    test_week_hours()
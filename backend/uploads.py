@@ -0,0 +1,41 @@
+"""
+Uploads spooled to disk (POST /import/ocr/, POST /import/excel/).
+
+The request body is copied in CHUNK_SIZE pieces to a temporary file, never held
+whole in memory, and refused with 413 past MAX_UPLOAD_MB
+(SCHEDULER_MAX_UPLOAD_MB, default 50). Whoever gets the path removes the file
+with discard() (or hands it to a background job, which takes it over).
+"""
+import os
+import tempfile
+from fastapi import HTTPException
+
+MAX_UPLOAD_MB = int(os.environ.get("SCHEDULER_MAX_UPLOAD_MB", 50))
+CHUNK_SIZE = 1024 * 1024
+
+async def spool(file):
+    """Copies an UploadFile to a temporary file in chunks. Returns its path."""
+    suffix = os.path.splitext(file.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_MB * 1024 * 1024:
+                    raise HTTPException(status_code=413, detail=f"Upload larger than {MAX_UPLOAD_MB} MB")
+                out.write(chunk)
+    except BaseException:
+        discard(path)
+        raise
+    finally:
+        await file.close()
+    print(f"Spooled upload {file.filename} ({size / 1024 / 1024:.1f} MB)")
+    return path
+
+def discard(path):
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,183 @@
+"""
+Weekly hours ledger (employee_week_hours).
+
+Weeks start on Saturday 00:00 and a shift counts towards the week it starts in.
+Raw hours are plain durations; paid hours apply the 30 minute unpaid lunch on
+maintenance shifts of 7.5h or more.
+
+Every shift write updates the ledger incrementally inside the same transaction
+(via shift_events), so endpoints read hours with one indexed lookup instead of
+loading and summing a week of shifts. rebuild() recomputes it from scratch;
+check_consistency() (at startup and GET /week-hours/consistency) rebuilds it when
+its totals no longer match the shift table.
+
+The ledger holds stored shifts only. Occurrences of recurring series that are
+generated rather than stored (shift_series.expand) are added by the reads, for
+the weeks asked for.
+
+Usage: python week_hours.py [path/to/schedule.db]   (rebuilds the ledger)
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select, delete, func
+from models import EmployeeWeekHours, Shift
+import shift_events
+import shift_series
+from scheduling_rules import RULES
+
+MAINTENANCE_ROLE_ID = 4
+LUNCH_MIN_SHIFT_HOURS = RULES.param("maintenance_lunch", "min_shift_hours")
+LUNCH_DEDUCTION_HOURS = RULES.param("maintenance_lunch", "deduction_hours")
+HOURS_TOLERANCE = 1e-3  # Per shift, for julianday rounding in check_consistency()
+
+def week_start_of(dt):
+    """Saturday 00:00 on or before dt. Sat=0, Sun=1, Mon=2, ..., Fri=6 days since."""
+    days_since_saturday = (dt.weekday() + 2) % 7
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_since_saturday)
+
+def shift_hours(start, end):
+    return (end - start).total_seconds() / 3600
+
+def paid_shift_hours(start, end, role_id):
+    """Shift hours after the maintenance unpaid lunch deduction."""
+    hours = shift_hours(start, end)
+    if role_id == MAINTENANCE_ROLE_ID and hours >= LUNCH_MIN_SHIFT_HOURS:
+        hours -= LUNCH_DEDUCTION_HOURS
+    return hours
+
+def _deltas(changes):
+    # {(employee_id, week_start): [raw, paid, count]}
+    deltas = defaultdict(lambda: [0.0, 0.0, 0])
+
+    def add(span, sign):
+        if span is None or span.employee_id is None or span.start_time is None or span.end_time is None:
+            return
+        entry = deltas[(span.employee_id, week_start_of(span.start_time))]
+        entry[0] += sign * shift_hours(span.start_time, span.end_time)
+        entry[1] += sign * paid_shift_hours(span.start_time, span.end_time, span.role_id)
+        entry[2] += sign
+
+    for change in changes:
+        add(change.before, -1)
+        add(change.after, 1)
+    return {k: v for k, v in deltas.items() if v[2] or abs(v[0]) > 1e-9 or abs(v[1]) > 1e-9}
+
+def _upsert(connection, deltas):
+    if not deltas:
+        return
+    rows = [
+        {"employee_id": emp_id, "week_start": week, "raw_hours": raw, "paid_hours": paid, "shift_count": count}
+        for (emp_id, week), (raw, paid, count) in deltas.items()
+    ]
+    stmt = sqlite_insert(EmployeeWeekHours.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["employee_id", "week_start"],
+        set_={
+            "raw_hours": EmployeeWeekHours.__table__.c.raw_hours + stmt.excluded.raw_hours,
+            "paid_hours": EmployeeWeekHours.__table__.c.paid_hours + stmt.excluded.paid_hours,
+            "shift_count": EmployeeWeekHours.__table__.c.shift_count + stmt.excluded.shift_count,
+        },
+    )
+    connection.execute(stmt, rows)
+
+@shift_events.on_flush
+def apply_shift_changes(session, changes):
+    _upsert(session.connection(), _deltas(changes))
+
+# --- Reads ---
+def _generated_hours(session, employee_ids, week_starts, paid):
+    """{(employee_id, week_start): hours} of generated series occurrences starting in week_starts."""
+    weeks = set(week_starts)
+    totals = defaultdict(float)
+    for s in shift_series.expand(session, min(weeks), max(weeks) + timedelta(days=7), employee_ids):
+        week = week_start_of(s.start_time)
+        if week in weeks:
+            totals[(s.employee_id, week)] += paid_shift_hours(s.start_time, s.end_time, s.role_id) if paid else shift_hours(s.start_time, s.end_time)
+    return totals
+
+def get_week_hours(session, employee_ids, week_start, paid=False):
+    """Returns {employee_id: hours} for the week starting week_start (0.0 when absent)."""
+    employee_ids = list(employee_ids)
+    hours = {emp_id: 0.0 for emp_id in employee_ids}
+    if not employee_ids:
+        return hours
+    column = EmployeeWeekHours.paid_hours if paid else EmployeeWeekHours.raw_hours
+    rows = session.exec(select(EmployeeWeekHours.employee_id, column).where(
+        EmployeeWeekHours.week_start == week_start,
+        EmployeeWeekHours.employee_id.in_(employee_ids)
+    )).all()
+    for emp_id, value in rows:
+        hours[emp_id] = value
+    for (emp_id, _), value in _generated_hours(session, employee_ids, [week_start], paid).items():
+        hours[emp_id] += value
+    return {emp_id: round(value, 6) for emp_id, value in hours.items()}
+
+def get_weeks_hours(session, employee_ids, week_starts, paid=False):
+    """Returns {(employee_id, week_start): hours} for several weeks in one query (missing = absent)."""
+    employee_ids, week_starts = list(employee_ids), list(week_starts)
+    if not employee_ids or not week_starts:
+        return {}
+    column = EmployeeWeekHours.paid_hours if paid else EmployeeWeekHours.raw_hours
+    rows = session.exec(select(EmployeeWeekHours.employee_id, EmployeeWeekHours.week_start, column).where(
+        EmployeeWeekHours.week_start.in_(week_starts),
+        EmployeeWeekHours.employee_id.in_(employee_ids)
+    )).all()
+    hours = defaultdict(float, {(emp_id, week): value for emp_id, week, value in rows})
+    for key, value in _generated_hours(session, employee_ids, week_starts, paid).items():
+        hours[key] += value
+    return {key: round(value, 6) for key, value in hours.items()}
+
+def get_employee_week_hours(session, employee_id, week_start, paid=False):
+    return get_week_hours(session, [employee_id], week_start, paid=paid)[employee_id]
+
+# --- Rebuild ---
+def rebuild(session):
+    """Recomputes the whole ledger from the shift table. Returns the number of ledger rows."""
+    changes = [
+        shift_events.ShiftChange(None, None, shift_events.ShiftSpan(emp_id, role_id, start, end, False))
+        for emp_id, role_id, start, end in session.exec(select(
+            Shift.employee_id, Shift.role_id, Shift.start_time, Shift.end_time
+        ).where(Shift.employee_id != None)).all()
+    ]
+    deltas = _deltas(changes)
+    connection = session.connection()
+    connection.execute(delete(EmployeeWeekHours))
+    _upsert(connection, deltas)
+    session.commit()
+    return len(deltas)
+
+def check_consistency(session, repair=False):
+    """Compares the ledger's totals with the shift table. With repair=True, rebuilds it on mismatch.
+
+    Writers that bypass shift_events (Core statements, scripts that never import
+    this module) leave the ledger wrong across restarts; a shift count and an hours
+    total are two aggregate queries and catch additions, deletions and moves."""
+    ledger_count, ledger_hours = session.exec(select(
+        func.coalesce(func.sum(EmployeeWeekHours.shift_count), 0), func.coalesce(func.sum(EmployeeWeekHours.raw_hours), 0.0)
+    )).one()
+    shift_count, hours = session.exec(select(
+        func.count(Shift.id), func.coalesce(func.sum((func.julianday(Shift.end_time) - func.julianday(Shift.start_time)) * 24), 0.0)
+    ).where(Shift.employee_id != None)).one()
+    consistent = ledger_count == shift_count and abs(ledger_hours - hours) < HOURS_TOLERANCE * max(shift_count, 1)
+    if repair and not consistent:
+        rebuild(session)
+    return {
+        "consistent": consistent,
+        "ledger_shifts": ledger_count,
+        "shifts": shift_count,
+        "ledger_hours": round(ledger_hours, 2),
+        "shift_hours": round(hours, 2),
+        "repaired": repair and not consistent,
+    }
+
+if __name__ == "__main__":
+    import sys
+    from sqlmodel import SQLModel, Session
+    from database import make_engine
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "schedule.db"
+    engine = make_engine(f"sqlite:///{db_path}", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        print(f"Rebuilt employee_week_hours: {rebuild(session)} rows")